@@ -0,0 +1,19 @@
+"""
+Benchmarks for the clock's hot paths, with stored time and memory budgets.
+
+bench/cases.py sets up each path (departure parsing, the countdown, the
+portal's pages, url_decode, a display update) and hands back one call to
+measure. On a computer, under the host stand-ins:
+
+    python -m bench.run [--seconds S] [--update] [case ...]
+
+On the board, copy the bench folder (and bench/departures.json, written by
+`python -m bench.run --export`) to the CIRCUITPY drive, then at the REPL:
+
+    import bench.board
+
+Both report calls per second, the peak allocation of one call and the
+bytes allocated per call, and fail when a case is over its budget in
+bench/budgets.json. See bench/budgets.py for what the memory figures mean
+on each platform.
+"""
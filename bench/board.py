@@ -0,0 +1,60 @@
+"""
+Run the benchmarks on the board: at the REPL (with code.py stopped),
+
+    import bench.board
+
+Needs /bench (this folder) and /bench/departures.json, from
+`python -m bench.run --export`, on the CIRCUITPY drive. Host-only cases
+are skipped. Cases are checked against the "board" budgets in
+bench/budgets.json, and an exception is raised if any is over.
+"""
+import gc
+import time
+
+from bench import budgets, cases
+
+# Timed calls run for at least this long (ns), and at least MIN_CALLS times
+DURATION_NS = 2_000_000_000
+MIN_CALLS = 3
+
+
+def measure(call):
+    """Time call, then count what one call allocates with the collector paused."""
+    # Fill the caches first, as the first portal request does for every later one
+    call()
+
+    calls = 0
+    start = time.monotonic_ns()
+    while True:
+        call()
+        calls += 1
+        elapsed = time.monotonic_ns() - start
+        if elapsed >= DURATION_NS and calls >= MIN_CALLS:
+            break
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        call()
+        allocated = gc.mem_alloc() - before
+    finally:
+        gc.enable()
+    return {"ops": calls * 1_000_000_000 / elapsed, "peak": allocated, "bytes": allocated}
+
+
+def main():
+    results = []
+    for name, make, host_only in cases.cases():
+        if host_only:
+            continue
+        try:
+            results.append((name, measure(make())))
+        except MemoryError:
+            print(f"{name}: out of memory")
+        gc.collect()
+    if budgets.report(results, budgets.load().get("board", {})):
+        raise RuntimeError("Benchmarks over budget")
+
+
+main()
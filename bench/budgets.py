@@ -0,0 +1,70 @@
+"""
+Budgets and the results table, shared by the host and board runners.
+
+A result is a dict with:
+    ops     calls per second
+    peak    most memory one call had allocated at once (bytes)
+    bytes   bytes allocated per call
+
+On the board the collector is paused around the measured call, so peak and
+bytes are both everything gc.mem_alloc() saw the call allocate. CPython
+frees as it goes: there peak is tracemalloc's high-water mark for one call
+and bytes is what each call leaves allocated (caches, leaks), averaged
+over a run.
+
+bench/budgets.json holds a budget per platform ("host", "board") and case:
+{"min_ops": ..., "max_peak": ..., "max_bytes": ...}, any of them optional.
+Cases without a budget are reported but can't fail.
+"""
+import json
+
+BUDGETS_PATH = "/bench/budgets.json"
+
+
+def load(path=BUDGETS_PATH):
+    """Budgets as {platform: {case: budget}}; empty if the file is missing."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except OSError:
+        return {}
+
+
+def over_budget(result, budget):
+    """What result exceeds in budget, as a list of short descriptions."""
+    failures = []
+    if "min_ops" in budget and result["ops"] < budget["min_ops"]:
+        failures.append(f"{result['ops']:.0f} ops/s < {budget['min_ops']}")
+    if "max_peak" in budget and result["peak"] > budget["max_peak"]:
+        failures.append(f"peak {result['peak']} B > {budget['max_peak']}")
+    if "max_bytes" in budget and result["bytes"] > budget["max_bytes"]:
+        failures.append(f"{result['bytes']} B/call > {budget['max_bytes']}")
+    return failures
+
+
+def report(results, budgets):
+    """
+    Print the results table and every case over its budget.
+
+    Args:
+        results (list): (name, result) pairs in run order
+        budgets (dict): case -> budget for this platform
+
+    Returns:
+        int: The number of cases over budget
+    """
+    print(f"{'case':<32}{'ops/s':>12}{'peak B':>10}{'B/call':>10}  budget")
+    failed = 0
+    for name, result in results:
+        budget = budgets.get(name)
+        if budget is None:
+            verdict = "-"
+        else:
+            failures = over_budget(result, budget)
+            verdict = "FAIL: " + ", ".join(failures) if failures else "ok"
+            if failures:
+                failed += 1
+        print(f"{name:<32}{result['ops']:>12.1f}{result['peak']:>10}{result['bytes']:>10}  {verdict}")
+    if failed:
+        print(f"{failed} case(s) over budget")
+    return failed
@@ -0,0 +1,176 @@
+"""
+The benchmarked calls. Runs on the board as well as under the host stand-ins.
+
+Each case is (name, make, host_only): make() does the setup (imports,
+payloads, caches) and returns the call to measure, which takes no
+arguments. host_only cases need things the board can't offer on demand: a
+scan with a set number of networks, or a portal POST that would rewrite
+/settings.toml on flash.
+"""
+from modules.routes_data import routes_data
+
+# The departures response parsed by the parse cases; see departures_payload()
+PAYLOAD_PATH = "/bench/departures.json"
+PAYLOAD_STOP = "s-dr5rubz42m-hunterspointsouth"
+PAYLOAD_DEPARTURES = 100
+# 08:00, New York time, on a fixed day, so every payload is the same
+PAYLOAD_NOW = 8 * 3600
+PAYLOAD_DATE = "2025-06-02"
+
+# Scan sizes for the Wi-Fi page
+NETWORK_COUNTS = (5, 10, 25, 50)
+
+# A Wi-Fi form body with everything url_decode has to undo
+FORM_BODY = "wifi_name=Caf%C3%A9+%26+Bar+5G&wifi_password=p%40ss%2Bw0rd%25+%22quoted%22"
+
+payload = None
+
+
+def departures_payload():
+    """The departures response: set by the host runner, read from flash on the board."""
+    global payload
+    if payload is None:
+        with open(PAYLOAD_PATH, "rb") as file:
+            payload = file.read()
+    return payload
+
+
+def route_codes():
+    """Route codes ('AS', 'ER', ...) in routes_data order."""
+    return [route_key.split(" ")[0] for route_key in routes_data]
+
+
+def form_value(value):
+    """Encode a form value the way a browser does."""
+    return value.replace("%", "%25").replace("&", "%26").replace("/", "%2F").replace(" ", "+")
+
+
+def parse_departures(filters):
+    """make() for a parse of the whole payload with the given filters."""
+    def make():
+        from modules.departure_parser import DepartureParser
+        from modules.transitland import RESPONSE_CHUNK_SIZE
+
+        body = departures_payload()
+        end = len(body)
+
+        def call():
+            # As fetch_stop_departures() does, but the chunks are slices of one buffer
+            parser = DepartureParser(filters, 1)
+            for start in range(0, end, RESPONSE_CHUNK_SIZE):
+                if parser.feed(body, start, min(start + RESPONSE_CHUNK_SIZE, end)):
+                    break
+            return parser.departures
+        return call
+    return make
+
+
+def time_to_next_departure():
+    from modules.countdown import countdown
+    from modules.transitland import time_to_next_departure
+
+    countdown.anchor()
+
+    def call():
+        return time_to_next_departure("08:42:30")
+    return call
+
+
+def drain(response):
+    """Everything the portal does to a Response short of sending it."""
+    response.head()
+    return response.content_length()
+
+
+def ferry_get(route_code):
+    def make():
+        from modules.ferry_config import handle_ferry_config
+        from modules.http_request import Request
+
+        target = f"/?route={route_code}"
+
+        def call():
+            return drain(handle_ferry_config(Request("GET", target)))
+        return call
+    return make
+
+
+def ferry_post(route_code):
+    def make():
+        from modules.ferry_config import get_ferry_index, handle_ferry_config
+        from modules.http_request import Request
+
+        route = get_ferry_index()[0][route_code]
+        body = "route={}&stop_id={}&headsign={}".format(
+            route_code, route["stops"][0][0], form_value(route["headsigns"][0])).encode("utf-8")
+        headers = {"content-type": "application/x-www-form-urlencoded"}
+
+        def call():
+            return drain(handle_ferry_config(Request("POST", "/", headers, body)))
+        return call
+    return make
+
+
+def url_decode():
+    from modules.http_request import url_decode
+
+    def call():
+        return url_decode(FORM_BODY)
+    return call
+
+
+def wifi_config(count):
+    def make():
+        import wifi
+
+        from modules.http_request import Request
+        from modules.wifi_config import handle_wifi_config_request, refresh_networks
+
+        # The stand-in radio finds exactly these, strongest last
+        wifi.radio.networks = [wifi.Network(f"Network {i:02d}", -90 + i) for i in range(count)]
+        # GET serves the last scan, as after the portal's startup scan
+        refresh_networks()
+
+        def call():
+            return drain(handle_wifi_config_request(Request("GET", "/")))
+        return call
+    return make
+
+
+def display_update():
+    from modules.display import get_display
+
+    manager = get_display()
+    minutes = [0]
+
+    def call():
+        # A new number every call, so each render redraws the panel
+        minutes[0] = minutes[0] % 59 + 1
+        manager.show_countdown(minutes[0])
+        return manager.render()
+    return call
+
+
+def cases():
+    """Every case as (name, make, host_only), in report order."""
+    found = []
+    for route in routes_data.values():
+        if not found and any(stop["stop_id"] == PAYLOAD_STOP for stop in route["stops"]):
+            found.append((route["trip_headsigns"][0], route["id"]))
+    # Matches nothing, so the whole body is parsed
+    missing = [("Nowhere", "r-none")]
+
+    result = [
+        ("parse departures (found)", parse_departures(found), False),
+        ("parse departures (full scan)", parse_departures(missing), False),
+        ("time_to_next_departure", time_to_next_departure, False),
+        ("url_decode", url_decode, False),
+    ]
+    for code in route_codes():
+        result.append((f"ferry GET {code}", ferry_get(code), False))
+    for code in route_codes():
+        result.append((f"ferry POST {code}", ferry_post(code), True))
+    for count in NETWORK_COUNTS:
+        result.append((f"wifi GET {count} networks", wifi_config(count), True))
+    result.append(("display update", display_update, False))
+    return result
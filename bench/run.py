@@ -0,0 +1,137 @@
+"""
+Run the benchmarks on this computer, under the host stand-ins.
+
+    python -m bench.run [--seconds S] [--update] [--export] [case ...]
+
+Cases are picked by any part of their name ("ferry", "wifi GET 50"); all
+of them run by default. Exits with status 1 if any case is over its "host"
+budget in bench/budgets.json. --update stores new host budgets from this
+run instead, with headroom (see UPDATE_*), and --export only writes
+bench/departures.json for the board.
+
+Times are the host's, so the budgets only catch large regressions; the
+memory figures are the ones to watch (see bench/budgets.py).
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench import budgets, cases
+from host.run import setup
+from host.transitland_stub import synthetic_payload
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGETS_FILE = os.path.join(BENCH_DIR, "budgets.json")
+PAYLOAD_FILE = os.path.join(BENCH_DIR, "departures.json")
+
+# Timed calls run for at least this long, and at least MIN_CALLS times
+SECONDS = 0.5
+MIN_CALLS = 5
+# Calls averaged for the bytes each call leaves allocated
+MEMORY_CALLS = 20
+
+# --update: budgets leave this much room over the measured run
+UPDATE_OPS_FACTOR = 0.25
+UPDATE_MEMORY_FACTOR = 1.5
+UPDATE_MEMORY_SLACK = 256
+
+
+class _Discard:
+    """stdout for the code under test, whose prints would swamp the table."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def measure(call, seconds=SECONDS):
+    """Time call, then trace one call's peak and the bytes calls leave behind."""
+    # Fill the caches first, as the board's first request does for every later one
+    call()
+
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        call()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and calls >= MIN_CALLS:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        for _ in range(MEMORY_CALLS - 1):
+            call()
+        gc.collect()
+        kept = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return {"ops": calls / elapsed, "peak": peak, "bytes": max(0, kept // MEMORY_CALLS)}
+
+
+def updated_budgets(results):
+    """Host budgets with headroom over results."""
+    host = {}
+    for name, result in results:
+        host[name] = {
+            "min_ops": max(1, int(result["ops"] * UPDATE_OPS_FACTOR)),
+            "max_peak": int(result["peak"] * UPDATE_MEMORY_FACTOR) + UPDATE_MEMORY_SLACK,
+            "max_bytes": int(result["bytes"] * UPDATE_MEMORY_FACTOR) + UPDATE_MEMORY_SLACK,
+        }
+    return host
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("names", nargs="*", help="run only cases whose name contains one of these")
+    parser.add_argument("--seconds", type=float, default=SECONDS, help="time each case for this long")
+    parser.add_argument("--update", action="store_true", help="store this run as the host budgets")
+    parser.add_argument("--export", action="store_true", help="write bench/departures.json and stop")
+    args = parser.parse_args()
+
+    payload = synthetic_payload(cases.PAYLOAD_STOP, cases.PAYLOAD_DEPARTURES,
+                                cases.PAYLOAD_NOW, cases.PAYLOAD_DATE)
+    if args.export:
+        with open(PAYLOAD_FILE, "wb") as file:
+            file.write(payload)
+        print(f"Wrote {PAYLOAD_FILE} ({len(payload)} bytes); copy it to /bench on the board")
+        return
+    cases.payload = payload
+    stored = budgets.load(BUDGETS_FILE)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="circuitpy-") as temporary:
+        setup(temporary)
+        for name, make, host_only in cases.cases():
+            if args.names and not any(part in name for part in args.names):
+                continue
+            with contextlib.redirect_stdout(_Discard()):
+                results.append((name, measure(make(), args.seconds)))
+
+    if args.update:
+        stored.setdefault("host", {}).update(updated_budgets(results))
+        with open(BUDGETS_FILE, "w") as file:
+            json.dump(stored, file, indent=2)
+            file.write("\n")
+        budgets.report(results, stored["host"])
+        print(f"Updated {BUDGETS_FILE}")
+        return
+    if budgets.report(results, stored.get("host", {})):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
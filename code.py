@@ -1,23 +1,60 @@
+# Imported first so the profile starts as early as possible
+from modules import boot_profile
+# Before any other of our modules, so they compile without their debug lines.
+# This file is compiled before it runs, so its own debug lines stay in; the
+# level check in log.debug() keeps them from formatting anything
+from modules import log
 import os
-import time
 import wifi
 import socketpool
-import displayio
-from modules.wifi_config import handle_wifi_config_request
-from modules.ferry_config import handle_ferry_config, load_html as load_ferry_html
-from modules.print import display_ferry_config, display_boat_idle
-# Add imports for matrix display and ferry data
-from adafruit_matrixportal.matrixportal import MatrixPortal
-from adafruit_display_text import label
-import terminalio
-from modules.transitland import fetch_next_departure, time_to_next_departure
-# Add bitmap font support for custom fonts
-try:
-    from adafruit_bitmap_font import bitmap_font
-    CUSTOM_FONT_AVAILABLE = True
-except ImportError:
-    CUSTOM_FONT_AVAILABLE = False
-    # print("Custom font support not available")
+from modules import tasks
+from modules.portal_server import PortalServer
+boot_profile.mark("core imports")
+# Everything else is imported by the mode that needs it: the setup pages
+# while the portal is up, transitland and the scheduler once the display runs
+
+# Longest wait between countdown updates; PollScheduler decides when to refetch
+DISPLAY_TICK = 15
+# Seconds to keep serving other portal clients after the ferry settings are saved
+SETUP_GRACE = 2
+
+async def refresh_departures(departure_caches, poll_scheduler, memory_governor):
+    """Refetch departures when the scheduler says so and feed the result back to it."""
+    from modules.transitland import refresh_watch_list, refresh_watch_list_async
+    from modules import metrics
+    cache_stale = any(cache.is_stale() for cache in departure_caches)
+    if not poll_scheduler.is_due(cache_stale):
+        poll_scheduler.update_countdown(soonest_minutes(departure_caches))
+        return
+    if tasks.ASYNCIO_AVAILABLE:
+        fetched = await refresh_watch_list_async(departure_caches)
+    else:
+        fetched = refresh_watch_list(departure_caches)
+    # The response and parser are garbage now: collect here rather than mid-redraw
+    memory_governor.checkpoint()
+    metrics.record_memory(memory_governor)
+    memory_governor.adjust(departure_caches, poll_scheduler)
+    if fetched:
+        shifts = [abs(cache.estimate_shift) for cache in departure_caches
+                  if cache.estimate_shift is not None]
+        poll_scheduler.record_success(soonest_minutes(departure_caches), max(shifts) if shifts else None)
+    else:
+        poll_scheduler.record_error()
+    if __debug__:
+        log.debug("Next fetch in %ss (%s)", poll_scheduler.next_interval, poll_scheduler.reason)
+
+def soonest_minutes(departure_caches):
+    """Minutes until the soonest departure across all watched entries."""
+    soonest = None
+    for cache in departure_caches:
+        minutes_left = cache.minutes_left()
+        if minutes_left is not None and (soonest is None or minutes_left < soonest):
+            soonest = minutes_left
+    return soonest
+
+async def wait_for_next_tick(poll_scheduler):
+    """Sleep until the next countdown update or scheduled fetch, whichever is sooner."""
+    await tasks.sleep(max(1, min(DISPLAY_TICK, poll_scheduler.time_until_due())))
 
 def get_secrets():
     """Read API key from secrets.toml file."""
@@ -40,7 +77,7 @@ def get_secrets():
                     return value
         return ""
     except Exception as e:
-        print(f"Error reading secrets.toml: {e}")
+        log.error("Error reading secrets.toml: %s", e)
         return ""
 
 def has_internet():
@@ -50,15 +87,12 @@ def has_internet():
         addr_info = pool.getaddrinfo("8.8.8.8", 80)
         return True
     except Exception as e:
-        # print(f"No internet connection: {e}")
+        if __debug__:
+            log.debug("No internet connection: %s", e)
         return False
 
-def serve_page(client, html):
-    response = f"HTTP/1.1 200 OK\nContent-Type: text/html\n\n{html}"
-    client.send(response.encode("utf-8"))
-
-def create_server(pool):
-    """Create server socket."""
+def start_access_point():
+    """Start the setup access point."""
     # Try to stop any existing AP
     try:
         wifi.radio.stop_ap()
@@ -67,218 +101,201 @@ def create_server(pool):
     
     # Start fresh AP
     wifi.radio.start_ap(ssid="Commute Clock NYC", password="ferry123", channel=6)
-    print("AP started at 192.168.4.1")
-    print("Connect to 'Commute Clock NYC' WiFi (password: ferry123) to configure")
+    log.info("AP started at 192.168.4.1")
+    log.info("Connect to 'Commute Clock NYC' WiFi (password: ferry123) to configure")
+
+def is_ferry_form_submission(request):
+    """Same check as ferry_config.py: a POST with route, stop and headsign all filled in."""
+    if request.method != "POST":
+        return False
+    params = request.form
+    return bool(params.get("route") and params.get("stop_id") and params.get("headsign"))
+
+def handle_portal_request(portal, request):
+    """Route a portal request to the handler for the current setup state."""
+    if __debug__:
+        log.debug("Request: %s %s", request.method, request.target)
+    if portal["state"] == "wifi_config":
+        from modules.wifi_config import handle_wifi_config_request
+        return handle_wifi_config_request(request)
+    from modules.ferry_config import handle_ferry_config
+    return handle_ferry_config(request)
+
+async def after_portal_response(portal, server, request, response):
+    """Advance the setup state once a response has been delivered."""
+    # --- WiFi Config State ---
+    if portal["state"] == "wifi_config":
+        # Join the network the form just posted, now that its reply is out
+        from modules.wifi_config import connect_pending
+        if connect_pending():
+            portal["state"] = "ferry_config"
+            log.info("Transitioning to ferry config mode")
+            # Show boat idle display during ferry configuration
+            from modules.print import display_boat_idle
+            display_boat_idle()
+    
+    # --- Ferry Config State ---
+    elif portal["state"] == "ferry_config" and is_ferry_form_submission(request):
+        if __debug__:
+            log.debug("Ferry form submitted with valid data")
+        portal["state"] = "connecting"
+        await finish_setup(portal, server)
+
+async def finish_setup(portal, server):
+    """Leave the setup AP and join the configured WiFi network."""
+    # The success page has been fully sent; give other in-flight requests
+    # (favicon, retries) a moment to finish without blocking anything
+    if tasks.ASYNCIO_AVAILABLE:
+        await tasks.sleep(SETUP_GRACE)
+    server.stop()
+    
+    # Stop AP
+    try:
+        wifi.radio.stop_ap()
+        log.info("AP stopped. Setup complete.")
+    except Exception as e:
+        log.error("Error stopping AP: %s", e)
+    
+    log.info("Connecting to WiFi for ferry data...")
+    
+    # Get latest WiFi credentials
+    ssid = os.getenv("CIRCUITPY_WIFI_SSID")
+    password = os.getenv("CIRCUITPY_WIFI_PASSWORD")
     
-    # Create and bind server
-    server = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
-    server.setblocking(True)
-    server.bind(("192.168.4.1", 80))
-    server.listen(1)
-    return server
+    try:
+        if __debug__:
+            log.debug("Attempting to connect to WiFi SSID: %s", ssid)
+        wifi.radio.connect(ssid, password)
+        log.info("Connected to WiFi successfully")
+        
+        if has_internet():
+            log.info("Internet connection confirmed")
+            portal["connected"] = True
+        else:
+            log.warning("No internet connection available")
+    except Exception as e:
+        log.error("Failed to connect to WiFi: %s", e)
+    portal["setup_done"].set()
+
+async def display_task(portal):
+    """Keep the idle boat up during setup, then run the ferry countdown."""
+    await portal["setup_done"].wait()
+    if portal["connected"]:
+        log.info("Starting ferry times display after WiFi connection...")
+        await run_ferry_display()
+
+async def run_portal(portal, server):
+    """Serve the configuration portal alongside the display task (after it, without asyncio)."""
+    await tasks.gather(server.serve(), display_task(portal))
 
 def display_ferry_times():
     """Display ferry countdown times on the matrix after configuration is complete."""
+    tasks.run(run_ferry_display())
+
+def start_metrics_server(metrics):
+    """Serve /metrics on the station network while the countdown runs."""
+    if not tasks.ASYNCIO_AVAILABLE:
+        log.info("No asyncio library: metrics server disabled")
+        return
+    try:
+        server = metrics.MetricsServer(socketpool.SocketPool(wifi.radio), str(wifi.radio.ipv4_address))
+        server.start()
+        tasks.create_task(server.serve())
+        log.info("Metrics at http://%s:%d/metrics", wifi.radio.ipv4_address, server.port)
+    except Exception as e:
+        log.error("Failed to start metrics server: %s", e)
+
+async def run_ferry_display():
+    """Ferry countdown display loop; yields to other tasks between updates."""
+    from modules.print import display_boat_idle
+    from modules.transitland import DepartureCache, get_watch_list
+    from modules.scheduler import PollScheduler
+    from modules.memory import MemoryGovernor
+    from modules import metrics
+    boot_profile.mark("display mode imports")
+    start_metrics_server(metrics)
     
     try:
-        # Initialize display components ONCE at the start
-        from adafruit_matrixportal.matrix import Matrix
-        from adafruit_display_text import label
+        # The shared matrix; the route color may have changed during setup
+        from modules.display import get_display
+        display = get_display()
+        display.show_boat(os.getenv("CIRCUITPY_FERRY_COLOR", "teal"))
+        display.render()
         
-        matrix = Matrix(bit_depth=4)
+        # One cache per watched stop/headsign/route; the display rotates through them
+        departure_caches = [DepartureCache(*entry) for entry in get_watch_list()]
+        display_index = 0
+        poll_scheduler = PollScheduler()
+        memory_governor = MemoryGovernor()
+        first_countdown = True
         
-        # Clear the display buffer to prevent artifacts
-        matrix.display.root_group = None
-        matrix.display.refresh()
-        
-        text_group = displayio.Group()
-        
-        # Load fonts once
-        number_font = terminalio.FONT
-        min_font = terminalio.FONT
-        
-        if CUSTOM_FONT_AVAILABLE:
-            try:
-                number_font = bitmap_font.load_font("fonts/MatrixChunky8.bdf")
-            except Exception:
-                pass
-        
-        # Get ferry settings once
-        ferry_color = os.getenv("CIRCUITPY_FERRY_COLOR", "teal")
-        stop_id = os.getenv("CIRCUITPY_FERRY_STOP_ID")
-        route_id = os.getenv("CIRCUITPY_FERRY_ROUTE_ID") 
-        headsign = os.getenv("CIRCUITPY_FERRY_HEADSIGN")
-        
-        # Load boat bitmap once
-        boat_bitmap = None
-        boat_tilegrid = None
-        
-        try:
-            # Try to load boat image
-            try:
-                boat_bitmap = displayio.OnDiskBitmap(f"boats/{ferry_color}.bmp")
-            except (OSError, ValueError):
-                try:
-                    boat_bitmap = displayio.OnDiskBitmap(f"boats/{ferry_color}.png")
-                except (OSError, ValueError):
-                    if ferry_color != "teal":
-                        try:
-                            boat_bitmap = displayio.OnDiskBitmap("boats/teal.bmp")
-                        except (OSError, ValueError):
-                            try:
-                                boat_bitmap = displayio.OnDiskBitmap("boats/teal.png")
-                            except (OSError, ValueError):
-                                pass
-            
-            if boat_bitmap:
-                boat_tilegrid = displayio.TileGrid(
-                    boat_bitmap,
-                    pixel_shader=boat_bitmap.pixel_shader
-                )
-                boat_tilegrid.y = 2  # Fixed y position
-                text_group.append(boat_tilegrid)
-        except Exception:
-            pass
-        
-        # Create text labels once
-        number_label = label.Label(
-            number_font,
-            text="0",
-            color=0xFFFFFF,
-            scale=2,
-            x=2,
-            y=24
-        )
-        
-        min_label = label.Label(
-            min_font,
-            text="min",
-            color=0xFFFFFF,
-            scale=1,
-            x=20,  # Will be adjusted based on number width
-            y=26
-        )
-        
-        # Don't add the labels initially - start in idle mode
-        # Set the display group once
-        matrix.display.root_group = text_group
-        
-        print("Starting ferry time display...")
-        
-        # Current state tracking - start in idle mode to avoid showing "0 min"
-        current_mode = "boat_idle"
-        
-        # Initialize boat position for idle mode
-        if boat_tilegrid:
-            display_width = 64
-            display_height = 32
-            boat_tilegrid.x = (display_width - boat_bitmap.width) // 2
-            boat_tilegrid.y = (display_height - boat_bitmap.height) // 2
+        log.info("Starting ferry time display...")
         
         while True:
             try:
-                # Fetch ferry data
-                next_departure_time = fetch_next_departure(stop_id, headsign, route_id)
-                minutes_left = time_to_next_departure(next_departure_time)
+                # Count down from the cache; only go back to the network when scheduled
+                await refresh_departures(departure_caches, poll_scheduler, memory_governor)
+                minutes_left = None
+                if departure_caches:
+                    display_index = (display_index + 1) % len(departure_caches)
+                    minutes_left = departure_caches[display_index].minutes_left()
                 
+                started = metrics.display_started()
                 if minutes_left is not None and minutes_left > 0:
-                    # Switch to ferry time mode if needed
-                    if current_mode != "ferry_time":
-                        # Show the ferry time elements
-                        if boat_tilegrid in text_group:
-                            text_group.remove(boat_tilegrid)
-                        if number_label not in text_group:
-                            text_group.append(number_label)
-                        if min_label not in text_group:
-                            text_group.append(min_label)
-                        if boat_tilegrid:
-                            text_group.append(boat_tilegrid)
-                        current_mode = "ferry_time"
-                    
-                    # Update number text
-                    number_label.text = str(minutes_left)
-                    
-                    # Calculate and update boat position if available
-                    if boat_tilegrid:
-                        display_width = 64
-                        boat_width = boat_bitmap.width
-                        clamped_minutes = max(1, min(30, minutes_left))
-                        
-                        left_pos = 2
-                        right_pos = display_width - boat_width - 2
-                        boat_x = left_pos + (right_pos - left_pos) * (30 - clamped_minutes) / 29
-                        boat_tilegrid.x = int(boat_x)
-                        # Move boat up 8 rows when showing time
-                        boat_tilegrid.y = 2
-                    
-                    # Update min label position based on number width
-                    base_number_width = number_label.bounding_box[2]
-                    scaled_number_width = base_number_width * 2
-                    min_label.x = 2 + scaled_number_width
-                    
+                    display.show_countdown(minutes_left)
                 else:
-                    # Switch to boat idle mode if needed
-                    if current_mode != "boat_idle":
-                        # Hide text labels, show only boat
-                        if number_label in text_group:
-                            text_group.remove(number_label)
-                        if min_label in text_group:
-                            text_group.remove(min_label)
-                        if boat_tilegrid and boat_tilegrid not in text_group:
-                            text_group.append(boat_tilegrid)
-                        current_mode = "boat_idle"
-                    
-                    # Center the boat for idle display
-                    if boat_tilegrid:
-                        display_width = 64
-                        display_height = 32
-                        boat_tilegrid.x = (display_width - boat_bitmap.width) // 2
-                        boat_tilegrid.y = (display_height - boat_bitmap.height) // 2
+                    display.show_boat()
+                display.render()
+                metrics.display_done(started)
+                metrics.sample_memory()
+                if first_countdown:
+                    first_countdown = False
+                    boot_profile.mark("first departures frame")
+                    boot_profile.report("Display profile")
                 
-                # Sleep for 45 seconds
-                time.sleep(45)
+                await wait_for_next_tick(poll_scheduler)
                 
             except Exception as e:
-                print(f"Error updating ferry display: {e}")
+                log.error("Error updating ferry display: %s", e)
                 # Show error on display
-                number_label.text = "ERR"
-                if number_label not in text_group:
-                    text_group.append(number_label)
-                if min_label in text_group:
-                    text_group.remove(min_label)
-                time.sleep(60)
+                display.show_error()
+                display.render()
+                poll_scheduler.record_error()
+                await wait_for_next_tick(poll_scheduler)
                 
     except Exception as e:
-        print(f"Error initializing matrix display: {e}")
-        import traceback
-        traceback.print_exception(e)
-        print("Falling back to console-only mode...")
+        log.error("Error initializing matrix display: %s", e)
+        log.exception(e)
+        log.warning("Falling back to console-only mode...")
         
         # Fall back to console-only mode
+        departure_caches = [DepartureCache(*entry) for entry in get_watch_list()]
+        poll_scheduler = PollScheduler()
+        memory_governor = MemoryGovernor()
         while True:
             try:
-                stop_id = os.getenv("CIRCUITPY_FERRY_STOP_ID")
-                route_id = os.getenv("CIRCUITPY_FERRY_ROUTE_ID") 
-                headsign = os.getenv("CIRCUITPY_FERRY_HEADSIGN")
+                await refresh_departures(departure_caches, poll_scheduler, memory_governor)
                 
-                next_departure_time = fetch_next_departure(stop_id, headsign, route_id)
-                minutes_left = time_to_next_departure(next_departure_time)
+                any_data = False
+                for cache in departure_caches:
+                    minutes_left = cache.minutes_left()
+                    if minutes_left is not None:
+                        any_data = True
+                        log.info("Next ferry to %s in %d minutes", cache.trip_headsign, minutes_left)
                 
-                if minutes_left is not None:
-                    print(f"Next ferry in {minutes_left} minutes")
-                else:
-                    print("No ferry data available")
+                if not any_data:
+                    log.info("No ferry data available")
                     try:
                         display_boat_idle()
-                    except Exception as e:
+                    except Exception:
                         pass
                     
-                time.sleep(45)
+                await wait_for_next_tick(poll_scheduler)
             except Exception as e:
-                print(f"Error fetching ferry data: {e}")
-                import traceback
-                traceback.print_exception(e)
-                time.sleep(60)
+                log.error("Error fetching ferry data: %s", e)
+                log.exception(e)
+                poll_scheduler.record_error()
+                await wait_for_next_tick(poll_scheduler)
 
 
 def main():
@@ -290,198 +307,61 @@ def main():
     ferry_headsign = os.getenv("CIRCUITPY_FERRY_HEADSIGN", "")
     api_key = get_secrets()  # Read API key from secrets.toml
     
-    # Debug: Print all configuration values
-    print("=== CONFIGURATION DEBUG ===")
-    print(f"SSID: '{ssid}' (length: {len(ssid)})")
-    print(f"Password: {'*' * len(password)} (length: {len(password)})")
-    print(f"Ferry Route ID: '{ferry_route_id}' (length: {len(ferry_route_id)})")
-    print(f"Ferry Stop ID: '{ferry_stop_id}' (length: {len(ferry_stop_id)})")
-    print(f"Ferry Headsign: '{ferry_headsign}' (length: {len(ferry_headsign)})")
-    print(f"API Key (from secrets.toml): '{api_key[:10] if len(api_key) >= 10 else api_key}...' (length: {len(api_key)})")
-    print("=== END CONFIGURATION DEBUG ===")
+    # Debug: Log all configuration values
+    if __debug__:
+        log.debug("SSID: '%s' (length: %d)", ssid, len(ssid))
+        log.debug("Password: %s (length: %d)", "*" * len(password), len(password))
+        log.debug("Ferry Route ID: '%s' (length: %d)", ferry_route_id, len(ferry_route_id))
+        log.debug("Ferry Stop ID: '%s' (length: %d)", ferry_stop_id, len(ferry_stop_id))
+        log.debug("Ferry Headsign: '%s' (length: %d)", ferry_headsign, len(ferry_headsign))
+        log.debug("API Key (from secrets.toml): '%s...' (length: %d)", api_key[:10], len(api_key))
+    
+    boot_profile.mark("config read")
+    
+    # First frame before the network work, so the panel lights up quickly
+    from modules.display import get_display
+    boot_profile.mark("display imports")
+    get_display()
+    boot_profile.mark("display init")
+    from modules.print import display_boat_idle
+    display_boat_idle()
+    boot_profile.mark("first frame")
     
     # Start the configuration server
     pool = socketpool.SocketPool(wifi.radio)
-    server = create_server(pool)
-    if not server:
-        print("Failed to create server")
+    start_access_point()
+    portal = {
+        "state": "wifi_config",
+        "connected": False,
+        "setup_done": tasks.Event(),
+    }
+    server = PortalServer(
+        pool,
+        lambda request: handle_portal_request(portal, request),
+        lambda request, response: after_portal_response(portal, server, request, response),
+    )
+    try:
+        server.start()
+    except Exception as e:
+        log.error("Failed to create server: %s", e)
         return
 
-    print("Server running...")
+    log.info("Server running...")
+    boot_profile.mark("portal started")
+    boot_profile.report()
 
     # Determine initial state based on environment variables
     if not ssid or not password:
-        state = "wifi_config"
-        print("Starting in WiFi config mode")
-        # Show boat idle display during WiFi configuration
-        display_boat_idle()
+        portal["state"] = "wifi_config"
+        log.info("Starting in WiFi config mode")
+        # Scan before serving, so the setup page doesn't wait on the radio
+        from modules.wifi_config import refresh_networks
+        refresh_networks()
     else:
-        state = "ferry_config"
-        print("Starting in ferry config mode")
-        # Show boat idle display during ferry configuration
-        display_boat_idle()
-
-    while True:
-        try:
-            # Wait for client connections
-            server.settimeout(1.0)  # 1 second timeout
-            try:
-                client, addr = server.accept()
-                client.setblocking(True)
-            except OSError:
-                # Timeout occurred, continue waiting
-                continue
-                
-            request_buffer = bytearray(1024)
-            bytes_received = client.recv_into(request_buffer)
-            if bytes_received > 0:
-                request = str(request_buffer[:bytes_received], "utf-8")
-                # print(f"Request: {request}")
-
-                # --- WiFi Config State ---
-                if state == "wifi_config":
-                    response = handle_wifi_config_request(request)
-                    
-                    # Send response in chunks for better mobile compatibility
-                    try:
-                        response_bytes = response.encode("utf-8")
-                        # Send in smaller chunks for mobile browsers
-                        chunk_size = 1024
-                        for i in range(0, len(response_bytes), chunk_size):
-                            chunk = response_bytes[i:i + chunk_size]
-                            client.send(chunk)
-                            time.sleep(0.01)  # Small delay between chunks
-                    except Exception as e:
-                        print(f"Error sending response: {e}")
-                        # Fallback to single send
-                        try:
-                            client.send(response.encode("utf-8"))
-                        except:
-                            pass
-                    # Check if we got the ferry config page (indicating successful WiFi connection)
-                    if "Ferry Configuration" in response or "NYC Ferry Configuration" in response:
-                        ssid = os.getenv("CIRCUITPY_WIFI_SSID", "")
-                        password = os.getenv("CIRCUITPY_WIFI_PASSWORD", "")
-                        if ssid and password:
-                            state = "ferry_config"
-                            print("Transitioning to ferry config mode")
-                            # Show boat idle display during ferry configuration
-                            display_boat_idle()
+        portal["state"] = "ferry_config"
+        log.info("Starting in ferry config mode")
 
-                # --- Ferry Config State ---
-                elif state == "ferry_config":
-                    response = handle_ferry_config(request)
-                    # print(f"Response: {response}")
-                    
-                    # Send response in chunks for better mobile compatibility
-                    try:
-                        response_bytes = response.encode("utf-8")
-                        # Send in smaller chunks for mobile browsers
-                        chunk_size = 1024
-                        for i in range(0, len(response_bytes), chunk_size):
-                            chunk = response_bytes[i:i + chunk_size]
-                            client.send(chunk)
-                            time.sleep(0.01)  # Small delay between chunks
-                    except Exception as e:
-                        print(f"Error sending response: {e}")
-                        # Fallback to single send
-                        try:
-                            client.send(response.encode("utf-8"))
-                        except:
-                            pass
-                    
-                    # Use same logic as ferry_config.py to detect successful form submission
-                    is_ferry_form_submission = False
-                    if "POST" in request:
-                        try:
-                            # Extract the body from the request (same as ferry_config.py)
-                            body = request.split("\r\n\r\n")[1]
-                            # Parse the form data
-                            params = dict(pair.split("=") for pair in body.split("&"))
-                            
-                            # URL decode the values (simplified version)
-                            route_id = params.get("route", "").replace("+", " ")
-                            stop_id = params.get("stop_id", "").replace("+", " ")
-                            headsign = params.get("headsign", "").replace("+", " ")
-                            
-                            # Same check as ferry_config.py: all three must have values
-                            is_ferry_form_submission = bool(route_id and stop_id and headsign)
-                            # print(f"Form values: route='{route_id}', stop_id='{stop_id}', headsign='{headsign}'")
-                            # print(f"Form submission detected: {is_ferry_form_submission}")
-                            
-                        except Exception as e:
-                            # print(f"Error parsing form data: {e}")
-                            pass
-                    
-                    if is_ferry_form_submission:
-                        # print("Ferry form submitted with valid data!")
-                        
-                        # Ensure the response is fully sent before any delays
-                        try:
-                            # Force the response to be sent immediately
-                            time.sleep(0.1)  # Small delay to ensure send completes
-                        except:
-                            pass
-                        
-                        # Give mobile browsers more time to receive and display the success page
-                        # Mobile browsers often need longer to process AP responses
-                        # print("Waiting 8 seconds for client to receive success page...")
-                        time.sleep(8)
-                        
-                        # Close client first
-                        try:
-                            client.close()
-                        except:
-                            pass
-                        
-                        # Stop AP
-                        try:
-                            wifi.radio.stop_ap()
-                            print("AP stopped. Setup complete.")
-                        except Exception as e:
-                            print(f"Error stopping AP: {e}")
-                        
-                        print("Connecting to WiFi for ferry data...")
-                        
-                        # Get latest WiFi credentials
-                        ssid = os.getenv("CIRCUITPY_WIFI_SSID")
-                        password = os.getenv("CIRCUITPY_WIFI_PASSWORD")
-                        
-                        try:
-                            # print(f"Attempting to connect to WiFi SSID: {ssid}")
-                            wifi.radio.connect(ssid, password)
-                            print("Connected to WiFi successfully")
-                            
-                            if has_internet():
-                                print("Internet connection confirmed")
-                                try:
-                                    server.close()
-                                    print("Server closed successfully")
-                                except Exception as e:
-                                    print(f"Error closing server: {e}")
-                                
-                                print("Starting ferry times display after WiFi connection...")
-                                display_ferry_times()
-                                return  # Exit main function
-                            else:
-                                print("No internet connection available")
-                                return
-                        except Exception as e:
-                            print(f"Failed to connect to WiFi: {e}")
-                            return
-                        
-            # Close client if we haven't already
-            try:
-                client.close()
-            except:
-                pass
-                    
-        except Exception as e:
-            print(f"Error handling request: {e}")
-            try:
-                client.close()
-            except:
-                pass
+    tasks.run(run_portal(portal, server))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
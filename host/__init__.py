@@ -0,0 +1,23 @@
+"""
+Run the clock's code on a computer instead of the MatrixPortal.
+
+host/device holds stand-ins for the CircuitPython modules the clock
+imports (wifi, socketpool, rtc, storage, displayio, board, terminalio,
+fontio and adafruit_matrixportal.matrix); the pure-Python Adafruit
+libraries come from PyPI (host/requirements.txt). host/drive.py gives the
+code a sandboxed copy of the CIRCUITPY drive, so "/settings.toml" and
+os.getenv() behave as on the board without touching the repository, and
+the headless display writes every refreshed frame out as a PNG on request.
+
+    pip install -r host/requirements.txt
+    python -m host.run --frames /tmp/frames
+
+See host/run.py for the options. host/tests runs the same way, smoke test
+included, on every push (.github/workflows/host-tests.yml):
+
+    python -m unittest discover -s host/tests -t .
+"""
+import os
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+DEVICE_DIR = os.path.join(REPO_ROOT, "host", "device")
@@ -0,0 +1 @@
+"""Host stand-in for the adafruit_matrixportal package (only .matrix is provided)."""
@@ -0,0 +1,16 @@
+"""
+Host stand-in for adafruit_matrixportal.matrix: a 64x32 headless display.
+"""
+import displayio
+
+
+class Matrix:
+    """
+    Stand-in for the RGB matrix; display is a displayio.Display whose
+    frames can be written out as PNGs (see host/device/displayio.py).
+    """
+
+    def __init__(self, *, width=64, height=32, bit_depth=2, alt_addr_pins=None,
+                 color_order="RGB", serpentine=True, tile_rows=1, rotation=0):
+        self.display = displayio.Display(width, height, bit_depth)
+        self.display.rotation = rotation
@@ -0,0 +1,41 @@
+"""
+Host stand-in for CircuitPython's board module (MatrixPortal S3 pin names).
+"""
+board_id = "adafruit_matrixportal_s3"
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+MTX_R1 = Pin("MTX_R1")
+MTX_G1 = Pin("MTX_G1")
+MTX_B1 = Pin("MTX_B1")
+MTX_R2 = Pin("MTX_R2")
+MTX_G2 = Pin("MTX_G2")
+MTX_B2 = Pin("MTX_B2")
+MTX_ADDRA = Pin("MTX_ADDRA")
+MTX_ADDRB = Pin("MTX_ADDRB")
+MTX_ADDRC = Pin("MTX_ADDRC")
+MTX_ADDRD = Pin("MTX_ADDRD")
+MTX_ADDRE = Pin("MTX_ADDRE")
+MTX_CLK = Pin("MTX_CLK")
+MTX_LAT = Pin("MTX_LAT")
+MTX_OE = Pin("MTX_OE")
+NEOPIXEL = Pin("NEOPIXEL")
+BUTTON_UP = Pin("BUTTON_UP")
+BUTTON_DOWN = Pin("BUTTON_DOWN")
+SCL = Pin("SCL")
+SDA = Pin("SDA")
+
+MTX_COMMON = {
+    "rgb_pins": (MTX_R1, MTX_G1, MTX_B1, MTX_R2, MTX_G2, MTX_B2),
+    "clock_pin": MTX_CLK,
+    "latch_pin": MTX_LAT,
+    "output_enable_pin": MTX_OE,
+}
+MTX_ADDRESS = (MTX_ADDRA, MTX_ADDRB, MTX_ADDRC, MTX_ADDRD, MTX_ADDRE)
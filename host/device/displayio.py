@@ -0,0 +1,407 @@
+"""
+Host stand-in for CircuitPython's displayio, drawing into a headless
+framebuffer.
+
+Bitmap, Palette, ColorConverter, OnDiskBitmap, TileGrid and Group behave
+like the board's (including "Layer already in a group"), and Display is
+the matrix's FramebufferDisplay: refresh() composes root_group into an
+RGB888 frame, with colors cut to the matrix's bit depth. With FRAME_DIR
+set, every refresh is also written out as frame_00001.png, frame_00002.png,
+... each LED drawn FRAME_SCALE pixels wide. Automatic refresh is modelled
+by drawing a frame whenever root_group is set while auto_refresh is on.
+"""
+import os
+import struct
+from array import array
+
+from host.png import write_png
+
+# Set by host/run.py (or a test) to dump every refreshed frame as a PNG
+FRAME_DIR = None
+FRAME_SCALE = 8
+
+# Every Display created, in order, so tests can inspect frames
+displays = []
+
+
+def _layer_free(layer):
+    if layer._in_group:
+        raise ValueError("Layer already in a group")
+
+
+class Bitmap:
+    """width x height values, each below value_count."""
+
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        if value_count <= 256:
+            self._data = bytearray(width * height)
+        else:
+            self._data = array("L", bytes(4 * width * height))
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel coordinates out of bounds")
+            return y * self.width + x
+        return key
+
+    def __getitem__(self, key):
+        return self._data[self._index(key)]
+
+    def __setitem__(self, key, value):
+        if value >= self.value_count:
+            raise ValueError(f"value must be < {self.value_count}")
+        self._data[self._index(key)] = value
+
+    def fill(self, value):
+        for i in range(len(self._data)):
+            self._data[i] = value
+
+    def blit(self, x, y, source_bitmap, *, x1=0, y1=0, x2=None, y2=None, skip_index=None):
+        x2 = source_bitmap.width if x2 is None else x2
+        y2 = source_bitmap.height if y2 is None else y2
+        for sy in range(y1, y2):
+            for sx in range(x1, x2):
+                value = source_bitmap[sx, sy]
+                tx = x + sx - x1
+                ty = y + sy - y1
+                if value != skip_index and 0 <= tx < self.width and 0 <= ty < self.height:
+                    self[tx, ty] = value
+
+    def dirty(self, x1=0, y1=0, x2=-1, y2=-1):
+        pass
+
+
+class Palette:
+    """color_count RGB888 colors, any of them transparent."""
+
+    def __init__(self, color_count, *, dither=False):
+        self._colors = [0] * color_count
+        self._transparent = [False] * color_count
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(value, int):
+            color = value & 0xFFFFFF
+        else:
+            r, g, b = value[:3]
+            color = (r << 16) | (g << 8) | b
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+    def _shade(self, value):
+        if self._transparent[value]:
+            return None
+        return self._colors[value]
+
+
+class Colorspace:
+    RGB888 = "RGB888"
+    RGB565 = "RGB565"
+    L8 = "L8"
+
+
+class ColorConverter:
+    """Pixel shader for bitmaps whose values are RGB888 colors."""
+
+    def __init__(self, *, input_colorspace=Colorspace.RGB888, dither=False):
+        self._transparent = None
+
+    def convert(self, color):
+        return color
+
+    def make_transparent(self, color):
+        self._transparent = color
+
+    def make_opaque(self, color):
+        self._transparent = None
+
+    def _shade(self, value):
+        if value == self._transparent:
+            return None
+        return value
+
+
+class OnDiskBitmap:
+    """
+    An uncompressed BMP: 1, 4 or 8-bit indexed (pixel_shader is a Palette)
+    or 24/32-bit (pixel_shader is a ColorConverter).
+    """
+
+    def __init__(self, file):
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                data = f.read()
+        else:
+            data = file.read()
+        if data[:2] != b"BM" or len(data) < 54:
+            raise ValueError("Invalid BMP file")
+        offset, header_size = struct.unpack_from("<II", data, 10)
+        width, height, _, bits, compression = struct.unpack_from("<iiHHI", data, 18)
+        colors_used = struct.unpack_from("<I", data, 46)[0]
+        if compression not in (0, 3) or bits not in (1, 4, 8, 24, 32):
+            raise ValueError("Unsupported BMP format")
+
+        top_down = height < 0
+        self.width = width
+        self.height = abs(height)
+        stride = (width * bits + 31) // 32 * 4
+        if bits <= 8:
+            count = colors_used or (1 << bits)
+            self.pixel_shader = Palette(count)
+            for i in range(count):
+                b, g, r = data[14 + header_size + i * 4:17 + header_size + i * 4]
+                self.pixel_shader[i] = (r, g, b)
+            self._data = bytearray(width * self.height)
+        else:
+            self.pixel_shader = ColorConverter()
+            self._data = array("L", bytes(4 * width * self.height))
+
+        for row in range(self.height):
+            y = row if top_down else self.height - 1 - row
+            start = offset + row * stride
+            for x in range(width):
+                if bits <= 8:
+                    bit = x * bits
+                    byte = data[start + bit // 8]
+                    value = (byte >> (8 - bits - bit % 8)) & ((1 << bits) - 1)
+                else:
+                    i = start + x * (bits // 8)
+                    value = (data[i + 2] << 16) | (data[i + 1] << 8) | data[i]
+                self._data[y * width + x] = value
+
+    def __getitem__(self, key):
+        x, y = key
+        return self._data[y * self.width + x]
+
+
+class TileGrid:
+    """A grid of tiles cut from a bitmap, drawn through pixel_shader."""
+
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None,
+                 tile_height=None, default_tile=0, x=0, y=0):
+        tile_width = bitmap.width if tile_width is None else tile_width
+        tile_height = bitmap.height if tile_height is None else tile_height
+        if bitmap.width % tile_width:
+            raise ValueError("Tile width must exactly divide bitmap width")
+        if bitmap.height % tile_height:
+            raise ValueError("Tile height must exactly divide bitmap height")
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+        self._tile_count = (bitmap.width // tile_width) * (bitmap.height // tile_height)
+        self._tiles = [default_tile] * (width * height)
+        self._in_group = False
+
+    def _index(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            return y * self.width + x
+        return key
+
+    def __getitem__(self, key):
+        return self._tiles[self._index(key)]
+
+    def __setitem__(self, key, tile):
+        if not 0 <= tile < self._tile_count:
+            raise ValueError("Tile index out of bounds")
+        self._tiles[self._index(key)] = tile
+
+
+class Group:
+    """An ordered list of TileGrids and Groups, offset and scaled together."""
+
+    def __init__(self, *, scale=1, x=0, y=0):
+        # Stored without going through the properties, which subclasses
+        # (adafruit_display_text's labels) override, as on the board
+        self._scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+        self._in_group = False
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+
+    def append(self, layer):
+        self.insert(len(self._layers), layer)
+
+    def insert(self, index, layer):
+        _layer_free(layer)
+        layer._in_group = True
+        self._layers.insert(index, layer)
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def pop(self, index=-1):
+        layer = self._layers.pop(index)
+        layer._in_group = False
+        return layer
+
+    def remove(self, layer):
+        self.pop(self._layers.index(layer))
+
+    def sort(self, key=None, reverse=False):
+        self._layers.sort(key=key, reverse=reverse)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        if self._layers[index] is layer:
+            return
+        _layer_free(layer)
+        self._layers[index]._in_group = False
+        layer._in_group = True
+        self._layers[index] = layer
+
+    def __delitem__(self, index):
+        self.pop(index)
+
+
+class Display:
+    """
+    The matrix's framebuffer display.
+
+    Args:
+        bit_depth (int): Bits per color channel the matrix shows
+    """
+
+    def __init__(self, width=64, height=32, bit_depth=6):
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.brightness = 1.0
+        self.rotation = 0
+        self.frame = bytearray(width * height * 3)
+        self.frame_count = 0
+        self._root_group = None
+        self._auto_refresh = True
+        displays.append(self)
+
+    @property
+    def root_group(self):
+        return self._root_group
+
+    @root_group.setter
+    def root_group(self, group):
+        if group is not None and group is not self._root_group:
+            _layer_free(group)
+            group._in_group = True
+        if self._root_group is not None and self._root_group is not group:
+            self._root_group._in_group = False
+        self._root_group = group
+        if self._auto_refresh:
+            self.refresh()
+
+    @property
+    def auto_refresh(self):
+        return self._auto_refresh
+
+    @auto_refresh.setter
+    def auto_refresh(self, value):
+        self._auto_refresh = value
+        if value:
+            self.refresh()
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        """Draw root_group into the frame (and FRAME_DIR, if set)."""
+        pixels = [0] * (self.width * self.height)
+        if self._root_group is not None and self.brightness > 0:
+            self._draw(self._root_group, 0, 0, 1, pixels)
+
+        shift = 8 - self.bit_depth
+        top = (1 << self.bit_depth) - 1
+        frame = self.frame
+        for i, color in enumerate(pixels):
+            frame[i * 3] = ((color >> 16 & 0xFF) >> shift) * 255 // top
+            frame[i * 3 + 1] = ((color >> 8 & 0xFF) >> shift) * 255 // top
+            frame[i * 3 + 2] = ((color & 0xFF) >> shift) * 255 // top
+        self.frame_count += 1
+        if FRAME_DIR is not None:
+            self.save_png(os.path.join(FRAME_DIR, f"frame_{self.frame_count:05d}.png"))
+        return True
+
+    def pixel(self, x, y):
+        """The last frame's color at (x, y) as 0xRRGGBB."""
+        i = (y * self.width + x) * 3
+        return (self.frame[i] << 16) | (self.frame[i + 1] << 8) | self.frame[i + 2]
+
+    def save_png(self, path, scale=None):
+        """Write the last frame to path."""
+        write_png(path, self.width, self.height, self.frame, FRAME_SCALE if scale is None else scale)
+
+    def _draw(self, layer, origin_x, origin_y, scale, pixels):
+        if layer.hidden:
+            return
+        x0 = origin_x + layer.x * scale
+        y0 = origin_y + layer.y * scale
+        if isinstance(layer, Group):
+            for child in layer._layers:
+                self._draw(child, x0, y0, scale * layer._scale, pixels)
+            return
+
+        bitmap = layer.bitmap
+        shade = layer.pixel_shader._shade
+        tile_width = layer.tile_width
+        tile_height = layer.tile_height
+        per_row = bitmap.width // tile_width
+        for ty in range(layer.height):
+            for tx in range(layer.width):
+                tile = layer._tiles[ty * layer.width + tx]
+                source_x = (tile % per_row) * tile_width
+                source_y = (tile // per_row) * tile_height
+                for py in range(tile_height):
+                    for px in range(tile_width):
+                        sx = tile_width - 1 - px if layer.flip_x else px
+                        sy = tile_height - 1 - py if layer.flip_y else py
+                        if layer.transpose_xy:
+                            sx, sy = sy, sx
+                        color = shade(bitmap[source_x + sx, source_y + sy])
+                        if color is None:
+                            continue
+                        left = x0 + (tx * tile_width + px) * scale
+                        top = y0 + (ty * tile_height + py) * scale
+                        for y in range(max(top, 0), min(top + scale, self.height)):
+                            for x in range(max(left, 0), min(left + scale, self.width)):
+                                pixels[y * self.width + x] = color
+
+
+def release_displays():
+    displays.clear()
@@ -0,0 +1,33 @@
+"""
+Host stand-in for CircuitPython's fontio module.
+"""
+from collections import namedtuple
+
+Glyph = namedtuple("Glyph", ("bitmap", "tile_index", "width", "height", "dx", "dy", "shift_x", "shift_y"))
+
+
+class FontProtocol:
+    """Only used in type hints by adafruit_display_text."""
+
+
+class BuiltinFont:
+    """
+    A font whose glyphs are all in memory.
+
+    Args:
+        glyphs (dict): code point -> Glyph
+        bounding_box (tuple): (width, height, x offset, y offset)
+    """
+
+    def __init__(self, glyphs, bounding_box, ascent=None, descent=None):
+        self._glyphs = glyphs
+        self._bounding_box = bounding_box
+        if ascent is not None:
+            self.ascent = ascent
+            self.descent = descent
+
+    def get_bounding_box(self):
+        return self._bounding_box
+
+    def get_glyph(self, codepoint):
+        return self._glyphs.get(codepoint)
@@ -0,0 +1,60 @@
+"""
+Host stand-in for CircuitPython's rtc module: an in-memory clock.
+
+Like the board's RTC it holds local wall-clock time with no time zone and
+starts at 2000-01-01 00:00:00 on power-on, and it keeps ticking with the
+host's monotonic clock. install() makes time.time() and time.localtime()
+read it, as they do on the board. set_time() and advance() let a run or a
+test put the clock anywhere (e.g. just before a daylight saving change).
+"""
+import calendar
+import time
+
+POWER_ON_TIME = 946684800  # 2000-01-01 00:00:00
+
+_monotonic = time.monotonic
+_gmtime = time.gmtime
+_offset = POWER_ON_TIME - _monotonic()
+
+
+def now():
+    """The clock's current time as seconds since 1970."""
+    return int(_offset + _monotonic())
+
+
+def set_time(seconds):
+    """Set the clock to seconds since 1970 (local time, no time zone)."""
+    global _offset
+    _offset = seconds - _monotonic()
+
+
+def advance(seconds):
+    """Move the clock forward (or back, if negative)."""
+    global _offset
+    _offset += seconds
+
+
+def localtime(seconds=None):
+    """time.localtime() on the board: no time zone is applied."""
+    return _gmtime(now() if seconds is None else seconds)
+
+
+def install():
+    """Make time.time() and time.localtime() read this clock."""
+    time.time = now
+    time.localtime = localtime
+    time.mktime = lambda struct: calendar.timegm(tuple(struct))
+
+
+class RTC:
+    """Stand-in for rtc.RTC()."""
+
+    calibration = 0
+
+    @property
+    def datetime(self):
+        return localtime()
+
+    @datetime.setter
+    def datetime(self, value):
+        set_time(calendar.timegm(tuple(value)))
@@ -0,0 +1,81 @@
+"""
+Host stand-in for CircuitPython's socketpool module, on real host sockets.
+
+Sockets are the host's own socket.socket, which already has the board's
+method names (recv_into, send, settimeout, setblocking, ...), so ssl and
+adafruit_connection_manager wrap them as usual. Addresses pass through
+route(): the portal's access point address becomes localhost, with ports
+below 1024 moved up by PORT_OFFSET so no root is needed (port 80 -> 8080),
+and tests can redirect a host name to a local stub server.
+"""
+import socket as _socket
+
+AP_ADDRESS = "192.168.4.1"
+PORT_OFFSET = 8000
+
+# host or (host, port) -> (host, port) or host; see add_route()
+routes = {}
+
+
+def add_route(address, to):
+    """
+    Redirect connections: address is a host name or (host, port); to is a
+    host or (host, port). The most specific route wins.
+    """
+    routes[address] = to
+
+
+def route(host, port):
+    """Where the host side of a socket to (host, port) really goes."""
+    to = routes.get((host, port), routes.get(host))
+    if to is None and host == AP_ADDRESS:
+        to = ("127.0.0.1", port + PORT_OFFSET if port < 1024 else port)
+    if to is None:
+        return host, port
+    if isinstance(to, tuple):
+        return to
+    return to, port
+
+
+class Socket(_socket.socket):
+    """A host socket whose addresses go through route()."""
+
+    def bind(self, address):
+        if self.type == _socket.SOCK_STREAM:
+            self.setsockopt(_socket.SOL_SOCKET, _socket.SO_REUSEADDR, 1)
+        super().bind(route(*address))
+
+    def connect(self, address):
+        super().connect(route(*address))
+
+    def sendto(self, data, *args):
+        *flags, address = args
+        return super().sendto(data, *flags, route(*address))
+
+
+class SocketPool:
+    """Stand-in for socketpool.SocketPool(radio)."""
+
+    AF_INET = _socket.AF_INET
+    SOCK_STREAM = _socket.SOCK_STREAM
+    SOCK_DGRAM = _socket.SOCK_DGRAM
+    SOCK_RAW = _socket.SOCK_RAW
+    IPPROTO_IP = _socket.IPPROTO_IP
+    IPPROTO_TCP = _socket.IPPROTO_TCP
+    IPPROTO_UDP = _socket.IPPROTO_UDP
+    SOL_SOCKET = _socket.SOL_SOCKET
+    SO_REUSEADDR = _socket.SO_REUSEADDR
+    TCP_NODELAY = _socket.TCP_NODELAY
+    EAI_NONAME = _socket.EAI_NONAME
+    gaierror = _socket.gaierror
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def socket(self, family=AF_INET, type=SOCK_STREAM, proto=0):
+        return Socket(family, type, proto)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """IPv4 only, like the board; routed hosts resolve to their target."""
+        host, port = route(host, port)
+        return _socket.getaddrinfo(host, port, _socket.AF_INET, type, proto, flags)
@@ -0,0 +1,12 @@
+"""
+Host stand-in for CircuitPython's storage module, over the simulated drive
+(host/drive.py).
+"""
+from host import drive
+
+
+def remount(mount_path, readonly=False, *, disable_concurrent_write_protection=False):
+    """Make the drive writable (or read-only again) for the code."""
+    if mount_path != "/":
+        raise OSError(19, "No such device")
+    drive.current.readonly = readonly
@@ -0,0 +1,35 @@
+"""
+Host stand-in for CircuitPython's terminalio module.
+
+The board's built-in terminal font is not available off the board, so
+FONT is the repository's MatrixChunky8 BDF (all of its glyphs) instead;
+text in it is a little narrower than on the board.
+"""
+import os
+
+import displayio
+import fontio
+
+from host import REPO_ROOT
+from tools.build_font import parse_bdf
+
+FONT_PATH = os.path.join(REPO_ROOT, "fonts", "MatrixChunky8.bdf")
+
+
+def load_bdf(path):
+    """A fontio.BuiltinFont with every glyph of a BDF font."""
+    glyphs, bounding_box, ascent, descent = parse_bdf(path)
+    font_glyphs = {}
+    for codepoint, glyph in glyphs.items():
+        width, height, dx, dy = glyph["bbx"]
+        shift_x, shift_y = glyph.get("shift", (width, 0))
+        bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+        for y, row in enumerate(glyph["rows"][:height]):
+            for x in range(width):
+                if row[x >> 3] & (0x80 >> (x & 7)):
+                    bitmap[x, y] = 1
+        font_glyphs[codepoint] = fontio.Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+    return fontio.BuiltinFont(font_glyphs, bounding_box, ascent, descent)
+
+
+FONT = load_bdf(FONT_PATH)
@@ -0,0 +1,67 @@
+"""
+Host stand-in for CircuitPython's wifi module.
+
+The radio "joins" any network (or only those in `passwords`, if set) and
+its sockets are the host's own (see socketpool.py). The access point
+address is what the portal binds to; socketpool maps it onto localhost.
+"""
+# What ping() reports (seconds); the host's own network is not measured
+PING_TIME = 0.001
+
+
+class Network:
+    """One scan result."""
+
+    def __init__(self, ssid, rssi=-50, channel=6):
+        self.ssid = ssid
+        self.rssi = rssi
+        self.channel = channel
+
+
+class Radio:
+    """The class name matters: adafruit_connection_manager checks it."""
+
+    def __init__(self):
+        self.enabled = True
+        self.hostname = "commute-clock"
+        self.connected = False
+        self.ap_active = False
+        self.ap_info = None
+        self.ipv4_address = None
+        self.ipv4_address_ap = None
+        # What start_scanning_networks() finds
+        self.networks = [Network("HostNet"), Network("Neighbors", -80, 11)]
+        # ssid -> password; when empty every connect() succeeds
+        self.passwords = {}
+
+    def connect(self, ssid, password="", *, channel=0, bssid=None, timeout=None):
+        if not ssid:
+            raise ConnectionError("No network with that ssid")
+        if self.passwords and self.passwords.get(ssid) != password:
+            raise ConnectionError("Authentication failure")
+        self.connected = True
+        self.ipv4_address = "127.0.0.1"
+        self.ap_info = Network(ssid)
+
+    def start_ap(self, ssid, password="", *, channel=1, authmode=(), max_connections=4):
+        self.ap_active = True
+        self.ipv4_address_ap = "192.168.4.1"
+
+    def stop_ap(self):
+        self.ap_active = False
+        self.ipv4_address_ap = None
+
+    def start_scanning_networks(self, *, start_channel=1, stop_channel=11):
+        return iter(list(self.networks))
+
+    def stop_scanning_networks(self):
+        pass
+
+    def ping(self, ip, *, timeout=0.5):
+        """Round trip in seconds, or None when not connected."""
+        if not self.connected:
+            return None
+        return PING_TIME
+
+
+radio = Radio()
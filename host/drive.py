@@ -0,0 +1,189 @@
+"""
+Sandboxed CIRCUITPY drive for the host simulator.
+
+The clock's code reads and writes absolute paths ("/settings.toml",
+"/modules/HTML/...") and reads its settings with os.getenv(), which on the
+board parses settings.toml. A Drive is a directory standing in for the
+drive: the code, images and fonts are symlinked from the repository, and
+settings.toml / secrets.toml are copies, so setup pages that rewrite the
+settings never touch the repository's files. install() points open(),
+os.stat(), os.listdir(), os.remove() and os.getenv() at it.
+
+Like the board's drive it starts read-only to the code; storage.remount()
+(host/device/storage.py) flips Drive.readonly.
+"""
+import builtins
+import errno
+import os
+import shutil
+
+from host import REPO_ROOT
+
+# Repository entries linked onto the simulated drive
+DEVICE_FILES = ("code.py", "boot_out.txt", "modules", "boats", "fonts", "sd", "timetable.bin")
+# Copied rather than linked, since the setup pages rewrite them
+SETTINGS_FILES = ("settings.toml", "secrets.toml")
+
+# The installed drive; host/device/storage.py remounts it
+current = None
+
+_builtin_open = builtins.open
+
+
+def parse_settings(text):
+    """
+    Top-level KEY = value pairs of a settings.toml, as os.getenv() on the
+    board returns them: quoted strings (with \\ escapes) and integers.
+    """
+    settings = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("["):
+            break  # The board ignores everything after the first table
+        key, equals, value = line.partition("=")
+        if not equals:
+            continue
+        key = key.strip()
+        value = value.strip()
+        if value[:1] in ("'", '"'):
+            value = _parse_string(value)
+            if value is not None:
+                settings[key] = value
+        else:
+            value = value.split("#", 1)[0].strip()
+            try:
+                settings[key] = int(value, 0)
+            except ValueError:
+                pass
+    return settings
+
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+
+def _parse_string(value):
+    """The contents of a quoted TOML string, or None if it is not closed."""
+    quote = value[0]
+    out = []
+    i = 1
+    while i < len(value):
+        char = value[i]
+        if char == quote:
+            return "".join(out)
+        if char == "\\" and quote == '"' and i + 1 < len(value):
+            i += 1
+            char = value[i]
+            if char == "u" and i + 4 < len(value):
+                out.append(chr(int(value[i + 1:i + 5], 16)))
+                i += 5
+                continue
+            char = _ESCAPES.get(char, char)
+        out.append(char)
+        i += 1
+    return None
+
+
+class Drive:
+    """
+    A directory standing in for the CIRCUITPY drive.
+
+    Args:
+        root (str): Directory holding the drive's files
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.readonly = True
+
+    def path(self, path, create=False):
+        """
+        Host path for a path as the clock's code names it: "/settings.toml"
+        and "/modules/..." are on the drive, "/usr/..." is the host's. With
+        create, any "/name" is on the drive (a new file in its root).
+        """
+        if isinstance(path, str) and path.startswith("/") and not self.contains(path):
+            relative = path.lstrip("/")
+            first = relative.split("/", 1)[0]
+            if os.path.lexists(os.path.join(self.root, first)) or (create and "/" not in relative):
+                return os.path.join(self.root, relative)
+        return path
+
+    def open(self, file, mode="r", *args, **kwargs):
+        path = self.path(file, create=any(flag in mode for flag in "wax"))
+        if self.readonly and any(flag in mode for flag in "wax+") and self.contains(path):
+            raise OSError(errno.EROFS, "Read-only filesystem")
+        return _builtin_open(path, mode, *args, **kwargs)
+
+    def contains(self, path):
+        """True if a host path is on the drive."""
+        if not isinstance(path, str):
+            return False
+        path = os.path.abspath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def settings(self):
+        """settings.toml as a dict (empty if there is none)."""
+        try:
+            with _builtin_open(os.path.join(self.root, "settings.toml"), encoding="utf-8") as file:
+                return parse_settings(file.read())
+        except OSError:
+            return {}
+
+    def getenv(self, key, default=None):
+        """
+        os.getenv() as on the board: settings.toml, read on every call. Keys
+        it does not set fall back to the host environment, so a run can be
+        pointed elsewhere (e.g. a stub API server) from the shell.
+        """
+        value = self.settings().get(key)
+        if value is not None:
+            return value
+        return os.environ.get(key, default)
+
+
+def create(root, settings=None, secrets=None, repo=REPO_ROOT):
+    """
+    Fill root with a simulated drive and return it.
+
+    Args:
+        settings (str): settings.toml to start from (default: the repository's)
+        secrets (str): secrets.toml to start from (default: the repository's, if any)
+    """
+    os.makedirs(root, exist_ok=True)
+    for name in DEVICE_FILES:
+        source = os.path.join(repo, name)
+        target = os.path.join(root, name)
+        if os.path.exists(source) and not os.path.lexists(target):
+            os.symlink(source, target)
+    for name, source in zip(SETTINGS_FILES, (settings, secrets)):
+        if source is None:
+            source = os.path.join(repo, name)
+        target = os.path.join(root, name)
+        if os.path.exists(source) and not os.path.exists(target):
+            shutil.copyfile(source, target)
+    return Drive(root)
+
+
+def _wrap_path_function(name):
+    function = getattr(os, name)
+
+    def wrapper(path, *args, **kwargs):
+        mapped = current.path(path)
+        if name == "remove" and current.readonly and current.contains(mapped):
+            raise OSError(errno.EROFS, "Read-only filesystem")
+        return function(mapped, *args, **kwargs)
+
+    setattr(os, name, wrapper)
+
+
+def install(drive):
+    """Route file access and os.getenv() through drive and make it the working directory."""
+    global current
+    current = drive
+    builtins.open = drive.open
+    for name in ("stat", "listdir", "remove"):
+        _wrap_path_function(name)
+    os.getenv = drive.getenv
+    os.chdir(drive.root)
@@ -0,0 +1,55 @@
+"""
+Minimal PNG writer (and reader) for frames from the headless display (no PIL needed).
+"""
+import struct
+import zlib
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(width, height, rgb, scale=1):
+    """
+    PNG bytes for an RGB888 image.
+
+    Args:
+        rgb (bytes): width * height * 3 bytes, top row first
+        scale (int): Draw every pixel as a scale x scale block
+    """
+    rows = bytearray()
+    stride = width * 3
+    for y in range(height):
+        row = rgb[y * stride:(y + 1) * stride]
+        if scale > 1:
+            row = b"".join(row[x:x + 3] * scale for x in range(0, stride, 3))
+        rows += (b"\0" + bytes(row)) * scale  # filter type 0 (none) per row
+    header = struct.pack(">IIBBBBB", width * scale, height * scale, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(bytes(rows), 9)) + _chunk(b"IEND", b""))
+
+
+def write_png(path, width, height, rgb, scale=1):
+    """Write an RGB888 image to path as a PNG."""
+    with open(path, "wb") as file:
+        file.write(encode_png(width, height, rgb, scale))
+
+
+def read_png(path):
+    """
+    (width, height, rgb) of a PNG written by write_png.
+
+    Only the layout write_png produces (8-bit RGB, one IDAT chunk, no row
+    filters) is understood.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    width, height = struct.unpack(">II", data[16:24])
+    length = struct.unpack(">I", data[33:37])[0]
+    rows = zlib.decompress(data[41:41 + length])
+    stride = width * 3
+    rgb = bytearray()
+    for y in range(height):
+        start = y * (stride + 1) + 1
+        rgb += rows[start:start + stride]
+    return width, height, bytes(rgb)
@@ -0,0 +1,109 @@
+"""
+Run the clock's code.py on this computer under the host stand-ins.
+
+    python -m host.run [--settings FILE] [--secrets FILE] [--drive DIR]
+                       [--frames DIR] [--scale N] [--rtc boot|now|SECONDS]
+                       [--route NAME=HOST[:PORT] ...] [--no-asyncio] [entry]
+
+The drive is a temporary directory unless --drive names one to keep. The
+setup portal listens on http://127.0.0.1:8080/ (the access point's port
+80 moved up by socketpool.PORT_OFFSET). --rtc boot starts the clock at
+2000-01-01 like a freshly powered board, now at New York's current time.
+Settings missing from settings.toml fall back to the environment, e.g.
+TRANSITLAND_API_BASE for a local stub server. --route redirects the
+clock's connections to a host name, e.g. pool.ntp.org=127.0.0.1 to keep
+SNTP from resetting a fixed --rtc. --no-asyncio hides asyncio, like a
+board without the library in /lib.
+"""
+import argparse
+import os
+import runpy
+import sys
+import tempfile
+import time
+
+from host import DEVICE_DIR, REPO_ROOT, drive
+
+
+def setup(drive_root, settings=None, secrets=None, frames=None, scale=8, rtc_time="boot",
+          routes=None, no_asyncio=False):
+    """
+    Install the stand-ins over a simulated drive in drive_root.
+
+    routes maps host names to where their connections really go; see
+    host/device/socketpool.py add_route(). no_asyncio makes importing
+    asyncio fail, so it must be set before anything has imported it.
+
+    Returns:
+        host.drive.Drive: The installed drive
+    """
+    sandbox = drive.create(drive_root, settings, secrets)
+    for path in (REPO_ROOT, sandbox.root, DEVICE_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+
+    import displayio
+    import rtc
+    import socketpool
+
+    for name, to in (routes or {}).items():
+        socketpool.add_route(name, to)
+
+    if frames:
+        os.makedirs(frames, exist_ok=True)
+        displayio.FRAME_DIR = os.path.abspath(frames)
+    displayio.FRAME_SCALE = scale
+
+    if rtc_time == "now":
+        from modules.ntp import utc_offset
+        utc = int(time.time())
+        rtc.set_time(utc + utc_offset(utc))
+    elif rtc_time != "boot":
+        rtc.set_time(int(rtc_time))
+    rtc.install()
+
+    if no_asyncio:
+        sys.modules["asyncio"] = None
+
+    drive.install(sandbox)
+    return sandbox
+
+
+def run(entry="code.py"):
+    """Run an entry point from the drive as __main__."""
+    runpy.run_path(drive.current.path(entry) if entry.startswith("/") else entry, run_name="__main__")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("entry", nargs="?", default="code.py", help="file on the drive to run")
+    parser.add_argument("--settings", help="settings.toml to start from (default: the repository's)")
+    parser.add_argument("--secrets", help="secrets.toml to start from (default: the repository's)")
+    parser.add_argument("--drive", help="directory to build the drive in and keep")
+    parser.add_argument("--frames", help="write every display refresh here as a PNG")
+    parser.add_argument("--scale", type=int, default=8, help="PNG pixels per LED")
+    parser.add_argument("--rtc", default="boot", help="boot, now or seconds since 1970 (local time)")
+    parser.add_argument("--route", action="append", default=[], metavar="NAME=HOST[:PORT]",
+                        help="send connections to NAME to HOST (and PORT) instead")
+    parser.add_argument("--no-asyncio", action="store_true", help="run as if /lib had no asyncio")
+    args = parser.parse_args()
+
+    routes = {}
+    for route in args.route:
+        name, _, to = route.partition("=")
+        host, _, port = to.partition(":")
+        routes[name] = (host, int(port)) if port else host
+
+    frames = os.path.abspath(args.frames) if args.frames else None
+    with tempfile.TemporaryDirectory(prefix="circuitpy-") as temporary:
+        setup(args.drive or temporary, args.settings, args.secrets, frames, args.scale, args.rtc,
+              routes, args.no_asyncio)
+        try:
+            run(args.entry)
+        except KeyboardInterrupt:
+            print("Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Tests that run on this computer, under the host stand-ins.
+
+    pip install -r host/requirements.txt
+    python -m unittest discover -s host/tests -t .
+
+Run them from the repository root. Modules that need the simulated drive
+call host.run.setup() themselves.
+"""
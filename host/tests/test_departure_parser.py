@@ -0,0 +1,104 @@
+"""The streaming departures parser (modules/departure_parser.py), checked against json.loads."""
+import json
+import unittest
+
+from host.transitland_stub import synthetic_payload
+from modules.departure_parser import DepartureParser
+
+STOP = "s-dr5rubz42m-hunterspointsouth"
+NOON = 12 * 3600
+DATE = "2024-06-03"
+# 1 splits every token, including \uXXXX escapes and surrogate pairs
+CHUNK_SIZES = (1, 3, 7, 64, 512, 1 << 20)
+
+
+def parse(payload, filters, limit, chunk_size):
+    parser = DepartureParser(filters, limit)
+    for start in range(0, len(payload), chunk_size):
+        if parser.feed(payload, start, min(start + chunk_size, len(payload))):
+            break
+    return parser.departures
+
+
+def expected(payload, filters, limit):
+    """What the parser should find: the first `limit` matches in the body, by scheduled time."""
+    found = {key: [] for key in filters}
+    for stop in json.loads(payload)["stops"]:
+        for departure in stop["departures"]:
+            key = (departure["trip"]["trip_headsign"], departure["trip"]["route"]["onestop_id"])
+            times = departure["departure"]
+            if key in found and len(found[key]) < limit:
+                found[key].append((times["scheduled"], times["estimated"]))
+    return {key: sorted(matches, key=lambda match: match[0]) for key, matches in found.items()}
+
+
+def departure(headsign, route, scheduled, estimated):
+    return {
+        "departure": {"scheduled": scheduled, "estimated": estimated, "delay": None},
+        "stop": {"onestop_id": "s-decoy", "stop_name": "Decoy"},
+        "trip": {
+            "trip_headsign": headsign,
+            "route": {
+                "onestop_id": route,
+                "agency": {"onestop_id": "o-decoy", "route": {"onestop_id": "r-decoy"}},
+                "trip_headsign": "Decoy",
+            },
+            "shape": {"scheduled": "00:00:00"},
+        },
+    }
+
+
+class DepartureParserTest(unittest.TestCase):
+    def check(self, payload, filters, limit):
+        want = expected(payload, filters, limit)
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size, limit=limit):
+                self.assertEqual(parse(payload, filters, limit, chunk_size), want)
+
+    def stub_filters(self, payload):
+        filters = []
+        for item in json.loads(payload)["stops"][0]["departures"]:
+            key = (item["trip"]["trip_headsign"], item["trip"]["route"]["onestop_id"])
+            if key not in filters:
+                filters.append(key)
+        return filters
+
+    def test_stub_payloads(self):
+        payload = synthetic_payload(STOP, 40, NOON, DATE)
+        filters = self.stub_filters(payload)
+        self.assertGreater(len(filters), 1)
+        for limit in (1, 3, 1000):
+            self.check(payload, filters, limit)
+        self.check(payload, filters[:1], 2)
+        self.check(payload, [("Nowhere", "r-nowhere")], 1)
+
+    def test_feed_is_in_time_order(self):
+        # The parser stops after the first matches, which is only right while
+        # departures come in time order, as TransitLand sends them
+        payload = synthetic_payload(STOP, 400, NOON, DATE)
+        times = [item["departure"]["scheduled"] for item in json.loads(payload)["stops"][0]["departures"]]
+        self.assertEqual(times, sorted(times))
+        filters = self.stub_filters(payload)
+        everything = parse(payload, filters, 1000, 512)
+        for key, matches in parse(payload, filters, 2, 512).items():
+            self.assertEqual(matches, everything[key][:2])
+
+    def test_escapes_nulls_and_nested_routes(self):
+        headsign = 'Pier "11" \\ Wall St.\n/é \U0001F6A2'
+        payload = json.dumps({"stops": [{
+            "onestop_id": STOP,
+            "departures": [
+                departure(headsign, "r-dr5rs-er", "12:00:00", None),
+                departure("Decoy", "r-dr5rs-er", "12:01:00", "12:02:00"),
+                departure(headsign, "r-dr5rs-er", "12:03:00", "12:04:30"),
+                departure(headsign, "r-other", "12:05:00", None),
+            ],
+        }]}, ensure_ascii=True).replace("/", "\\/").encode("utf-8")
+        filters = [(headsign, "r-dr5rs-er"), (headsign, "r-other")]
+        self.check(payload, filters, 5)
+        self.assertEqual(parse(payload, filters, 5, 1)[filters[0]],
+                         [("12:00:00", None), ("12:03:00", "12:04:30")])
+
+
+if __name__ == "__main__":
+    unittest.main()
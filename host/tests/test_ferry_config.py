@@ -0,0 +1,41 @@
+"""Route dropdowns on the ferry setup page (modules/ferry_config.py)."""
+import tempfile
+import unittest
+from unittest import mock
+
+from host.run import setup
+
+ROUTE = 'XX (Pier "A" & <B>)'
+
+
+class DropdownTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(self.temporary.name)
+        from modules import ferry_config
+        self.ferry_config = ferry_config
+        self.routes = mock.patch.dict(ferry_config.routes_data, {ROUTE: {
+            "id": "r-test-xx",
+            "stops": [{"stop_id": "s-test-a&b", "name": "A & <B>"}],
+            "trip_headsigns": ['Wall St./"Pier" 11'],
+        }})
+        self.routes.start()
+        ferry_config._ferry_index = None
+        ferry_config._fragments.clear()
+
+    def tearDown(self):
+        self.routes.stop()
+        self.ferry_config._ferry_index = None
+        self.ferry_config._fragments.clear()
+        self.temporary.cleanup()
+
+    def test_names_are_escaped(self):
+        route_html, stop_html, headsign_html = self.ferry_config.dropdowns("XX")
+        self.assertIn(b'>XX (Pier &quot;A&quot; &amp; &lt;B&gt;)</option>', route_html)
+        self.assertEqual(stop_html, b'<option value="a&amp;b">A &amp; &lt;B&gt;</option>')
+        self.assertEqual(headsign_html,
+                         b'<option value="Wall St./&quot;Pier&quot; 11">Wall St./&quot;Pier&quot; 11</option>')
+
+
+if __name__ == "__main__":
+    unittest.main()
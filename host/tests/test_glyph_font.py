@@ -0,0 +1,30 @@
+"""Compiled glyph fonts (modules/glyph_font.py)."""
+import tempfile
+import unittest
+
+from host.run import setup
+
+
+class GlyphFontTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(self.temporary.name)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_missing_glyphs_come_from_terminalio(self):
+        import terminalio
+        from modules.glyph_font import get_font, load_font
+
+        font = get_font()
+        compiled = load_font()
+        # "Astoria" is not in the compiled subset
+        for char in "stz":
+            self.assertIsNone(compiled.get_glyph(ord(char)))
+            self.assertIs(font.get_glyph(ord(char)), terminalio.FONT.get_glyph(ord(char)))
+        self.assertIsNot(font.get_glyph(ord("F")), terminalio.FONT.get_glyph(ord("F")))
+
+
+if __name__ == "__main__":
+    unittest.main()
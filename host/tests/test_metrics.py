@@ -0,0 +1,97 @@
+"""The /metrics server (modules/metrics.py) on host sockets."""
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from host.run import setup
+
+# How long the slow client waits before sending its request (seconds)
+STALL = 0.8
+
+
+def scrape(port, path=b"/metrics", stall=0):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        time.sleep(stall)
+        client.sendall(b"GET " + path + b" HTTP/1.1\r\nHost: clock\r\n\r\n")
+        chunks = []
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+
+class CounterTest(unittest.TestCase):
+    def test_counters_wrap_within_small_ints(self):
+        from modules import metrics
+
+        # CircuitPython allocates ints from 2**30 up; leave room for the amount added
+        self.assertLessEqual(2 * metrics.COUNTER_WRAP, 1 << 30)
+        saved = metrics.values[metrics.RECEIVED_BYTES]
+        try:
+            metrics.values[metrics.RECEIVED_BYTES] = metrics.COUNTER_WRAP - 1
+            metrics.add_received(512)
+            self.assertEqual(metrics.values[metrics.RECEIVED_BYTES], 511)
+        finally:
+            metrics.values[metrics.RECEIVED_BYTES] = saved
+
+
+class MetricsServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(cls.temporary.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temporary.cleanup()
+
+    def serve_while(self, client):
+        """Run client(port) in a thread against a MetricsServer; returns (result, loop ticks)."""
+        import socketpool
+        import wifi
+        from modules import metrics
+
+        server = metrics.MetricsServer(socketpool.SocketPool(wifi.radio), "127.0.0.1", 0)
+        server.start()
+        port = server.socket.getsockname()[1]
+        result = []
+        ticks = []
+
+        async def run():
+            task = asyncio.create_task(server.serve())
+            thread = threading.Thread(target=lambda: result.append(client(port)))
+            thread.start()
+            while True:
+                ticks.append(time.monotonic())
+                if not thread.is_alive():
+                    break
+                await asyncio.sleep(0.01)
+            server.stop()
+            await task
+
+        asyncio.run(run())
+        return result[0], ticks
+
+    def test_scrape(self):
+        body, _ = self.serve_while(scrape)
+        self.assertTrue(body.startswith(b"HTTP/1.1 200 OK"))
+        self.assertIn(b"clock_http_responses{status=\"200\"}", body)
+
+    def test_other_paths_not_found(self):
+        body, _ = self.serve_while(lambda port: scrape(port, b"/"))
+        self.assertTrue(body.startswith(b"HTTP/1.1 404"))
+
+    def test_slow_client_does_not_block_the_loop(self):
+        body, ticks = self.serve_while(lambda port: scrape(port, stall=STALL))
+        self.assertTrue(body.startswith(b"HTTP/1.1 200 OK"))
+        # Ticks kept coming while the server waited for the request
+        longest = max(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+        self.assertLess(longest, STALL / 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""SNTP clock sync (modules/ntp.py) against a local UDP server."""
+import asyncio
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from host.run import setup
+
+# How long the server waits before replying (seconds)
+REPLY_DELAY = 0.5
+# 2024-06-03 16:00 UTC in NTP seconds
+NTP_SECONDS = 1717430400 + 2208988800
+
+
+def serve_one(server, delay):
+    data, address = server.recvfrom(48)
+    time.sleep(delay)
+    reply = bytearray(48)
+    reply[0] = 0x1C  # version 3, mode 4 (server)
+    reply[1] = 2     # stratum
+    struct.pack_into("!II", reply, 40, NTP_SECONDS, 0)
+    server.sendto(reply, address)
+
+
+class UnreachablePool:
+    """A socket pool whose DNS lookups fail, counting them."""
+
+    def __init__(self):
+        self.lookups = 0
+
+    def getaddrinfo(self, host, port):
+        self.lookups += 1
+        raise OSError("No DNS")
+
+
+class ClockSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(self.temporary.name)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_failed_sync_waits_before_retrying(self):
+        from modules.ntp import ClockSync
+
+        pool = UnreachablePool()
+        clock = ClockSync(pool)
+        self.assertFalse(clock.maintain())
+        self.assertFalse(clock.maintain())
+        self.assertEqual(pool.lookups, 1)
+        self.assertFalse(clock.is_due())
+
+        clock.retry_at = time.monotonic() - 1
+        self.assertTrue(clock.is_due())
+        clock.maintain()
+        self.assertEqual(pool.lookups, 2)
+
+    def test_async_sync_yields_while_waiting(self):
+        import socketpool
+        import wifi
+        from modules.ntp import ClockSync
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        thread = threading.Thread(target=serve_one, args=(server, REPLY_DELAY))
+        thread.start()
+        clock = ClockSync(socketpool.SocketPool(wifi.radio))
+        clock.address = server.getsockname()
+        ticks = []
+
+        async def tick():
+            while not clock.is_synced():
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        async def main():
+            ticker = asyncio.create_task(tick())
+            synced = await clock.maintain_async()
+            await ticker
+            return synced
+
+        try:
+            self.assertTrue(asyncio.run(main()))
+        finally:
+            thread.join()
+            server.close()
+        self.assertAlmostEqual(clock.utc_now(), NTP_SECONDS - 2208988800, delta=2)
+        self.assertGreater(len(ticks), REPLY_DELAY / 0.05 / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
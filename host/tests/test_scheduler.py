@@ -0,0 +1,112 @@
+"""Poll scheduling decisions (modules/scheduler.py), on a fake clock and rng."""
+import unittest
+
+from modules import scheduler
+from modules.scheduler import PollScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.jitter = 1.0
+        self.scheduler = PollScheduler(clock=self.clock, rng=lambda low, high: self.jitter)
+
+    def test_interval_bands(self):
+        interval_for = self.scheduler.interval_for
+        self.assertEqual(interval_for(None), (scheduler.IDLE_INTERVAL, "idle"))
+        self.assertEqual(interval_for(60), (scheduler.FAR_INTERVAL, "far"))
+        self.assertEqual(interval_for(15), (90, "approaching"))
+        self.assertEqual(interval_for(8), (45, "approaching"))
+        self.assertEqual(interval_for(3), (20, "near"))
+
+    def test_interval_minimum(self):
+        self.assertEqual(self.scheduler.interval_for(1, scheduler.UNSTABLE_SHIFT + 1),
+                         (scheduler.MIN_INTERVAL, "unstable"))
+        # Departing or departed: keep polling at the near rate
+        self.assertEqual(self.scheduler.interval_for(0), (20, "near"))
+        self.assertEqual(self.scheduler.interval_for(-2), (20, "near"))
+
+    def test_volatility_shortens_interval(self):
+        self.assertEqual(self.scheduler.interval_for(60, scheduler.VOLATILE_SHIFT + 1),
+                         (scheduler.FAR_INTERVAL // 2, "volatile"))
+        self.assertEqual(self.scheduler.interval_for(60, scheduler.UNSTABLE_SHIFT + 1),
+                         (scheduler.FAR_INTERVAL // 4, "unstable"))
+
+    def test_backoff_doubles_up_to_cap(self):
+        backoff_for = self.scheduler.backoff_for
+        self.assertEqual(backoff_for(0), 0)
+        self.assertEqual(backoff_for(1), scheduler.ERROR_BASE)
+        self.assertEqual(backoff_for(2), scheduler.ERROR_BASE * 2)
+        self.assertEqual(backoff_for(3), scheduler.ERROR_BASE * 4)
+        self.assertEqual(backoff_for(20), scheduler.ERROR_MAX)
+
+    def test_jitter_bounds(self):
+        calls = []
+
+        def rng(low, high):
+            calls.append((low, high))
+            return low
+
+        errors = PollScheduler(clock=self.clock, rng=rng)
+        for _ in range(5):
+            errors.record_error()
+        self.assertEqual(calls[-1], (scheduler.JITTER_LOW, 1.0))
+        self.assertEqual(errors.next_interval, int(errors.backoff_for(5) * scheduler.JITTER_LOW))
+
+        # The lowest jitter still never polls faster than MIN_INTERVAL
+        first = PollScheduler(clock=self.clock, rng=rng)
+        first.record_error()
+        self.assertEqual(first.next_interval, scheduler.MIN_INTERVAL)
+
+    def test_is_due(self):
+        self.assertTrue(self.scheduler.is_due())
+        self.scheduler.record_success(60)
+        self.assertFalse(self.scheduler.is_due())
+        self.assertTrue(self.scheduler.is_due(cache_stale=True))
+        self.clock.now += scheduler.FAR_INTERVAL
+        self.assertTrue(self.scheduler.is_due())
+
+    def test_stale_cache_does_not_cut_backoff_short(self):
+        self.scheduler.record_error()
+        self.assertFalse(self.scheduler.is_due(cache_stale=True))
+        self.clock.now += self.scheduler.next_interval
+        self.assertTrue(self.scheduler.is_due(cache_stale=True))
+
+    def test_countdown_pulls_fetch_forward(self):
+        self.scheduler.record_success(60)
+        self.clock.now += 10
+        self.scheduler.update_countdown(3)
+        self.assertEqual(self.scheduler.reason, "near")
+        self.assertEqual(self.scheduler.time_until_due(), 20)
+
+        # Never pushed back
+        self.scheduler.update_countdown(None)
+        self.assertEqual(self.scheduler.time_until_due(), 20)
+
+    def test_interval_scale_stretches_every_interval(self):
+        self.scheduler.interval_scale = 2
+        self.scheduler.record_success(60)
+        self.assertEqual(self.scheduler.time_until_due(), 2 * scheduler.FAR_INTERVAL)
+
+        # Display ticks don't pull the stretched deadline back in
+        self.scheduler.update_countdown(60)
+        self.assertEqual(self.scheduler.time_until_due(), 2 * scheduler.FAR_INTERVAL)
+
+        # Entering a denser band still pulls it forward, stretched
+        self.scheduler.update_countdown(3)
+        self.assertEqual(self.scheduler.time_until_due(), 2 * 20)
+
+        self.scheduler.record_error()
+        self.assertEqual(self.scheduler.next_interval, 2 * scheduler.ERROR_BASE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""settings.toml written by the setup pages (modules/wifi_config.py, ferry_config.py)."""
+import os
+import tempfile
+import unittest
+
+from host.run import setup
+
+SSID = 'Cafe "Sardines" \\ 2.4'
+PASSWORD = 'p"a\\ss\\"word'
+HEADSIGN = 'Wall St./"Pier" 11'
+
+
+class SettingsTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(self.temporary.name)
+
+    def tearDown(self):
+        self.temporary.cleanup()
+
+    def test_quotes_and_backslashes_round_trip(self):
+        from modules.ferry_config import write_settings as write_ferry_settings
+        from modules.wifi_config import write_settings as write_wifi_settings
+
+        self.assertTrue(write_wifi_settings(SSID, PASSWORD))
+        self.assertEqual(os.getenv("CIRCUITPY_WIFI_SSID"), SSID)
+        self.assertEqual(os.getenv("CIRCUITPY_WIFI_PASSWORD"), PASSWORD)
+
+        # The ferry page rewrites the Wi-Fi settings it read back
+        self.assertTrue(write_ferry_settings("r-dr5rs-er", "ER (East River)", "s-dr5rubz42m-hunterspointsouth",
+                                             "Hunters Point South", HEADSIGN, "teal"))
+        self.assertEqual(os.getenv("CIRCUITPY_WIFI_SSID"), SSID)
+        self.assertEqual(os.getenv("CIRCUITPY_WIFI_PASSWORD"), PASSWORD)
+        self.assertEqual(os.getenv("CIRCUITPY_FERRY_HEADSIGN"), HEADSIGN)
+        self.assertEqual(os.getenv("CIRCUITPY_FERRY_COLOR"), "teal")
+
+    def test_control_characters_rejected(self):
+        from modules.wifi_config import write_settings
+
+        with open("/settings.toml") as file:
+            before = file.read()
+        self.assertFalse(write_settings("Sardines", "line\nbreak"))
+        with open("/settings.toml") as file:
+            self.assertEqual(file.read(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
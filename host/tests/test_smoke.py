@@ -0,0 +1,138 @@
+"""
+Boot code.py under host.run against the TransitLand stub and watch it
+reach the countdown.
+
+The clock runs in a child process, as `python -m host.run` would from the
+shell, with the real time of day pinned (--rtc, the stub's now, and SNTP
+routed to a closed local port) so the run doesn't depend on when it happens.
+"""
+import calendar
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.parse
+import urllib.request
+
+from host import REPO_ROOT
+from host.png import read_png
+from host.transitland_stub import TransitlandStub
+
+PORTAL_URL = "http://127.0.0.1:8080/"
+# Noon on a Monday, local time
+RTC_TIME = calendar.timegm((2024, 6, 3, 12, 0, 0, 0, 0, 0))
+STUB_NOW = 12 * 3600
+FORM = {
+    "route": "r-dr5rs-er",
+    "stop_id": "s-dr5rubz42m-hunterspointsouth",
+    "headsign": "Wall St./Pier 11",
+}
+# LEDs from the left edge that the countdown's minutes take up
+COUNTDOWN_WIDTH = 24
+# Seconds allowed for each stage
+TIMEOUT = 20
+
+
+def wait_for(check, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = check()
+        if result:
+            return result
+        time.sleep(0.1)
+    return None
+
+
+class SmokeTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        root = self.temporary.name
+        self.frames = os.path.join(root, "frames")
+        settings = os.path.join(root, "settings.toml")
+        with open(settings, "w") as file:
+            file.write('CIRCUITPY_WIFI_SSID = "HostNet"\nCIRCUITPY_WIFI_PASSWORD = "password"\n')
+        secrets = os.path.join(root, "secrets.toml")
+        with open(secrets, "w") as file:
+            file.write('CIRCUITPY_API_KEY = "test"\n')
+        self.arguments = ["--settings", settings, "--secrets", secrets, "--frames", self.frames,
+                          "--scale", "1", "--rtc", str(RTC_TIME), "--route", "pool.ntp.org=127.0.0.1:9"]
+
+        self.stub = TransitlandStub(port=0, now=STUB_NOW, api_key="test").start()
+        self.clock = None
+
+    def tearDown(self):
+        if self.clock:
+            self.clock.kill()
+            self.clock.communicate()
+        self.stub.stop()
+        self.temporary.cleanup()
+
+    def start_clock(self, *arguments):
+        env = dict(os.environ, TRANSITLAND_API_BASE=self.stub.base_url,
+                   CIRCUITPY_METRICS_PORT="0", CIRCUITPY_LOG_CONSOLE="info")
+        self.clock = subprocess.Popen(
+            [sys.executable, "-m", "host.run", *self.arguments, *arguments],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+
+    def lit_in_countdown_area(self, name):
+        width, height, rgb = read_png(os.path.join(self.frames, name))
+        lit = 0
+        for y in range(height // 2, height):
+            for x in range(COUNTDOWN_WIDTH):
+                offset = (y * width + x) * 3
+                if any(rgb[offset:offset + 3]):
+                    lit += 1
+        return lit
+
+    def frame_files(self):
+        if not os.path.isdir(self.frames):
+            return []
+        return sorted(os.listdir(self.frames))
+
+    def portal_up(self):
+        try:
+            with urllib.request.urlopen(PORTAL_URL, timeout=2) as response:
+                return bool(response.read())
+        except OSError:
+            return False
+
+    def test_setup_to_countdown(self):
+        self.start_clock()
+        self.check_setup_to_countdown()
+
+    def test_setup_to_countdown_without_asyncio(self):
+        self.start_clock("--no-asyncio")
+        output = self.check_setup_to_countdown()
+        self.assertIn("No asyncio library", output)
+
+    def check_setup_to_countdown(self):
+        self.assertTrue(wait_for(self.portal_up), "portal never answered")
+        idle_frames = self.frame_files()
+        self.assertTrue(idle_frames, "no idle frame before setup")
+
+        form = urllib.parse.urlencode(FORM).encode("utf-8")
+        with urllib.request.urlopen(PORTAL_URL, data=form, timeout=5) as response:
+            self.assertIn(b"Settings saved", response.read())
+
+        self.assertTrue(wait_for(lambda: self.stub.log), "departures never fetched")
+        stop, status, _ = self.stub.log[0]
+        self.assertEqual((stop, status), (FORM["stop_id"], 200))
+        self.assertTrue(wait_for(lambda: len(self.frame_files()) > len(idle_frames)),
+                        "no frame after the fetch")
+
+        self.clock.terminate()
+        output, _ = self.clock.communicate(timeout=TIMEOUT)
+        self.assertIn("Starting ferry time display", output)
+        self.assertNotIn("ERROR", output)
+
+        # The idle boat leaves the bottom left dark; the countdown's minutes go there
+        self.assertEqual(self.lit_in_countdown_area(idle_frames[-1]), 0)
+        self.assertGreater(self.lit_in_countdown_area(self.frame_files()[-1]), 0)
+        return output
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Portal page assets (modules/templates.py, tools/build_assets.py)."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from host import REPO_ROOT
+from modules.http_request import Request
+from modules.templates import accepts_gzip
+from tools.build_assets import stale
+
+HTML_DIR = os.path.join(REPO_ROOT, "modules", "HTML")
+
+
+def accepts(value):
+    return accepts_gzip(Request("GET", "/", {"accept-encoding": value}))
+
+
+class TemplatesTest(unittest.TestCase):
+    def test_accept_encoding_q_values(self):
+        self.assertTrue(accepts("gzip, deflate, br"))
+        self.assertTrue(accepts("deflate;q=0.5, GZIP;q=0.8"))
+        self.assertTrue(accepts("*"))
+        self.assertFalse(accepts(""))
+        self.assertFalse(accepts("gzip;q=0"))
+        self.assertFalse(accepts("gzip; q=0.000, deflate"))
+        self.assertFalse(accepts("*, gzip;q=0"))
+        self.assertFalse(accepts("x-gzip-ish"))
+
+    def test_built_pages_match_their_sources(self):
+        self.assertEqual(stale(HTML_DIR), [], "run python tools/build_assets.py")
+
+    def test_edited_source_is_reported(self):
+        with tempfile.TemporaryDirectory() as temporary:
+            html_dir = os.path.join(temporary, "HTML")
+            shutil.copytree(HTML_DIR, html_dir)
+            with open(os.path.join(html_dir, "wifi_custom.html"), "a", encoding="utf-8") as file:
+                file.write("<p>New</p>")
+            self.assertEqual(stale(html_dir), ["wifi_custom.min.html", "wifi_custom.html.gz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
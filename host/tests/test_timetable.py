@@ -0,0 +1,62 @@
+"""Offline timetable lookups (modules/timetable.py) around midnight."""
+import calendar
+import tempfile
+import unittest
+
+from host.run import setup
+from tools.build_timetable import write
+
+STOP = "s-dr5rubz42m-hunterspointsouth"
+ROUTE = "r-dr5rs-er"
+HEADSIGN = "Wall St./Pier 11"
+EVERY_DAY = 0x7F
+
+
+def hours(h, m=0):
+    return h * 3600 + m * 60
+
+
+class TimetableTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(cls.temporary.name)
+        import storage
+
+        cls.path = "/test_timetable.bin"
+        storage.remount("/", readonly=False)
+        # GTFS service times: trips after midnight run past 24:00
+        write({f"{STOP}|{ROUTE}|{HEADSIGN}": {
+            hours(6): EVERY_DAY,
+            hours(23, 40): EVERY_DAY,
+            hours(24, 10): EVERY_DAY,
+            hours(24, 45): EVERY_DAY,
+        }}, 0, 0, cls.path)
+        storage.remount("/", readonly=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temporary.cleanup()
+
+    def next_at(self, day, hour, minute, limit=3):
+        import rtc
+        from modules.timetable import next_scheduled_departures
+
+        # June 2024: the 3rd is a Monday
+        rtc.set_time(calendar.timegm((2024, 6, day, hour, minute, 0, 0, 0, 0)))
+        return [scheduled for scheduled, _ in
+                next_scheduled_departures(STOP, HEADSIGN, ROUTE, limit, self.path)]
+
+    def test_evening_includes_tonights_trips_after_midnight(self):
+        self.assertEqual(self.next_at(3, 23, 30), ["23:40:00", "00:10:00", "00:45:00"])
+        self.assertEqual(self.next_at(3, 23, 50), ["00:10:00", "00:45:00"])
+
+    def test_after_midnight_uses_yesterdays_service(self):
+        self.assertEqual(self.next_at(4, 0, 30), ["00:45:00", "06:00:00", "23:40:00"])
+
+    def test_daytime(self):
+        self.assertEqual(self.next_at(3, 5, 0, 1), ["06:00:00"])
+
+
+if __name__ == "__main__":
+    unittest.main()
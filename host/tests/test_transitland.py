@@ -0,0 +1,131 @@
+"""Watch-list fetches (modules/transitland.py) against host/transitland_stub.py."""
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+
+from host.run import setup
+from host.transitland_stub import TransitlandStub, synthetic_payload
+
+# Three stops on the East River route, all served by the stub's synthetic payloads
+WATCH_LIST = [
+    ("s-dr5rubz42m-hunterspointsouth", "Wall St./Pier 11", "r-dr5rs-er"),
+    ("s-dr5rsyvm6u-greenpoint", "Wall St./Pier 11", "r-dr5rs-er"),
+    ("s-dr5ruc0nmp-east34thstreet", "Hunters Point South", "r-dr5rs-er"),
+]
+# Seconds the stub waits before each answer
+LATENCY = 0.5
+NOON = 12 * 3600
+
+
+class WatchListTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(cls.temporary.name)
+        cls.stub = TransitlandStub(port=0, latency=LATENCY).start()
+
+        from modules import transitland
+        cls.transitland = transitland
+        transitland.TRANSITLAND_API_BASE = cls.stub.base_url
+        transitland.api_key = ""
+        transitland.api_connection = None
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        cls.temporary.cleanup()
+
+    def setUp(self):
+        self.stub.log.clear()
+
+    def test_stops_fetched_concurrently(self):
+        started = time.monotonic()
+        results = self.transitland.fetch_watch_list(WATCH_LIST)
+        elapsed = time.monotonic() - started
+
+        for entry in WATCH_LIST:
+            self.assertTrue(results[entry], entry)
+        self.assertEqual(sorted(stop for stop, _, _ in self.stub.log),
+                         sorted(stop for stop, _, _ in WATCH_LIST))
+        self.assertTrue(all(status == 200 for _, status, _ in self.stub.log))
+        # One after the other would take at least LATENCY per stop
+        self.assertLess(elapsed, 2 * LATENCY)
+
+    def test_single_stop_does_not_block_the_loop(self):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        async def fetch():
+            task = asyncio.create_task(ticker())
+            results = await self.transitland.fetch_watch_list_async(WATCH_LIST[:1])
+            task.cancel()
+            return results
+
+        results = asyncio.run(fetch())
+        self.assertTrue(results[WATCH_LIST[0]])
+        # The other task kept running while the stub was waiting to answer
+        self.assertGreater(len(ticks), LATENCY / 0.05 / 2)
+
+
+class KeepAliveTest(unittest.TestCase):
+    """A socket goes back to the pool only when its body was read to the end."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(cls.temporary.name)
+        # A busy stop: the parser has its match long before the body ends
+        cls.stub = TransitlandStub(port=0, departures=400, now=NOON).start()
+
+        from modules import transitland
+        cls.transitland = transitland
+        transitland.TRANSITLAND_API_BASE = cls.stub.base_url
+        transitland.api_key = ""
+        transitland.api_connection = None
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.transitland.get_api_connection().reset()
+        cls.stub.stop()
+        cls.temporary.cleanup()
+
+    def setUp(self):
+        self.transitland.get_api_connection().reset()
+        self.stub.connections = 0
+
+    def fetch_twice(self, entry, limit=1):
+        stop, headsign, route = entry
+        for _ in range(2):
+            asyncio.run(self.transitland.fetch_watch_list_async([entry], limit))
+        for _ in range(2):
+            self.transitland.fetch_stop_departures(stop, [(headsign, route)], limit)
+
+    def test_early_stop_closes_the_socket(self):
+        self.fetch_twice(WATCH_LIST[0])
+        self.assertEqual(self.stub.connections, 4)
+
+    def test_stop_near_the_end_closes_the_socket(self):
+        stop, headsign, route = WATCH_LIST[0]
+        payload = json.loads(synthetic_payload(stop, self.stub.departures, NOON, "2024-06-03"))
+        matches = [departure for departure in payload["stops"][0]["departures"]
+                   if departure["trip"]["trip_headsign"] == headsign
+                   and departure["trip"]["route"]["onestop_id"] == route]
+        # Only the last match's few hundred bytes are left unread
+        self.fetch_twice(WATCH_LIST[0], len(matches) - 1)
+        self.assertEqual(self.stub.connections, 4)
+
+    def test_full_read_reuses_the_socket(self):
+        stop, _, route = WATCH_LIST[0]
+        # Nothing matches, so every body is read to the end
+        self.fetch_twice((stop, "Nowhere", route))
+        self.assertEqual(self.stub.connections, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
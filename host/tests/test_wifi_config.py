@@ -0,0 +1,62 @@
+"""Wi-Fi setup page (modules/wifi_config.py)."""
+import os
+import tempfile
+import unittest
+
+from host.run import setup
+
+
+class WifiConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory(prefix="circuitpy-")
+        setup(self.temporary.name)
+        import wifi
+        from modules import wifi_config
+        self.radio = wifi.radio
+        self.radio.connected = False
+        self.radio.passwords = {"HostNet": "right"}
+        self.wifi_config = wifi_config
+        wifi_config._networks = None
+        wifi_config._pending = None
+        wifi_config._failed = False
+
+    def tearDown(self):
+        self.radio.passwords = {}
+        self.temporary.cleanup()
+
+    def request(self, method, body=b""):
+        from modules.http_request import Request
+        response = self.wifi_config.handle_wifi_config_request(Request(method, "/", body=body))
+        return b"".join(bytes(chunk) for chunk in response.chunks)
+
+    def test_post_answers_before_connecting(self):
+        page = self.request("POST", b"wifi_name=HostNet&wifi_password=right")
+        self.assertIn(b"Connecting", page)
+        self.assertFalse(self.radio.connected)
+
+        self.assertTrue(self.wifi_config.connect_pending())
+        self.assertTrue(self.radio.connected)
+        self.assertEqual(os.getenv("CIRCUITPY_WIFI_SSID"), "HostNet")
+        self.assertFalse(self.wifi_config.connect_pending())
+
+    def test_failed_connection_shows_error_once(self):
+        self.request("POST", b"wifi_name=HostNet&wifi_password=wrong")
+        self.assertFalse(self.wifi_config.connect_pending())
+        self.assertIn(b"Unable to connect", self.request("GET"))
+        self.assertIn(b"HostNet", self.request("GET"))
+
+    def test_get_reuses_the_last_scan(self):
+        scans = []
+        start_scanning = self.radio.start_scanning_networks
+        self.radio.start_scanning_networks = lambda **kw: scans.append(1) or start_scanning(**kw)
+        try:
+            self.wifi_config.refresh_networks()
+            self.request("GET")
+            self.request("GET")
+        finally:
+            del self.radio.start_scanning_networks
+        self.assertEqual(len(scans), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,390 @@
+"""
+Local stand-in for the TransitLand departures endpoint, with fault injection.
+
+    python -m host.transitland_stub [--port 8765] [--fixtures DIR] [--record]
+                                    [--departures N] [--latency S] [--trickle BPS]
+                                    [--chunked] [--status CODE] [--fail-first N]
+                                    [--fail-every N] [--truncate BYTES] [--hangup BYTES]
+                                    [--now HH:MM]
+
+and point the clock at it (settings.toml, or the environment under host.run):
+
+    TRANSITLAND_API_BASE=http://127.0.0.1:8765/api/v2/rest python -m host.run
+
+GET .../stops/<stop>/departures answers with the recorded response in
+<fixtures>/<stop>.json if there is one. With --record, a missing fixture is
+first fetched from the real API (with the request's api_key) and saved, so
+a session can be captured once and replayed offline. Otherwise the answer
+is a synthetic payload shaped like TransitLand's: --departures departures
+from now on, for every route and headsign in modules/routes_data.py that
+serves the stop, each carrying the full set of fields the real API sends,
+so a few hundred of them make a realistic busy-stop payload. --now pins
+the time of day they start from, for runs with a fixed --rtc.
+
+Faults, all off by default, can be combined (and changed on a running
+TransitlandStub from a test):
+    latency     seconds to wait before answering
+    trickle     send the body at this many bytes per second
+    chunked     use Transfer-Encoding: chunked instead of Content-Length
+    status      error to answer with (429 adds Retry-After) on the requests
+                picked by fail_first (the first N) and fail_every (every Nth)
+    truncate    cut the JSON after this many bytes (a valid, shorter response)
+    hangup      close the connection after this many body bytes, mid-response
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.routes_data import routes_data
+
+DEPARTURES_PATH = re.compile(r"/stops/([^/?]+)/departures$")
+UPSTREAM = "https://transit.land/api/v2/rest"
+TIME_ZONE = "America/New_York"
+# Seconds between synthetic departures
+DEPARTURE_SPACING = 150
+TRICKLE_CHUNK = 64
+
+
+def service_time(seconds):
+    """GTFS "HH:MM:SS"; hours run past 24 for trips after midnight."""
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def local_now():
+    """New York wall-clock time of day (seconds) and date."""
+    try:
+        from zoneinfo import ZoneInfo
+        now = datetime.now(ZoneInfo(TIME_ZONE))
+    except ImportError:
+        now = datetime.now()
+    return now.hour * 3600 + now.minute * 60 + now.second, now.date().isoformat()
+
+
+def serving_routes(stop_onestop_id):
+    """(route name, route info) for each route calling at the stop (every route if none do)."""
+    routes = [(name, info) for name, info in routes_data.items()
+              if any(stop["stop_id"] == stop_onestop_id for stop in info.get("stops", ()))]
+    return routes or list(routes_data.items())
+
+
+def synthetic_departure(index, stop_onestop_id, route_name, route, headsign, scheduled, estimated, date):
+    """One departure with the fields TransitLand sends (mostly unused by the clock)."""
+    short_name = route_name.split(" ", 1)[0]
+    delay = None if estimated is None else estimated - scheduled
+    stop_time = {
+        "delay": delay,
+        "estimated": None if estimated is None else service_time(estimated),
+        "estimated_utc": None,
+        "scheduled": service_time(scheduled),
+        "stop_timezone": TIME_ZONE,
+        "uncertainty": None,
+    }
+    return {
+        "arrival": dict(stop_time),
+        "arrival_time": service_time(scheduled),
+        "continuous_drop_off": None,
+        "continuous_pickup": None,
+        "departure": stop_time,
+        "departure_time": service_time(scheduled),
+        "drop_off_type": None,
+        "interpolated": None,
+        "pickup_type": None,
+        "service_date": date,
+        "shape_dist_traveled": 0,
+        "stop_headsign": "",
+        "stop_sequence": index % 9 + 1,
+        "timepoint": 1,
+        "trip": {
+            "bikes_allowed": 1,
+            "block_id": f"{short_name}-{index // 8}",
+            "direction_id": route["trip_headsigns"].index(headsign) % 2,
+            "frequency": None,
+            "id": 700000 + index,
+            "route": {
+                "agency": {
+                    "agency_id": "87",
+                    "agency_name": "NYC Ferry",
+                    "id": 3391,
+                    "onestop_id": "o-dr5r-nycferry",
+                },
+                "continuous_drop_off": None,
+                "continuous_pickup": None,
+                "id": 96000 + list(routes_data).index(route_name),
+                "onestop_id": route["id"],
+                "route_color": "",
+                "route_desc": "",
+                "route_id": short_name,
+                "route_long_name": route_name,
+                "route_short_name": short_name,
+                "route_text_color": "",
+                "route_type": 4,
+                "route_url": "https://www.ferry.nyc/routes-and-schedules/",
+            },
+            "shape": {"generated": False, "shape_id": f"{short_name}_{index % 2}"},
+            "stop_pattern_id": index % 4,
+            "timestamp": None,
+            "trip_headsign": headsign,
+            "trip_id": f"{short_name}-{date}-{index:04d}",
+            "trip_short_name": "",
+            "wheelchair_accessible": 1,
+        },
+    }
+
+
+def synthetic_payload(stop_onestop_id, count, now=None, date=None):
+    """
+    JSON bytes for a departures response with count departures from now on.
+
+    Deterministic for a given stop, count and time: each departure's delay
+    comes from a generator seeded with the stop id.
+    """
+    if now is None:
+        now, date = local_now()
+    rng = random.Random(stop_onestop_id)
+    routes = serving_routes(stop_onestop_id)
+    departures = []
+    for index in range(count):
+        route_name, route = routes[index % len(routes)]
+        headsigns = route["trip_headsigns"]
+        headsign = headsigns[(index // len(routes)) % len(headsigns)]
+        scheduled = now + 60 + index * DEPARTURE_SPACING
+        estimated = None if rng.random() < 0.25 else scheduled + rng.randint(-60, 300)
+        departures.append(synthetic_departure(
+            index, stop_onestop_id, route_name, route, headsign, scheduled, estimated, date))
+    payload = {
+        "stops": [{
+            "departures": departures,
+            "feed_version": {"feed": {"id": 2091, "onestop_id": "f-nycferry~rt"}, "id": 412345},
+            "geometry": {"coordinates": [-73.96, 40.74], "type": "Point"},
+            "id": 1234567,
+            "location_type": 0,
+            "onestop_id": stop_onestop_id,
+            "stop_id": stop_onestop_id.rsplit("-", 1)[-1],
+            "stop_name": stop_onestop_id.rsplit("-", 1)[-1],
+        }],
+    }
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+class TransitlandStub:
+    """
+    The stub server, running in a background thread once start()ed.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one; see base_url)
+        fixtures (str): Directory of recorded <stop>.json responses
+        record (bool): Fetch and save missing fixtures from the real API
+        departures (int): Departures in each synthetic response
+        api_key (str): If set, answer 401 to requests without it
+        now (int): Seconds into the day synthetic departures start from
+            (default: New York's current time)
+        Other keyword arguments set the faults described in the module docstring.
+    """
+
+    def __init__(self, port=8765, fixtures=None, record=False, departures=40, api_key=None,
+                 now=None, latency=0, trickle=None, chunked=False, status=503, fail_first=0,
+                 fail_every=0, truncate=None, hangup=None):
+        self.port = port
+        self.fixtures = fixtures
+        self.record = record
+        self.departures = departures
+        self.api_key = api_key
+        self.now = now
+        self.latency = latency
+        self.trickle = trickle
+        self.chunked = chunked
+        self.status = status
+        self.fail_first = fail_first
+        self.fail_every = fail_every
+        self.truncate = truncate
+        self.hangup = hangup
+
+        self.requests = 0
+        self.connections = 0
+        # (stop, status, body bytes sent) for every request, in order
+        self.log = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        """Value for TRANSITLAND_API_BASE."""
+        return f"http://127.0.0.1:{self.port}/api/v2/rest"
+
+    def start(self):
+        self._server = _Server(("127.0.0.1", self.port), _Handler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def next_request(self):
+        """Count a request; returns True if it should fail."""
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+        if number <= self.fail_first:
+            return True
+        return bool(self.fail_every) and number % self.fail_every == 0
+
+    def body_for(self, stop_onestop_id, query):
+        """The response body for a stop: a recorded fixture or a synthetic payload."""
+        if self.fixtures:
+            path = os.path.join(self.fixtures, f"{stop_onestop_id}.json")
+            if not os.path.exists(path) and self.record:
+                os.makedirs(self.fixtures, exist_ok=True)
+                url = f"{UPSTREAM}/stops/{stop_onestop_id}/departures?{query}"
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    data = response.read()
+                with open(path, "wb") as file:
+                    file.write(data)
+            if os.path.exists(path):
+                with open(path, "rb") as file:
+                    return file.read()
+        now = date = None
+        if self.now is not None:
+            now, date = self.now, local_now()[1]
+        return synthetic_payload(stop_onestop_id, self.departures, now, date)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The clock hangs up mid-body on purpose once it has the departures it needs
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        path, _, query = self.path.partition("?")
+        match = DEPARTURES_PATH.search(path)
+        if match is None:
+            self._send_error(404, "Not found")
+            return
+        stop_onestop_id = match.group(1)
+        if stub.api_key and f"api_key={stub.api_key}" not in query:
+            self._send_error(401, "Unauthorized", stop_onestop_id)
+            return
+        if stub.next_request():
+            self._send_error(stub.status, "Injected failure", stop_onestop_id)
+            return
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        try:
+            body = stub.body_for(stop_onestop_id, query)
+        except OSError as e:
+            self._send_error(502, f"Recording failed: {e}", stop_onestop_id)
+            return
+        if stub.truncate is not None:
+            body = body[:stub.truncate]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if stub.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        sent = self._send_body(body, stub)
+        stub.log.append((stop_onestop_id, 200, sent))
+
+    def _send_body(self, body, stub):
+        """Write the body (trickled, chunked or cut short as configured); returns bytes sent."""
+        limit = len(body) if stub.hangup is None else min(stub.hangup, len(body))
+        step = TRICKLE_CHUNK if stub.trickle else 16384
+        sent = 0
+        while sent < limit:
+            piece = body[sent:min(sent + step, limit)]
+            if stub.chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            else:
+                self.wfile.write(piece)
+            self.wfile.flush()
+            sent += len(piece)
+            if stub.trickle:
+                time.sleep(len(piece) / stub.trickle)
+        if sent < len(body):
+            self.close_connection = True  # Hang up mid-body
+        elif stub.chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        return sent
+
+    def _send_error(self, status, message, stop_onestop_id=None):
+        body = json.dumps({"message": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "60")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stub.log.append((stop_onestop_id, status, len(body)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="directory of recorded <stop>.json responses")
+    parser.add_argument("--record", action="store_true", help="fetch and save missing fixtures")
+    parser.add_argument("--departures", type=int, default=40, help="departures per synthetic response")
+    parser.add_argument("--api-key", help="require this api_key")
+    parser.add_argument("--now", help="start synthetic departures from this time of day (HH:MM)")
+    parser.add_argument("--latency", type=float, default=0, help="seconds before each answer")
+    parser.add_argument("--trickle", type=int, help="send bodies at this many bytes per second")
+    parser.add_argument("--chunked", action="store_true", help="use chunked transfer encoding")
+    parser.add_argument("--status", type=int, default=503, help="status of injected failures")
+    parser.add_argument("--fail-first", type=int, default=0, help="fail the first N requests")
+    parser.add_argument("--fail-every", type=int, default=0, help="fail every Nth request")
+    parser.add_argument("--truncate", type=int, help="cut response JSON after this many bytes")
+    parser.add_argument("--hangup", type=int, help="close the connection after this many body bytes")
+    args = parser.parse_args()
+
+    now = None
+    if args.now:
+        hours, minutes = args.now.split(":")
+        now = int(hours) * 3600 + int(minutes) * 60
+    stub = TransitlandStub(
+        args.port, args.fixtures, args.record, args.departures, args.api_key, now,
+        latency=args.latency, trickle=args.trickle, chunked=args.chunked, status=args.status,
+        fail_first=args.fail_first, fail_every=args.fail_every, truncate=args.truncate,
+        hangup=args.hangup,
+    )
+    stub.start()
+    print(f"TRANSITLAND_API_BASE={stub.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
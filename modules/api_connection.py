@@ -0,0 +1,172 @@
+"""
+Keep-alive HTTPS connections to the TransitLand API.
+
+The TCP + TLS handshake is the most expensive thing the ESP32 does for a
+poll, so sockets to the API host are kept in the adafruit_connection_manager
+pool between polls and reused by both the requests session and the asyncio
+fetches. Sockets that have sat idle past the server's keep-alive window, or
+that failed during a request, are closed and reopened before the next poll
+rather than discovered dead halfway through it. Handshake and request
+latencies are recorded separately so the savings can be seen.
+
+Servers drop idle connections after about a minute, so reuse only pays off
+for polls that follow the last one within KEEP_ALIVE_TIMEOUT: the NEAR band
+of modules/scheduler.py. FAR and IDLE polls reconnect anyway. A response
+the parser stops reading early is therefore closed (close_response() here,
+and likewise in async_http.stream_get()) rather than read to the end,
+which would cost transfer time on every poll to save a handshake on only
+some of them. Only sockets whose body was read to the end are reused.
+"""
+import time
+
+import adafruit_connection_manager
+import adafruit_requests
+import wifi
+
+# Sockets are pooled per session id, so API sockets are never handed to other
+# code. The pool keeps one socket per id, so each concurrent request gets its
+# own: SESSION_ID (shared with the requests session), then "transitland-1"...
+SESSION_ID = "transitland"
+# Servers drop idle keep-alive connections after about a minute; reconnect
+# up front instead of failing on a socket that is already gone
+KEEP_ALIVE_TIMEOUT = 55
+# Seconds allowed for connecting a new socket
+CONNECT_TIMEOUT = 10
+
+
+class LatencyStats:
+    """Count, last, average and worst of a series of durations (seconds)."""
+
+    def __init__(self):
+        self.count = 0
+        self.last = 0.0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def record(self, seconds):
+        self.count += 1
+        self.last = seconds
+        self.total += seconds
+        if seconds > self.worst:
+            self.worst = seconds
+
+    def average(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __str__(self):
+        return (f"{self.count} x avg {self.average() * 1000:.0f} ms, "
+                f"last {self.last * 1000:.0f} ms, worst {self.worst * 1000:.0f} ms")
+
+
+class ApiConnection:
+    """
+    Pooled keep-alive HTTPS sockets to one host.
+
+    Args:
+        host (str): Host name, e.g. "transit.land"
+        port (int): HTTPS port
+        radio: Network interface (defaults to wifi.radio)
+        proto (str): "https:", or "http:" for a local test server
+
+    Call prepare() before each poll, then time every request with
+    request_started() / request_done(). Requests in flight at the same time
+    must each use a different entry of session_ids.
+    """
+
+    def __init__(self, host, port=443, radio=None, proto="https:"):
+        if radio is None:
+            radio = wifi.radio
+        self.host = host
+        self.port = port
+        self.proto = proto
+        self.session_ids = [SESSION_ID]  # One per concurrent request slot
+        self.pool = adafruit_connection_manager.get_radio_socketpool(radio)
+        self.ssl_context = adafruit_connection_manager.get_radio_ssl_context(radio)
+        self.connection_manager = adafruit_connection_manager.get_connection_manager(self.pool)
+        self.session = adafruit_requests.Session(self.pool, self.ssl_context, session_id=SESSION_ID)
+
+        self.handshakes = LatencyStats()
+        self.requests = LatencyStats()
+        self.reused = 0       # Polls that found a connected socket waiting
+        self.resets = 0       # Times the pooled sockets were thrown away
+        self.failures = 0     # Requests that ended with a socket error
+        self.last_used = None
+        self.healthy = True
+
+    def prepare(self, count=1):
+        """
+        Make sure `count` live sockets are ready for the coming requests.
+
+        Closes the pool if a socket failed or it has been idle too long, then
+        opens (and times) as many new connections as are missing, one for
+        each of session_ids[:count].
+        """
+        idle = self.last_used is not None and time.monotonic() - self.last_used > KEEP_ALIVE_TIMEOUT
+        if not self.healthy or idle:
+            self.reset()
+
+        while len(self.session_ids) < count:
+            self.session_ids.append(f"{SESSION_ID}-{len(self.session_ids)}")
+
+        manager = self.connection_manager
+        opened = []
+        try:
+            for session_id in self.session_ids[:count]:
+                managed = manager.managed_socket_count
+                start = time.monotonic()
+                opened.append(manager.get_socket(
+                    self.host, self.port, self.proto, session_id=session_id,
+                    timeout=CONNECT_TIMEOUT, is_ssl=self.proto == "https:",
+                    ssl_context=self.ssl_context,
+                ))
+                if manager.managed_socket_count > managed:
+                    self.handshakes.record(time.monotonic() - start)
+                else:
+                    self.reused += 1
+        except (OSError, RuntimeError):
+            self.healthy = False
+            raise
+        finally:
+            for sock in opened:
+                manager.free_socket(sock)
+
+    def close_response(self, response):
+        """
+        Close an adafruit_requests response's socket instead of pooling it.
+
+        For responses whose body wasn't read to the end: the rest is still
+        in the socket and would be read as the next response.
+        """
+        if response.socket:
+            self.connection_manager.close_socket(response.socket)
+            response.socket = None
+
+    def reset(self):
+        """Close every pooled socket; the next request reconnects."""
+        adafruit_connection_manager.connection_manager_close_all(self.pool)
+        self.resets += 1
+        self.healthy = True
+        self.last_used = None
+
+    def request_started(self):
+        return time.monotonic()
+
+    def request_done(self, started, healthy=True):
+        """
+        Record a finished request.
+
+        Args:
+            started (float): Value returned by request_started()
+            healthy (bool): False if the request failed at the socket level;
+                the pool is then rebuilt before the next poll
+        """
+        now = time.monotonic()
+        self.requests.record(now - started)
+        self.last_used = now
+        if not healthy:
+            self.failures += 1
+            self.healthy = False
+
+    def summary(self):
+        return (f"handshakes {self.handshakes}; requests {self.requests}; "
+                f"reused {self.reused}, resets {self.resets}, failures {self.failures}")
@@ -0,0 +1,194 @@
+"""
+Minimal asyncio HTTP GET for streaming several TransitLand responses at once.
+
+adafruit_requests blocks until the response headers arrive, so fetching
+several stops one after the other costs the sum of their server times. This
+module borrows sockets from the same adafruit_connection_manager pool the
+requests session uses, sends each request, then reads every response with
+non-blocking receives that yield to the other tasks while the server is
+still working. Bodies (plain or chunked) are handed to a callback straight
+out of a reusable buffer.
+"""
+import errno
+import time
+
+from modules.tasks import ASYNCIO_AVAILABLE
+
+if ASYNCIO_AVAILABLE:
+    import asyncio
+
+# Give up on a response that makes no progress for this long (seconds)
+READ_TIMEOUT = 10
+# Longest status or header line we accept
+MAX_LINE_LENGTH = 512
+
+
+class _BodySink:
+    """Pass body bytes to on_chunk, and their count to on_received."""
+
+    def __init__(self, on_chunk, on_received=None):
+        self.on_chunk = on_chunk
+        self.on_received = on_received
+
+    def __call__(self, buf, start, end):
+        """Returns True once on_chunk has everything it needs."""
+        if self.on_received is not None:
+            self.on_received(end - start)
+        return bool(self.on_chunk(buf, start, end))
+
+
+class _AsyncReader:
+    """Buffered non-blocking reader over a connected socket."""
+
+    def __init__(self, sock, size):
+        self.sock = sock
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.end = 0
+
+    def buffered(self):
+        return self.end - self.start
+
+    async def fill(self):
+        """Receive at least one more byte, yielding while the socket has none."""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buf):
+            # Move the unread tail to the front to make room
+            remaining = self.end - self.start
+            self.buf[0:remaining] = self.buf[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+
+        deadline = time.monotonic() + READ_TIMEOUT
+        while True:
+            try:
+                received = self.sock.recv_into(self.view[self.end:])
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+                if time.monotonic() > deadline:
+                    raise OSError(errno.ETIMEDOUT)
+                await asyncio.sleep(0)
+                continue
+            if not received:
+                raise OSError(errno.ECONNRESET)
+            self.end += received
+            return
+
+    async def readline(self):
+        """Return the next line (without CRLF) as bytes."""
+        while True:
+            newline = self.buf.find(b"\n", self.start, self.end)
+            if newline != -1:
+                line = bytes(self.buf[self.start:newline]).rstrip(b"\r")
+                self.start = newline + 1
+                return line
+            if self.buffered() >= MAX_LINE_LENGTH:
+                raise ValueError("HTTP line too long")
+            await self.fill()
+
+
+async def stream_get(connection_manager, ssl_context, host, path, on_chunk,
+                     session_id=None, chunk_size=512, port=443, proto="https:",
+                     on_received=None):
+    """
+    GET https://host/path (or proto//host:port/path) and pass the body to
+    on_chunk(buf, start, end).
+
+    on_chunk returns True when it has everything it needs; the socket is
+    then closed rather than read to the end of the body (see
+    api_connection.py). Only a socket whose body was read to the end goes
+    back to the pool for the next request. on_received(count), if given,
+    is told about every body byte read.
+
+    Returns:
+        int: HTTP status code
+    """
+    is_ssl = proto == "https:"
+    sock = connection_manager.get_socket(
+        host, port, proto, session_id=session_id, is_ssl=is_ssl, ssl_context=ssl_context
+    )
+    reusable = False
+    try:
+        if port != (443 if is_ssl else 80):
+            host = f"{host}:{port}"
+        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: Adafruit CircuitPython\r\n\r\n"
+        sock.send(request.encode("utf-8"))
+        sock.settimeout(0)
+
+        reader = _AsyncReader(sock, chunk_size)
+        status_line = await reader.readline()
+        status = int(status_line.split(b" ", 2)[1])
+
+        content_length = None
+        chunked = False
+        keep_alive = True
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == b"content-length":
+                content_length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value
+            elif name == b"connection":
+                keep_alive = value != b"close"
+
+        if status != 200:
+            return status
+
+        sink = _BodySink(on_chunk, on_received)
+        if chunked:
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if not size:
+                    await reader.readline()  # Blank line after the last chunk
+                    break
+                if await _deliver(reader, size, sink):
+                    return status
+                await reader.readline()  # CRLF after each chunk
+        else:
+            remaining = content_length
+            while remaining is None or remaining > 0:
+                if not reader.buffered():
+                    try:
+                        await reader.fill()
+                    except OSError:
+                        if remaining is None:
+                            break  # Body delimited by connection close
+                        raise
+                count = reader.buffered() if remaining is None else min(remaining, reader.buffered())
+                if await _deliver(reader, count, sink):
+                    return status
+                if remaining is not None:
+                    remaining -= count
+            if remaining is None:
+                keep_alive = False
+
+        reusable = keep_alive
+        return status
+    finally:
+        if reusable:
+            sock.settimeout(None)
+            connection_manager.free_socket(sock)
+        else:
+            connection_manager.close_socket(sock)
+
+
+async def _deliver(reader, count, on_chunk):
+    """Pass `count` body bytes to on_chunk; returns True if it needs no more of the body."""
+    while count > 0:
+        if not reader.buffered():
+            await reader.fill()
+        take = min(count, reader.buffered())
+        if on_chunk(reader.buf, reader.start, reader.start + take):
+            return True
+        reader.start += take
+        count -= take
+        await asyncio.sleep(0)
+    return False
@@ -0,0 +1,46 @@
+"""
+Boot-time profile: how long each import and init step takes and how much
+memory it leaves free.
+
+Import this first in code.py; that import is the "start" mark. Call mark()
+after each step and report() once the first frame is up. time.monotonic_ns()
+counts from power-on on CircuitPython, so the "total" column is the time
+from power-on to that step, including the interpreter's own boot.
+"""
+import time
+
+try:
+    from gc import collect, mem_free
+except ImportError:  # CPython (host tools), which has no heap figures
+    from gc import collect
+
+    def mem_free():
+        return -1
+
+# (step, monotonic ns, free bytes) in the order they happened
+marks = []
+
+
+def mark(step):
+    """Record that step just finished."""
+    marks.append((step, time.monotonic_ns(), mem_free()))
+
+
+def report(title="Boot profile"):
+    """Print every step with its duration, time since power-on and free memory."""
+    collect()
+    print(f"=== {title} ===")
+    print(f"{'step':<24}{'ms':>7}{'total ms':>10}{'free':>9}{'delta':>9}")
+    previous_time = None
+    previous_free = None
+    for step, timestamp, free in marks:
+        took = (timestamp - previous_time) // 1000000 if previous_time is not None else 0
+        delta = free - previous_free if previous_free is not None else 0
+        print(f"{step:<24}{took:>7}{timestamp // 1000000:>10}{free:>9}{delta:>9}")
+        previous_time = timestamp
+        previous_free = free
+    print(f"Free after collect: {mem_free()}")
+    print(f"=== END {title.upper()} ===")
+
+
+mark("start")
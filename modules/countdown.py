@@ -0,0 +1,101 @@
+"""
+Integer countdown to GTFS departure times.
+
+Departure times are GTFS "service-day seconds": seconds from noon minus 12
+hours on the day the trip's service runs, so they can be 24:00:00 or more
+for trips after midnight, and on daylight saving days they stay correct
+because they are measured from a fixed instant rather than from the wall
+clock. Countdown reads the RTC once to anchor "now" on that scale for
+yesterday's, today's and tomorrow's service day, then advances it with
+adafruit_ticks. After that, now() and seconds_until() only do small-int
+arithmetic and allocate nothing, so they can run every frame.
+"""
+import time
+
+from adafruit_ticks import ticks_diff, ticks_ms
+
+from modules.ntp import DAY_SECONDS, days_from_civil, utc_offset
+
+# Re-read the RTC this often (seconds); also keeps ticks_diff far from wrapping
+ANCHOR_INTERVAL = 3600
+HALF_DAY = 43200
+
+
+def parse_time_of_day(departure_time):
+    """Convert an "HH:MM:SS" (or "HH:MM") string to service-day seconds; hours may be >= 24."""
+    time_parts = departure_time.split(":")
+    seconds = int(time_parts[0]) * 3600 + int(time_parts[1]) * 60
+    if len(time_parts) > 2:
+        seconds += int(time_parts[2])
+    return seconds
+
+
+def service_day_start(days):
+    """UTC seconds of "noon minus 12 hours" in New York on a day (days since 1970)."""
+    noon = days * DAY_SECONDS + HALF_DAY
+    return noon - utc_offset(noon - utc_offset(noon)) - HALF_DAY
+
+
+class Countdown:
+    """
+    Seconds and minutes until service-day times, from the RTC and a tick counter.
+
+    Call anchor() after the RTC has been set (e.g. after a clock sync);
+    otherwise it re-anchors itself every ANCHOR_INTERVAL.
+    """
+
+    def __init__(self):
+        self.now_seconds = 0   # Today's service-day seconds at the anchor
+        self.yesterday = -DAY_SECONDS  # Start of yesterday's / tomorrow's service day,
+        self.tomorrow = DAY_SECONDS    # in seconds relative to today's
+        self.anchor_ticks = 0
+        self.anchor()
+
+    def anchor(self):
+        """Re-read the RTC (local New York time) and restart the tick count from it."""
+        now = time.localtime()
+        days = days_from_civil(now.tm_year, now.tm_mon, now.tm_mday)
+        local = days * DAY_SECONDS + now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+        # Offset at (about) that instant; only the repeated fall-back hour is ambiguous
+        utc = local - utc_offset(local - utc_offset(local))
+
+        today = service_day_start(days)
+        if utc < today:
+            # Just after midnight on a day whose service day starts at 1:00
+            days -= 1
+            today = service_day_start(days)
+        self.yesterday = service_day_start(days - 1) - today
+        self.tomorrow = service_day_start(days + 1) - today
+        self.now_seconds = utc - today
+        self.anchor_ticks = ticks_ms()
+
+    def now(self):
+        """Current time in today's service-day seconds."""
+        elapsed = ticks_diff(ticks_ms(), self.anchor_ticks)
+        if elapsed < 0 or elapsed >= ANCHOR_INTERVAL * 1000:
+            self.anchor()
+            elapsed = 0
+        return self.now_seconds + elapsed // 1000
+
+    def seconds_until(self, departure_seconds):
+        """
+        Seconds from now until a service-day time.
+
+        The time is read against yesterday's, today's or tomorrow's service
+        day, whichever puts it within 12 hours of now; times in the past give
+        a negative result.
+        """
+        diff = departure_seconds - self.now()
+        if diff > HALF_DAY:
+            diff += self.yesterday
+        elif diff <= -HALF_DAY:
+            diff += self.tomorrow
+        return diff
+
+    def minutes_until(self, departure_seconds):
+        """Minutes shown for a departure: whole minutes left, rounded up (0 -> 1)."""
+        return self.seconds_until(departure_seconds) // 60 + 1
+
+
+# Shared by every DepartureCache
+countdown = Countdown()
@@ -0,0 +1,310 @@
+"""
+Incremental parser for the TransitLand /stops/{id}/departures payload.
+
+Instead of building the full JSON document with response.json(), the parser is
+fed the response body a chunk at a time and only keeps the four fields the
+clock needs from each departure: trip.trip_headsign, trip.route.onestop_id,
+departure.scheduled and departure.estimated. Everything else is skipped
+without being allocated, so peak RAM stays flat however busy the stop is.
+
+TransitLand lists a stop's departures in departure time order, so the
+first `limit` matches for a filter are the next ones. The parser relies on
+that order: once every filter has its matches it stops, and the rest of the
+body is never read (see host/tests/test_departure_parser.py).
+"""
+
+# Byte values used by the scanner
+_QUOTE = 0x22      # "
+_BACKSLASH = 0x5C  # \
+_COLON = 0x3A      # :
+_COMMA = 0x2C      # ,
+_OPEN_OBJ = 0x7B   # {
+_CLOSE_OBJ = 0x7D  # }
+_OPEN_ARR = 0x5B   # [
+_CLOSE_ARR = 0x5D  # ]
+
+# Scanner states
+_STRUCTURE = 0
+_STRING = 1
+_ESCAPE = 2
+_UNICODE = 3
+
+# Longest string value we capture (headsigns, onestop ids, HH:MM:SS times)
+MAX_FIELD_LENGTH = 96
+
+# Key path of a single departure object inside the payload
+_DEPARTURE_PATH = ("stops", "[]", "departures", "[]")
+_DEPARTURE_DEPTH = len(_DEPARTURE_PATH)
+
+_ESCAPES = {
+    0x62: 0x08,  # \b
+    0x66: 0x0C,  # \f
+    0x6E: 0x0A,  # \n
+    0x72: 0x0D,  # \r
+    0x74: 0x09,  # \t
+}
+
+
+class DepartureParser:
+    """
+    Stream-parse departures, keeping the next `limit` for each filter.
+
+    Args:
+        filters (list): (trip_headsign, route_id) pairs a departure must match
+            one of to be kept; several routes/headsigns serving the same stop
+            are collected in a single pass
+        limit (int): Stop parsing once every filter has this many matches
+
+    Matches are stored in `departures[(trip_headsign, route_id)]` as
+    (scheduled, estimated) tuples, ordered by scheduled time. `estimated` is
+    None when the feed has no realtime estimate for that trip. Only the first
+    `limit` matches in the body are kept, which are the next ones as long as
+    the payload is in time order.
+    """
+
+    def __init__(self, filters, limit=1):
+        self.limit = limit
+        self.departures = {}
+        for trip_headsign, route_id in filters:
+            self.departures[(trip_headsign, route_id)] = []
+        self._remaining = len(self.departures)
+        self.done = not self._remaining
+
+        self._state = _STRUCTURE
+        self._containers = bytearray()  # '{' or '[' for every open container
+        self._path = []                 # key under which each container was opened
+        self._key = None                # last object key read at the current level
+        self._expect_key = False
+        self._in_departure = False
+
+        # Capture buffer for the string currently being read
+        self._buf = bytearray(MAX_FIELD_LENGTH)
+        self._buf_len = 0
+        self._capture = False
+        self._capture_key = False
+        self._unicode = bytearray(4)    # Hex digits of a \uXXXX escape
+        self._unicode_digits = 0
+        self._high_surrogate = 0        # First half of an escaped surrogate pair
+
+        self._reset_departure()
+
+    def _reset_departure(self):
+        self._headsign = None
+        self._route = None
+        self._scheduled = None
+        self._estimated = None
+
+    def feed(self, chunk, start=0, end=None):
+        """
+        Parse the next chunk of the response body.
+
+        Args:
+            chunk (bytes): Body data; a reusable bytearray is fine
+            start (int): Offset of the first byte to parse
+            end (int): Offset just past the last byte to parse (default: len)
+
+        Returns:
+            bool: True once enough departures have been found and the rest
+                  of the body can be discarded
+        """
+        if self.done:
+            return True
+
+        i = start
+        n = len(chunk) if end is None else end
+        while i < n:
+            state = self._state
+
+            if state == _STRING:
+                if not self._capture:
+                    # Fast path: jump straight to the end of an uninteresting string
+                    quote = chunk.find(b'"', i, n)
+                    esc = chunk.find(b"\\", i, n)
+                    if esc != -1 and (quote == -1 or esc < quote):
+                        self._state = _ESCAPE
+                        i = esc + 1
+                        continue
+                    if quote == -1:
+                        return False
+                    i = quote + 1
+                    self._end_string()
+                    if self.done:
+                        return True
+                    continue
+
+                b = chunk[i]
+                i += 1
+                if b == _QUOTE:
+                    self._end_string()
+                    if self.done:
+                        return True
+                elif b == _BACKSLASH:
+                    self._state = _ESCAPE
+                else:
+                    self._append(b)
+                continue
+
+            if state == _ESCAPE:
+                b = chunk[i]
+                i += 1
+                self._state = _STRING
+                if b == 0x75:  # \uXXXX
+                    self._state = _UNICODE
+                    self._unicode_digits = 0
+                elif self._capture:
+                    self._append(_ESCAPES.get(b, b))
+                continue
+
+            if state == _UNICODE:
+                self._unicode[self._unicode_digits] = chunk[i]
+                i += 1
+                self._unicode_digits += 1
+                if self._unicode_digits == 4:
+                    self._state = _STRING
+                    if self._capture:
+                        self._append_escaped()
+                continue
+
+            # Structural characters between tokens
+            b = chunk[i]
+            i += 1
+            if b == _QUOTE:
+                self._start_string()
+            elif b == _COLON:
+                self._expect_key = False
+            elif b == _COMMA:
+                self._expect_key = self._containers[-1] == _OPEN_OBJ if self._containers else False
+                self._key = None if self._expect_key else self._key
+            elif b == _OPEN_OBJ or b == _OPEN_ARR:
+                self._open(b)
+            elif b == _CLOSE_OBJ or b == _CLOSE_ARR:
+                self._close()
+                if self.done:
+                    return True
+            # Whitespace, numbers, true/false/null carry nothing we need
+
+        return False
+
+    def _open(self, kind):
+        depth = len(self._containers)
+        if depth and self._containers[-1] == _OPEN_ARR:
+            self._path.append("[]")
+        else:
+            self._path.append(self._key)
+        self._containers.append(kind)
+        self._key = None
+        self._expect_key = kind == _OPEN_OBJ
+
+        if depth == _DEPARTURE_DEPTH and kind == _OPEN_OBJ:
+            self._in_departure = tuple(self._path[1:]) == _DEPARTURE_PATH
+            if self._in_departure:
+                self._reset_departure()
+
+    def _close(self):
+        depth = len(self._containers)
+        if not depth:
+            return
+        self._containers.pop()
+        key = self._path.pop()
+        if depth == _DEPARTURE_DEPTH + 1 and self._in_departure:
+            self._in_departure = False
+            self._finish_departure()
+        # Back in the parent container: in an object the next token is ',' or '}'
+        self._key = key if self._containers and self._containers[-1] == _OPEN_OBJ else None
+        self._expect_key = False
+
+    def _start_string(self):
+        self._state = _STRING
+        self._buf_len = 0
+        self._high_surrogate = 0
+        depth = len(self._containers)
+        if self._expect_key:
+            # Keys only matter on the way down to the fields we keep
+            self._capture_key = depth <= _DEPARTURE_DEPTH + 3 and (
+                depth <= _DEPARTURE_DEPTH + 1 or self._in_departure
+            )
+            self._capture = self._capture_key
+        else:
+            self._capture_key = False
+            self._capture = self._in_departure and self._wanted_field(depth) is not None
+
+    def _wanted_field(self, depth):
+        """Return which departure field the string value at this position fills."""
+        key = self._key
+        if depth == _DEPARTURE_DEPTH + 2:
+            parent = self._path[_DEPARTURE_DEPTH + 1]
+            if parent == "trip" and key == "trip_headsign":
+                return "headsign"
+            if parent == "departure" and (key == "scheduled" or key == "estimated"):
+                return key
+        elif depth == _DEPARTURE_DEPTH + 3:
+            if (self._path[_DEPARTURE_DEPTH + 1] == "trip"
+                    and self._path[_DEPARTURE_DEPTH + 2] == "route"
+                    and key == "onestop_id"):
+                return "route"
+        return None
+
+    def _append(self, b):
+        if self._buf_len < MAX_FIELD_LENGTH:
+            self._buf[self._buf_len] = b
+            self._buf_len += 1
+
+    def _append_escaped(self):
+        """Append the character of the \\uXXXX escape just read, as UTF-8."""
+        try:
+            code = int(self._unicode, 16)
+        except ValueError:
+            code = 0xFFFD
+        if 0xD800 <= code < 0xDC00:
+            # Characters past U+FFFF come as two escapes; wait for the second
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        elif 0xD800 <= code < 0xE000:
+            code = 0xFFFD
+        self._high_surrogate = 0
+        for c in chr(code).encode("utf-8"):
+            self._append(c)
+
+    def _end_string(self):
+        self._state = _STRUCTURE
+        if self._capture_key:
+            self._key = str(self._buf[:self._buf_len], "utf-8")
+        elif self._capture:
+            field = self._wanted_field(len(self._containers))
+            value = str(self._buf[:self._buf_len], "utf-8")
+            if field == "headsign":
+                self._headsign = value
+            elif field == "route":
+                self._route = value
+            elif field == "scheduled":
+                self._scheduled = value
+            elif field == "estimated":
+                self._estimated = value
+        elif self._expect_key:
+            # Uninteresting key: remember that we are not on a wanted path
+            self._key = None
+        self._capture = False
+        self._capture_key = False
+
+    def _finish_departure(self):
+        if self._scheduled is None:
+            return
+        matches = self.departures.get((self._headsign, self._route))
+        if matches is None or len(matches) >= self.limit:
+            return
+
+        entry = (self._scheduled, self._estimated)
+        # Keep matches ordered by scheduled time (insertion into a short list)
+        index = len(matches)
+        while index > 0 and matches[index - 1][0] > self._scheduled:
+            index -= 1
+        matches.insert(index, entry)
+
+        # TransitLand returns departures in time order, so the first `limit`
+        # matches are the next ones and the rest of the body can be skipped
+        if len(matches) >= self.limit:
+            self._remaining -= 1
+            if not self._remaining:
+                self.done = True
@@ -0,0 +1,122 @@
+"""
+The one matrix display, shared by every screen the clock shows.
+
+Building a Matrix allocates the RGB matrix framebuffer and re-initializes
+the panel, so it happens exactly once, on first use of get_display().
+Everything drawn afterwards is a scene on that same display: the idle boat,
+a line of config text, the countdown and the error screen. Switching scenes
+swaps root_group (and, within the countdown scene, a few group children);
+nothing is reallocated, and the display is refreshed only when something
+changed, so switching between setup and the countdown does not flicker.
+"""
+import os
+
+import displayio
+import terminalio
+from adafruit_display_text import label
+from adafruit_matrixportal.matrix import Matrix
+
+from modules import log
+from modules.glyph_font import get_font
+from modules.scene import NUMBER_X, CountdownScene
+from modules.sprites import DEFAULT_COLOR, boat_tile, color_index, tile_size
+
+BIT_DEPTH = 4  # More colors, more vibrant boats
+WHITE = 0xFFFFFF
+TEXT_X = 5
+TEXT_Y = 8
+
+
+class DisplayManager:
+    """
+    Owns the matrix and the scenes drawn on it.
+
+    Call one of the show_*() methods, then render(); render() refreshes the
+    panel only if the shown scene changed since the last refresh.
+    """
+
+    def __init__(self, bit_depth=BIT_DEPTH):
+        self.matrix = Matrix(bit_depth=bit_depth)
+        self.display = self.matrix.display
+        self.display.auto_refresh = False
+
+        boat = None
+        boat_size = (0, 0)
+        try:
+            boat = boat_tile(os.getenv("CIRCUITPY_FERRY_COLOR", DEFAULT_COLOR))
+            boat_size = tile_size()
+        except (OSError, ValueError) as e:
+            log.error("Could not load boat sprite: %s", e)
+
+        number_label = label.Label(get_font(), text="0", color=WHITE, scale=2, x=NUMBER_X, y=24)
+        # x is set by the scene from the number's width
+        min_label = label.Label(terminalio.FONT, text="min", color=WHITE, x=20, y=26)
+        # The manager refreshes the display itself, whichever scene is up
+        self.scene = CountdownScene(None, displayio.Group(), number_label, min_label, boat, boat_size)
+
+        # Config text scene, built on first use
+        self.text_group = None
+        self.text_label = None
+
+        self.root = None
+        self.dirty = False
+        self._set_root(self.scene.group)
+
+    def show_boat(self, color=None):
+        """The boat, centered; shows "Ferry: BOAT" if the sprite is missing."""
+        if self.scene.boat is None:
+            self.show_text("Ferry: BOAT")
+            return
+        if color is not None:
+            self.scene.set_boat_tile(color_index(color))
+        self.scene.show_idle()
+        self._set_root(self.scene.group)
+
+    def show_text(self, text):
+        """A single line of text, e.g. the configured ferry."""
+        if self.text_label is None:
+            # Compiled font: "Ferry: BOAT" fits on the 64px row, unlike terminalio's 6px glyphs
+            self.text_label = label.Label(get_font(), text=text, color=WHITE, x=TEXT_X, y=TEXT_Y)
+            self.text_group = displayio.Group()
+            self.text_group.append(self.text_label)
+            self.dirty = True
+        elif self.text_label.text != text:
+            self.text_label.text = text
+            self.dirty = True
+        self._set_root(self.text_group)
+
+    def show_countdown(self, minutes):
+        """"<minutes> min" with the boat sailing across."""
+        self.scene.show_countdown(minutes)
+        self._set_root(self.scene.group)
+
+    def show_error(self):
+        """"ERR" in place of the minutes."""
+        self.scene.show_error()
+        self._set_root(self.scene.group)
+
+    def render(self):
+        """Refresh the display if anything changed; returns True if it did."""
+        changed = self.scene.render() or self.dirty
+        if changed:
+            self.dirty = False
+            self.display.refresh()
+        return changed
+
+    def _set_root(self, group):
+        if group is not self.root:
+            self.display.root_group = group
+            self.root = group
+            self.dirty = True
+
+
+# The shared display manager (will be set up when needed)
+display_manager = None
+
+
+def get_display():
+    """Return the display manager, creating the matrix on first use."""
+    global display_manager
+    if display_manager is None:
+        display_manager = DisplayManager()
+    return display_manager
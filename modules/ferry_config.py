@@ -1,120 +1,133 @@
 import storage
 import os
+from modules import log
 from modules.routes_data import routes_data
-
-def url_decode(s):
-    """Simple URL decoder for common characters."""
-    s = s.replace("+", " ")
-    s = s.replace("%7E", "~")
-    s = s.replace("%7e", "~")  # Handle lowercase too
-    s = s.replace("%20", " ")
-    s = s.replace("%21", "!")
-    s = s.replace("%22", '"')
-    s = s.replace("%23", "#")
-    s = s.replace("%24", "$")
-    s = s.replace("%25", "%")
-    s = s.replace("%26", "&")
-    s = s.replace("%27", "'")
-    s = s.replace("%28", "(")
-    s = s.replace("%29", ")")
-    s = s.replace("%2A", "*")
-    s = s.replace("%2a", "*")
-    s = s.replace("%2B", "+")
-    s = s.replace("%2b", "+")
-    s = s.replace("%2C", ",")
-    s = s.replace("%2c", ",")
-    s = s.replace("%2D", "-")
-    s = s.replace("%2d", "-")
-    s = s.replace("%2E", ".")
-    s = s.replace("%2e", ".")
-    s = s.replace("%2F", "/")
-    s = s.replace("%2f", "/")
-    return s
+from modules.http_response import Response
+from modules.templates import FragmentCache, escape, render, static_page
 
 def load_html(filename="ferry_config.html"):
-    """Load the HTML content for the ferry configuration page."""
-    try:
-        with open(f"/modules/HTML/{filename}", "r") as file:
-            html_content = file.read()
-        return html_content
-    except Exception as e:
-        print(f"Failed to load HTML file: {e}")
-        return "<h1>Error: Unable to load the HTML file.</h1>"
+    """Load an HTML page from the template cache as a list of byte chunks."""
+    return render(filename)
+
+def toml_string(value):
+    """
+    Quote value as a TOML basic string for settings.toml.
+
+    Form values arrive fully decoded, so they may hold quotes and backslashes.
+
+    Raises:
+        ValueError: If value holds a control character, which would need an
+            escape the board's settings.toml reader may not understand
+    """
+    for character in value:
+        if character < " " or character == "\x7f":
+            raise ValueError("control character in setting")
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
 
 def write_settings(route_id, route_name, stop_id, stop_name, headsign, color):
     """Write the ferry configuration to settings.toml."""
     try:
-        print("Attempting to remount filesystem as writable...")
-        storage.remount("/", readonly=False)
-        print("Filesystem remounted as writable.")
-        
         # Get existing settings using os.getenv
         ssid = os.getenv("CIRCUITPY_WIFI_SSID", "")
         password = os.getenv("CIRCUITPY_WIFI_PASSWORD", "")
+        watch_list = os.getenv("CIRCUITPY_FERRY_WATCH_LIST", "")
+        
+        # Quote everything first, so a bad value leaves the old file in place
+        settings = []
+        if ssid:
+            settings.append(("CIRCUITPY_WIFI_SSID", ssid))
+        if password:
+            settings.append(("CIRCUITPY_WIFI_PASSWORD", password))
+        settings.append(("CIRCUITPY_FERRY_ROUTE_ID", route_id))
+        settings.append(("CIRCUITPY_FERRY_ROUTE_NAME", route_name))
+        settings.append(("CIRCUITPY_FERRY_STOP_ID", stop_id))
+        settings.append(("CIRCUITPY_FERRY_STOP_NAME", stop_name))
+        settings.append(("CIRCUITPY_FERRY_HEADSIGN", headsign))
+        settings.append(("CIRCUITPY_FERRY_COLOR", color))
+        if watch_list:
+            settings.append(("CIRCUITPY_FERRY_WATCH_LIST", watch_list))
+        lines = [f"{name} = {toml_string(value)}\n" for name, value in settings]
+        
+        if __debug__:
+            log.debug("Attempting to remount filesystem as writable...")
+        storage.remount("/", readonly=False)
+        if __debug__:
+            log.debug("Filesystem remounted as writable.")
         
-        print(f"Writing settings to /settings.toml...")
+        if __debug__:
+            log.debug("Writing settings to /settings.toml...")
         # Write all settings
         with open("/settings.toml", "w") as file:
-            if ssid:
-                file.write(f'CIRCUITPY_WIFI_SSID = "{ssid}"\n')
-            if password:
-                file.write(f'CIRCUITPY_WIFI_PASSWORD = "{password}"\n')
-            file.write(f'CIRCUITPY_FERRY_ROUTE_ID = "{route_id}"\n')
-            file.write(f'CIRCUITPY_FERRY_ROUTE_NAME = "{route_name}"\n')
-            file.write(f'CIRCUITPY_FERRY_STOP_ID = "{stop_id}"\n')
-            file.write(f'CIRCUITPY_FERRY_STOP_NAME = "{stop_name}"\n')
-            file.write(f'CIRCUITPY_FERRY_HEADSIGN = "{headsign}"\n')
-            file.write(f'CIRCUITPY_FERRY_COLOR = "{color}"\n')
+            for line in lines:
+                file.write(line)
             
-        print("Ferry settings updated!")
-        print("Remounting filesystem as readonly...")
+        log.info("Ferry settings updated")
+        if __debug__:
+            log.debug("Remounting filesystem as readonly...")
         storage.remount("/", readonly=True)
-        print("Filesystem remounted as readonly.")
+        if __debug__:
+            log.debug("Filesystem remounted as readonly.")
         return True
     except Exception as e:
-        print(f"Failed to write settings. Error type: {type(e).__name__}")
-        print(f"Error details: {str(e)}")
+        log.error("Failed to write settings: %s: %s", type(e).__name__, e)
         return False
 
+# Route/stop lookup built from routes_data on first use, then shared by every request
+_ferry_index = None
+
+# Rendered (route, stop, headsign) <option> lists, keyed by route code (None for
+# the blank form); one slot per route so a walk through the dropdown never evicts
+_fragments = FragmentCache(len(routes_data) + 1)
+
+def get_ferry_index():
+    """
+    Return the portal's route and stop index, building it on first use.
+
+    Returns:
+        tuple: (routes, route_order) where routes maps a route code (e.g. 'ER')
+               to a dict with its display name, full route id, color, stops
+               sorted by name as (stop_key, name) tuples, stop key -> name and
+               stop key -> full stop_id maps, and headsigns; route_order is
+               the route codes sorted by display name. Treat it as read-only.
+    """
+    global _ferry_index
+    if _ferry_index is None:
+        routes = {}
+        for route_key, route_info in routes_data.items():
+            # Extract route code (e.g., 'AS' from 'AS (Astoria)')
+            route_code = route_key.split(' ')[0]
+            stop_names = {}
+            stop_ids = {}  # Map from short key to full stop_id
+            for stop in route_info['stops']:
+                # Use the last part after the last dash as the stop key (e.g., 'astoria' from 's-dr5r7-astoria')
+                stop_key = stop['stop_id'].split('-')[-1]
+                stop_names[stop_key] = stop['name']
+                stop_ids[stop_key] = stop['stop_id']
+            routes[route_code] = {
+                'name': route_key,  # Full route key as the display name (e.g., 'AS (Astoria)')
+                'id': route_info['id'],
+                'color': route_info.get('color', ''),
+                'stops': tuple(sorted(stop_names.items(), key=lambda x: x[1])),
+                'stop_names': stop_names,
+                'stop_ids': stop_ids,
+                'headsigns': tuple(route_info.get('trip_headsigns', [])),
+            }
+        route_order = tuple(sorted(routes, key=lambda code: routes[code]['name']))
+        _ferry_index = (routes, route_order)
+    return _ferry_index
+
 def handle_ferry_config(request):
-    """Handle ferry configuration requests."""
-    
-    # Build ferry_data from routes_data.py
-    ferry_data = {}
-    route_ids = {}  # Map from route code to full route ID
-    for route_key, route_info in routes_data.items():
-        # Extract route code (e.g., 'AS' from 'AS (Astoria)')
-        route_code = route_key.split(' ')[0]
-        # Use the full route key as the display name (e.g., 'AS (Astoria)')
-        route_name = route_key
-        # Store mapping from route code to full route ID
-        route_ids[route_code] = route_info['id']
-        # Build stops dictionary using stop_id as key and name as value
-        stops = {}
-        stop_ids = {}  # Map from short key to full stop_id
-        for stop in route_info['stops']:
-            # Use the last part after the last dash as the stop key (e.g., 'astoria' from 's-dr5r7-astoria')
-            stop_key = stop['stop_id'].split('-')[-1]
-            stops[stop_key] = stop['name']
-            stop_ids[stop_key] = stop['stop_id']  # Store full stop_id
-        ferry_data[route_code] = {
-            'name': route_name,
-            'stops': stops,
-            'stop_ids': stop_ids,  # Add mapping to full stop IDs
-            'headsigns': route_info.get('trip_headsigns', [])
-        }
+    """Handle ferry configuration requests (request is a modules.http_request.Request)."""
+    ferry_data, route_order = get_ferry_index()
     
     # Check if this is a POST request (form submission)
-    if "POST" in request:
+    if request.method == "POST":
         try:
-            # Extract the body from the request
-            body = request.split("\r\n\r\n")[1]
-            # Parse the form data
-            params = dict(pair.split("=") for pair in body.split("&"))
-            
-            route_id = url_decode(params.get("route", ""))
-            stop_id = url_decode(params.get("stop_id", ""))
-            headsign = url_decode(params.get("headsign", ""))
+            # Form values arrive already percent-decoded
+            params = request.form
+            route_id = params.get("route", "")
+            stop_id = params.get("stop_id", "")
+            headsign = params.get("headsign", "")
             
             # Get route and stop names from our data
             route_name = ""
@@ -122,97 +135,80 @@ def handle_ferry_config(request):
             route_color = ""
             full_route_id = route_id  # Default to the received route_id
             full_stop_id = stop_id  # Default to the received stop_id
-            if route_id in ferry_data:
-                route_name = ferry_data[route_id]['name']
-                full_route_id = route_ids[route_id]  # Get full route ID
-                # Get the color from routes_data
-                for route_key, route_info in routes_data.items():
-                    if route_info['id'] == route_ids[route_id]:
-                        route_color = route_info.get('color', '')
-                        break
-                if stop_id in ferry_data[route_id]['stops']:
-                    stop_name = ferry_data[route_id]['stops'][stop_id]
-                    full_stop_id = ferry_data[route_id]['stop_ids'][stop_id]  # Get full stop ID
+            route = ferry_data.get(route_id)
+            if route:
+                route_name = route['name']
+                full_route_id = route['id']  # Get full route ID
+                route_color = route['color']
+                if stop_id in route['stop_names']:
+                    stop_name = route['stop_names'][stop_id]
+                    full_stop_id = route['stop_ids'][stop_id]  # Get full stop ID
             
-            print(f"Received ferry configuration: {route_id} → {full_route_id} ({route_name}), {stop_id} → {full_stop_id} ({stop_name}), headsign: {headsign}, color: {route_color}")
+            if __debug__:
+                log.debug("Received ferry configuration: %s → %s (%s), %s → %s (%s), headsign: %s, color: %s",
+                          route_id, full_route_id, route_name, stop_id, full_stop_id, stop_name, headsign, route_color)
             
             if route_id and stop_id and headsign and write_settings(full_route_id, route_name, full_stop_id, stop_name, headsign, route_color):
-                print("Successfully wrote ferry settings")
-                success_page = load_html("ferry_config_success.html")
-                return f"HTTP/1.1 200 OK\nContent-Type: text/html\nContent-Length: {len(success_page)}\n\n{success_page}"
+                if __debug__:
+                    log.debug("Successfully wrote ferry settings")
+                return static_page("ferry_config_success.html", request)
             
-            print("Failed to write ferry settings - missing route, stop, or headsign")
-            error_page = load_html("ferry_config_error.html")
-            return f"HTTP/1.1 200 OK\nContent-Type: text/html\nContent-Length: {len(error_page)}\n\n{error_page}"
+            log.warning("Failed to write ferry settings - missing route, stop, or headsign")
+            return static_page("ferry_config_error.html", request)
             
         except Exception as e:
-            print(f"Error processing ferry config request: {e}")
-            error_page = load_html("ferry_config_error.html")
-            return f"HTTP/1.1 200 OK\nContent-Type: text/html\nContent-Length: {len(error_page)}\n\n{error_page}"
+            log.error("Error processing ferry config request: %s", e)
+            return static_page("ferry_config_error.html", request)
     
     # For GET requests, return the configuration page with route-specific stops
     try:
         # Check if a route was selected (from query parameters)
-        selected_route = None
-        if "?" in request:
-            query_params = request.split("?")[1].split(" ")[0]  # Get query string before HTTP version
-            if "route=" in query_params:
-                selected_route = query_params.split("route=")[1].split("&")[0]
-        
-        main_page = load_html("ferry_config.html")
-        
-        # Generate route dropdown with auto-submit on change (sorted alphabetically by name)
-        route_options = []
-        # Sort routes by their display names alphabetically
-        sorted_routes = sorted(ferry_data.items(), key=lambda x: x[1]['name'])
-        for route_id, route_info in sorted_routes:
-            selected = 'selected' if route_id == selected_route else ''
-            route_options.append(f'<option value="{route_id}" {selected}>{route_info["name"]}</option>')
-        
-        old_route_html = '<select id="route" name="route" onchange="window.location.href=\'?route=\'+this.value"><option value="">Select a route</option></select>'
-        
-        new_route_html = f'<select id="route" name="route" onchange="window.location.href=\'?route=\'+this.value"><option value="">Select a route</option>{"".join(route_options)}</select>'
-        
-        if old_route_html in main_page:
-            main_page = main_page.replace(old_route_html, new_route_html)
-            print(f"Added route dropdown (selected: {selected_route or 'none'})")
-        
-        # Generate stops dropdown based on selected route (sorted alphabetically by name)
-        stop_options = []
-        if selected_route and selected_route in ferry_data:
-            # Sort stops by their display names alphabetically
-            sorted_stops = sorted(ferry_data[selected_route]['stops'].items(), key=lambda x: x[1])
-            for stop_id, stop_name in sorted_stops:
-                stop_options.append(f'<option value="{stop_id}">{stop_name}</option>')
-        
-        old_stop_html = '<select id="stop" name="stop_id"><option value="">Select a stop</option></select>'
-        
-        new_stop_html = f'<select id="stop" name="stop_id"><option value="">Select a stop</option>{"".join(stop_options)}</select>'
-        
-        if old_stop_html in main_page:
-            main_page = main_page.replace(old_stop_html, new_stop_html)
-            stops_count = len(stop_options) if stop_options else 0
-            print(f"Added {stops_count} stops for route {selected_route or 'none'}")
-        
-        # Generate headsigns dropdown based on selected route
-        headsign_options = []
-        if selected_route and selected_route in ferry_data:
-            for headsign in ferry_data[selected_route]['headsigns']:
-                headsign_options.append(f'<option value="{headsign}">{headsign}</option>')
-        
-        old_headsign_html = '<select id="headsign" name="headsign"><option value="">Select a direction</option></select>'
-        
-        new_headsign_html = f'<select id="headsign" name="headsign"><option value="">Select a direction</option>{"".join(headsign_options)}</select>'
-        
-        if old_headsign_html in main_page:
-            main_page = main_page.replace(old_headsign_html, new_headsign_html)
-            headsigns_count = len(headsign_options) if headsign_options else 0
-            print(f"Added {headsigns_count} headsigns for route {selected_route or 'none'}")
-        
-        return f"HTTP/1.1 200 OK\nContent-Type: text/html\nContent-Length: {len(main_page)}\n\n{main_page}"
+        selected_route = request.query.get("route")
+        if selected_route not in ferry_data:
+            selected_route = None
+        
+        route_html, stop_html, headsign_html = _fragments.get(
+            selected_route, lambda: dropdowns(selected_route))
+        return Response(render("ferry_config.html", {
+            "route_options": route_html,
+            "stop_options": stop_html,
+            "headsign_options": headsign_html,
+        }))
         
     except Exception as e:
-        print(f"Error loading ferry config: {e}")
-        # Fallback to basic test version
-        main_page = load_html("ferry_config.html")
-        return f"HTTP/1.1 200 OK\nContent-Type: text/html\nContent-Length: {len(main_page)}\n\n{main_page}"
\ No newline at end of file
+        log.error("Error loading ferry config: %s", e)
+        # Fallback to the page with empty dropdowns
+        return Response(load_html("ferry_config.html"))
+
+def dropdowns(selected_route):
+    """The (route, stop, headsign) <option> lists for a selected route (or None)."""
+    return route_options(selected_route), stop_options(selected_route), headsign_options(selected_route)
+
+def route_options(selected_route):
+    """Render the route <option> list (sorted alphabetically by name) as bytes."""
+    ferry_data, route_order = get_ferry_index()
+    options = []
+    for route_id in route_order:
+        selected = 'selected' if route_id == selected_route else ''
+        options.append(f'<option value="{escape(route_id)}" {selected}>{escape(ferry_data[route_id]["name"])}</option>')
+    return "".join(options).encode("utf-8")
+
+def stop_options(selected_route):
+    """Render the stop <option> list for a route (sorted alphabetically by name) as bytes."""
+    ferry_data, route_order = get_ferry_index()
+    if selected_route is None:
+        return b""
+    return "".join(
+        f'<option value="{escape(stop_id)}">{escape(stop_name)}</option>'
+        for stop_id, stop_name in ferry_data[selected_route]['stops']
+    ).encode("utf-8")
+
+def headsign_options(selected_route):
+    """Render the headsign <option> list for a route as bytes."""
+    ferry_data, route_order = get_ferry_index()
+    if selected_route is None:
+        return b""
+    return "".join(
+        f'<option value="{escape(headsign)}">{escape(headsign)}</option>'
+        for headsign in ferry_data[selected_route]['headsigns']
+    ).encode("utf-8")
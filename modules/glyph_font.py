@@ -0,0 +1,119 @@
+"""
+Loader for the compiled glyph fonts built by tools/build_font.py.
+
+A compiled font holds only the characters the clock draws, already decoded
+into 1-bit rows, so loading one is three reads and a short loop filling
+small displayio.Bitmaps, instead of parsing a whole BDF text file. The
+returned object has the get_glyph() / get_bounding_box() / ascent /
+descent interface adafruit_display_text labels expect from a font.
+Characters that were not compiled in come from a fallback font
+(terminalio.FONT for get_font()), so free-form text such as a stop name
+is never drawn with holes in it.
+
+File layout (little-endian):
+
+    header   "CCFT", version (B), glyph count (B), bounding box width,
+             height, x offset, y offset (bbbb), ascent, descent (bb)
+    glyphs   one 8-byte record per glyph, sorted by code point: code point
+             (H), width, height (BB), dx, dy, shift_x, shift_y (bbbb)
+    bitmaps  each glyph's rows in record order, top row first, every row
+             padded to whole bytes, most significant bit leftmost
+"""
+import struct
+
+MAGIC = b"CCFT"
+VERSION = 1
+HEADER_FORMAT = "<4sBBbbbbbb"
+GLYPH_FORMAT = "<HBBbbbb"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+GLYPH_SIZE = struct.calcsize(GLYPH_FORMAT)
+
+CHUNKY_FONT_PATH = "fonts/MatrixChunky8.bin"
+
+
+class GlyphFont:
+    """A small fixed set of glyphs, all kept in RAM, plus an optional fallback font."""
+
+    def __init__(self, glyphs, bounding_box, ascent, descent, fallback=None):
+        self._glyphs = glyphs
+        self._bounding_box = bounding_box
+        self.ascent = ascent
+        self.descent = descent
+        self.fallback = fallback
+
+    def get_bounding_box(self):
+        return self._bounding_box
+
+    def get_glyph(self, codepoint):
+        """
+        The fontio.Glyph for a code point; the fallback font's if it was not
+        compiled in, or None without a fallback.
+        """
+        glyph = self._glyphs.get(codepoint)
+        if glyph is None and self.fallback is not None:
+            return self.fallback.get_glyph(codepoint)
+        return glyph
+
+
+def load_font(path=CHUNKY_FONT_PATH, fallback=None):
+    """
+    Load a compiled glyph font; fallback supplies the glyphs it lacks.
+
+    Raises:
+        OSError: The file is missing
+        ValueError: The file is not a compiled glyph font of this version
+    """
+    # Imported here so host tools can share the format constants above
+    import displayio
+    import fontio
+
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE:
+            raise ValueError("Truncated font file")
+        magic, version, count, box_width, box_height, box_dx, box_dy, ascent, descent = \
+            struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a compiled glyph font")
+        records = file.read(count * GLYPH_SIZE)
+        data = file.read()
+
+    glyphs = {}
+    offset = 0
+    for index in range(count):
+        codepoint, width, height, dx, dy, shift_x, shift_y = \
+            struct.unpack_from(GLYPH_FORMAT, records, index * GLYPH_SIZE)
+        bitmap = displayio.Bitmap(max(width, 1), max(height, 1), 2)
+        row_bytes = (width + 7) // 8
+        for y in range(height):
+            row = offset + y * row_bytes
+            for x in range(width):
+                if data[row + (x >> 3)] & (0x80 >> (x & 7)):
+                    bitmap[x, y] = 1
+        offset += row_bytes * height
+        glyphs[codepoint] = fontio.Glyph(bitmap, 0, width, height, dx, dy, shift_x, shift_y)
+
+    return GlyphFont(glyphs, (box_width, box_height, box_dx, box_dy), ascent, descent, fallback)
+
+
+# path -> loaded font, shared by every caller
+_fonts = {}
+
+
+def get_font(path=CHUNKY_FONT_PATH):
+    """
+    Return the compiled font at path, loading it once. terminalio.FONT
+    draws the characters it lacks, or everything if it is missing or
+    unreadable.
+    """
+    font = _fonts.get(path)
+    if font is None:
+        import terminalio
+        try:
+            font = load_font(path, terminalio.FONT)
+        except (OSError, ValueError) as e:
+            from modules import log
+            log.error("Could not load %s: %s", path, e)
+            font = terminalio.FONT
+        _fonts[path] = font
+    return font
@@ -0,0 +1,192 @@
+"""
+Incremental HTTP request parser for the configuration portal.
+
+Requests are fed to RequestParser as they arrive, across as many receives
+as it takes; the body is read up to its Content-Length. Query strings and
+form bodies are percent-decoded in one linear pass into a reusable buffer,
+so any UTF-8 text (SSIDs with accents, '%', '+', '&' ...) survives intact.
+"""
+
+MAX_HEADER_SIZE = 2048
+MAX_BODY_SIZE = 4096
+
+# Reused by every decode; grown if a single field is ever longer
+_decode_buffer = bytearray(256)
+
+
+class Request:
+    """
+    A parsed HTTP request.
+
+    Args:
+        method (str): Request method, e.g. "GET"
+        target (str): Request target including any query string, e.g. "/?route=ER"
+        headers (dict): Header names (lowercase) to values
+        body (bytes): Request body
+    """
+
+    def __init__(self, method, target, headers=None, body=b""):
+        self.method = method
+        self.target = target
+        self.headers = headers or {}
+        self.body = body
+        path, _, query_string = target.partition("?")
+        self.path = path
+        self.query_string = query_string
+        self._query = None
+        self._form = None
+
+    @property
+    def query(self):
+        """Decoded query string parameters."""
+        if self._query is None:
+            self._query = parse_form(self.query_string)
+        return self._query
+
+    @property
+    def form(self):
+        """Decoded application/x-www-form-urlencoded body parameters."""
+        if self._form is None:
+            self._form = parse_form(self.body)
+        return self._form
+
+
+class RequestParser:
+    """
+    Build a Request from data received in any number of pieces.
+
+    Call feed() with each received piece until it returns True, then read
+    `request`. Raises ValueError for malformed or oversized requests.
+    """
+
+    def __init__(self):
+        self.request = None
+        self._head = bytearray()
+        self._body = None
+        self._body_length = 0
+
+    def feed(self, data):
+        """
+        Add received bytes.
+
+        Returns:
+            bool: True once the headers and the whole body have arrived
+        """
+        if self.request is None:
+            self._head.extend(data)
+            end = self._head.find(b"\r\n\r\n")
+            separator = 4
+            if end == -1:
+                end = self._head.find(b"\n\n")
+                separator = 2
+            if end == -1:
+                if len(self._head) > MAX_HEADER_SIZE:
+                    raise ValueError("Request headers too large")
+                return False
+
+            self.request = _parse_head(self._head, end)
+            length = self.request.headers.get("content-length", "0")
+            length = int(length) if length else 0
+            if length < 0 or length > MAX_BODY_SIZE:
+                raise ValueError("Request body too large")
+            self._body = bytearray(length)
+            data = memoryview(self._head)[end + separator:]
+            self._head = None
+
+        take = min(len(data), len(self._body) - self._body_length)
+        if take > 0:
+            self._body[self._body_length:self._body_length + take] = data[:take]
+            self._body_length += take
+
+        if self._body_length < len(self._body):
+            return False
+        self.request.body = bytes(self._body)
+        return True
+
+
+def _parse_head(head, end):
+    lines = str(head[:end], "utf-8").split("\n")
+    request_line = lines[0].strip().split(" ")
+    if len(request_line) < 2:
+        raise ValueError("Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        name, separator, value = line.partition(":")
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return Request(request_line[0], request_line[1], headers)
+
+
+def _hex_value(b):
+    if 0x30 <= b <= 0x39:
+        return b - 0x30
+    if 0x41 <= b <= 0x46:
+        return b - 0x37
+    if 0x61 <= b <= 0x66:
+        return b - 0x57
+    return -1
+
+
+def _decode(data, start, end):
+    """Percent-decode data[start:end] ('+' is a space) into a str in one pass."""
+    global _decode_buffer
+    if end - start > len(_decode_buffer):
+        _decode_buffer = bytearray(end - start)
+    buf = _decode_buffer
+
+    length = 0
+    i = start
+    while i < end:
+        b = data[i]
+        if b == 0x2B:  # +
+            b = 0x20
+        elif b == 0x25 and i + 2 < end:  # %XX
+            high = _hex_value(data[i + 1])
+            low = _hex_value(data[i + 2])
+            if high >= 0 and low >= 0:
+                b = (high << 4) | low
+                i += 2
+        buf[length] = b
+        length += 1
+        i += 1
+
+    try:
+        return str(buf[:length], "utf-8")
+    except UnicodeError:
+        # Not valid UTF-8: keep the bytes as Latin-1 rather than failing the request
+        return "".join(chr(c) for c in buf[:length])
+
+
+def parse_form(data):
+    """
+    Parse "a=1&b=x%20y" (str or bytes) into a dict of decoded strings.
+
+    Keys without "=" map to an empty string; later duplicates win.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    params = {}
+    end = len(data)
+    start = 0
+    while start < end:
+        amp = data.find(b"&", start)
+        if amp == -1:
+            amp = end
+        equals = data.find(b"=", start, amp)
+        if equals == -1:
+            key = _decode(data, start, amp)
+            value = ""
+        else:
+            key = _decode(data, start, equals)
+            value = _decode(data, equals + 1, amp)
+        if key:
+            params[key] = value
+        start = amp + 1
+    return params
+
+
+def url_decode(s):
+    """Percent-decode a URL-encoded string ('+' is a space)."""
+    data = s.encode("utf-8")
+    return _decode(data, 0, len(data))
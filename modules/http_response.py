@@ -0,0 +1,125 @@
+"""
+HTTP response writer for the configuration portal.
+
+A Response is a status line, headers and a body given as a sequence of
+pre-encoded byte chunks (usually the cached template parts). The chunks are
+sent as they are, through memoryview slices, so a page is never joined into
+one big string or copied again before it goes out; Content-Length is the
+byte count of the chunks.
+"""
+import errno
+import time
+
+from modules import tasks
+
+# Give up on a client that accepts nothing for this long (seconds)
+SEND_TIMEOUT = 5
+# Bytes read from flash per send when streaming a file
+FILE_CHUNK_SIZE = 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class Response:
+    """
+    An HTTP response made of pre-encoded byte chunks.
+
+    Args:
+        chunks (list): Body as bytes-like chunks
+        status (int): HTTP status code
+        content_type (str): Content-Type header value
+        headers (dict): Extra headers
+    """
+
+    def __init__(self, chunks, status=200, content_type="text/html; charset=utf-8", headers=None):
+        self.chunks = chunks
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    def content_length(self):
+        """Body length in bytes."""
+        length = 0
+        for chunk in self.chunks:
+            length += len(chunk)
+        return length
+
+    def head(self):
+        """Encoded status line and headers, including the blank line."""
+        lines = [
+            f"HTTP/1.1 {self.status} {STATUS_TEXT.get(self.status, '')}",
+            f"Content-Type: {self.content_type}",
+            f"Content-Length: {self.content_length()}",
+            "Connection: close",
+        ]
+        for name, value in self.headers.items():
+            lines.append(f"{name}: {value}")
+        lines.append("\r\n")
+        return "\r\n".join(lines).encode("utf-8")
+
+    async def send(self, sock):
+        """Write the response to a non-blocking socket."""
+        await send_all(sock, self.head())
+        for chunk in self.chunks:
+            await send_all(sock, chunk)
+
+
+class FileResponse(Response):
+    """
+    A response whose body is streamed from a file on flash.
+
+    Args:
+        path (str): File to send
+        size (int): File size in bytes
+        status, content_type, headers: As for Response
+    """
+
+    def __init__(self, path, size, status=200, content_type="text/html; charset=utf-8", headers=None):
+        super().__init__((), status, content_type, headers)
+        self.path = path
+        self.size = size
+
+    def content_length(self):
+        return self.size
+
+    async def send(self, sock):
+        await send_all(sock, self.head())
+        buffer = bytearray(FILE_CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(self.path, "rb") as file:
+            while True:
+                count = file.readinto(buffer)
+                if not count:
+                    break
+                await send_all(sock, view[:count])
+
+
+def error_response(status, message=None):
+    """A short plain-text response for a failed request."""
+    text = message or STATUS_TEXT.get(status, "Error")
+    return Response([text.encode("utf-8")], status, "text/plain; charset=utf-8")
+
+
+async def send_all(sock, data):
+    """Send all of data on a non-blocking socket, yielding while its buffer is full."""
+    view = memoryview(data)
+    sent = 0
+    deadline = time.monotonic() + SEND_TIMEOUT
+    while sent < len(view):
+        try:
+            count = sock.send(view[sent:])
+        except OSError as e:
+            if e.errno != errno.EAGAIN or time.monotonic() > deadline:
+                raise
+            count = 0
+        if count:
+            sent += count
+            deadline = time.monotonic() + SEND_TIMEOUT
+        else:
+            await tasks.sleep(0)
@@ -0,0 +1,201 @@
+"""
+Levelled logging into a RAM ring buffer, on top of adafruit_logging.
+
+    from modules import log
+
+    log.info("Connected to %s", ssid)
+    if __debug__:
+        log.debug("Fetching %s", url)
+
+Messages use %-style arguments and are only formatted once the level check
+has passed; adafruit_logging itself formats before it checks, so always go
+through these functions. debug() calls sit under `if __debug__:`: unless
+CIRCUITPY_LOG_LEVEL is "debug", importing this module sets MicroPython's
+optimisation level to 1, and modules compiled after that (everything
+code.py imports after it) leave those blocks out altogether. code.py itself
+is compiled before any of this runs, so its debug lines stay in and only
+the level check skips them. Setting the level from boot.py wouldn't help:
+the VM is reset before code.py starts.
+
+Records go to a preallocated ring buffer (RING_SIZE bytes) rather than the
+USB serial console, so nothing waits on a console nobody is reading. Read
+it at the REPL with log.dump(), or have it written to LOG_PATH on flash
+once a record reaches CIRCUITPY_LOG_FLUSH. settings.toml:
+
+    CIRCUITPY_LOG_LEVEL    lowest level kept in the ring (default "info")
+    CIRCUITPY_LOG_CONSOLE  lowest level also printed (default "error")
+    CIRCUITPY_LOG_FLUSH    level that flushes the ring to flash (default: never)
+
+Each takes "debug", "info", "warning", "error", "critical" or "none".
+"""
+import os
+import time
+
+import adafruit_logging
+from adafruit_logging import CRITICAL, DEBUG, ERROR, INFO, WARNING
+
+RING_SIZE = 4096
+LOG_PATH = "/log.txt"
+# Don't flush to flash more often than this (seconds); it wears the flash
+FLUSH_INTERVAL = 300
+# Above every level, for settings of "none"
+OFF = CRITICAL + 10
+
+LEVELS = {
+    "debug": DEBUG,
+    "info": INFO,
+    "warning": WARNING,
+    "error": ERROR,
+    "critical": CRITICAL,
+    "none": OFF,
+}
+
+
+def level_setting(name, default):
+    """A level from settings.toml, by name."""
+    return LEVELS.get(str(os.getenv(name, default)).lower(), LEVELS[default])
+
+
+class RingBufferHandler(adafruit_logging.Handler):
+    """
+    Keep the latest records, one line each, in a fixed bytearray.
+
+    Args:
+        size (int): Bytes of log kept; older lines are overwritten
+        flush_level (int): Records at this level or above write the ring to
+            LOG_PATH (at most every FLUSH_INTERVAL seconds)
+    """
+
+    def __init__(self, size=RING_SIZE, flush_level=OFF):
+        super().__init__()
+        self.buffer = bytearray(size)
+        self.end = 0          # Where the next byte goes
+        self.wrapped = False  # Whether the ring has filled up at least once
+        self.flush_level = flush_level
+        self.flushed_at = None
+
+    def emit(self, record):
+        self.write(f"{record.created:.1f} {record.levelname} {record.msg}\n".encode("utf-8"))
+        if record.levelno >= self.flush_level:
+            now = time.monotonic()
+            if self.flushed_at is None or now - self.flushed_at >= FLUSH_INTERVAL:
+                self.flushed_at = now
+                self.flush_to_flash()
+
+    def write(self, data):
+        size = len(self.buffer)
+        if len(data) > size:
+            data = data[-size:]
+        first = min(len(data), size - self.end)
+        self.buffer[self.end:self.end + first] = data[:first]
+        rest = len(data) - first
+        if rest:
+            self.buffer[:rest] = data[first:]
+            self.wrapped = True
+            self.end = rest
+        else:
+            self.end += first
+            if self.end == size:
+                self.wrapped = True
+                self.end = 0
+
+    def contents(self):
+        """Every whole line in the ring, oldest first."""
+        if not self.wrapped:
+            return bytes(self.buffer[:self.end])
+        # The oldest line has been partly overwritten
+        start = self.buffer.find(b"\n", self.end) + 1
+        if start:
+            return bytes(self.buffer[start:]) + bytes(self.buffer[:self.end])
+        return bytes(self.buffer[self.buffer.find(b"\n") + 1:self.end])
+
+    def flush_to_flash(self, path=LOG_PATH):
+        """
+        Append the ring to path and empty it.
+
+        Returns:
+            bool: False if the drive can't be written (e.g. while USB is
+                  connected, which keeps it read-only for the code)
+        """
+        import storage
+
+        try:
+            storage.remount("/", readonly=False)
+        except (OSError, RuntimeError):
+            return False
+        try:
+            with open(path, "ab") as file:
+                file.write(self.contents())
+            self.end = 0
+            self.wrapped = False
+            return True
+        except OSError:
+            return False
+        finally:
+            storage.remount("/", readonly=True)
+
+
+ring = RingBufferHandler(flush_level=level_setting("CIRCUITPY_LOG_FLUSH", "none"))
+ring.setLevel(level_setting("CIRCUITPY_LOG_LEVEL", "info"))
+_console_level = level_setting("CIRCUITPY_LOG_CONSOLE", "error")
+
+_logger = adafruit_logging.getLogger("clock")
+_logger.addHandler(ring)
+if _console_level < OFF:
+    _console = adafruit_logging.StreamHandler()
+    _console.setLevel(_console_level)
+    _logger.addHandler(_console)
+
+# The lowest level any handler wants; everything below returns straight away
+level = min(ring.level, _console_level)
+_logger.setLevel(level)
+
+if level > DEBUG:
+    try:
+        import micropython
+        micropython.opt_level(1)
+    except (ImportError, AttributeError):  # CPython, where __debug__ stays True
+        pass
+
+
+def debug(msg, *args):
+    if level <= DEBUG:
+        _logger.debug(msg, *args)
+
+
+def info(msg, *args):
+    if level <= INFO:
+        _logger.info(msg, *args)
+
+
+def warning(msg, *args):
+    if level <= WARNING:
+        _logger.warning(msg, *args)
+
+
+def error(msg, *args):
+    if level <= ERROR:
+        _logger.error(msg, *args)
+
+
+def exception(err):
+    """Log err at ERROR with its traceback."""
+    if level > ERROR:
+        return
+    # Not adafruit_logging's exception(), which repeats the message twice
+    try:
+        import traceback
+    except ImportError:
+        _logger.error("%s: %s", type(err).__name__, err)
+        return
+    _logger.error("%s", "".join(traceback.format_exception(err)).rstrip())
+
+
+def dump():
+    """Print the ring buffer to the console."""
+    print(ring.contents().decode("utf-8"), end="")
+
+
+def flush():
+    """Append the ring buffer to LOG_PATH now; see RingBufferHandler.flush_to_flash()."""
+    return ring.flush_to_flash()
@@ -0,0 +1,135 @@
+"""
+Memory governor for the display loop.
+
+Left alone, the collector runs whenever an allocation happens to fail,
+which can be in the middle of a fetch or a redraw, and after days of
+uptime the heap can be too fragmented for a response buffer even with
+plenty of memory free in total. The governor collects at a safe point
+instead, right after each fetch, when the response and the parser are
+garbage, then measures what the live data left: free memory (and its
+low-water mark) and the largest free block, probed by allocating.
+
+When either gets low it switches to degraded mode, which allocates less
+per cycle: every cache keeps a single departure and polls are spread
+further apart. It switches back once both have recovered well past the
+thresholds, so it doesn't flap.
+"""
+from adafruit_ticks import ticks_diff, ticks_ms
+
+from modules import log
+
+try:
+    from gc import collect, mem_free
+except ImportError:  # CPython (host tools), which has no heap figures
+    from gc import collect
+    mem_free = None
+
+# Degrade below either of these (bytes, measured right after a collect)
+LOW_FREE = 64 * 1024
+LOW_BLOCK = 16 * 1024
+# Recover once both are back above this multiple of their threshold
+RECOVERY_FACTOR = 2
+
+# The largest-block probe stops at PROBE_LIMIT (plenty for anything the
+# clock allocates) and is accurate to PROBE_STEP
+PROBE_LIMIT = 64 * 1024
+PROBE_STEP = 512
+
+# What degraded mode changes
+DEGRADED_CACHE_SIZE = 1
+DEGRADED_INTERVAL_SCALE = 2
+
+
+def largest_block(limit=PROBE_LIMIT, step=PROBE_STEP):
+    """
+    Size of the largest block that can be allocated right now, up to limit.
+
+    A binary search over bytearray sizes; each probe is freed straight
+    away, so this is meant to run just after a collect.
+    """
+    low = 0
+    high = limit // step
+    while low < high:
+        middle = (low + high + 1) // 2
+        try:
+            # Freed straight away: nothing keeps a reference
+            bytearray(middle * step)
+            low = middle
+        except MemoryError:
+            high = middle - 1
+    return low * step
+
+
+class MemoryGovernor:
+    """
+    Collects at safe points and decides when to save memory.
+
+    Args:
+        collect (callable): Runs a full collection (gc.collect)
+        mem_free (callable): Returns free heap bytes (gc.mem_free), or None
+            where there are no heap figures, which turns the governor into a
+            plain scheduled collect
+        probe (callable): Returns the largest allocatable block (largest_block)
+
+    Call checkpoint() right after each fetch, then adjust() to apply the
+    mode to the caches and the poll scheduler.
+    """
+
+    def __init__(self, collect=collect, mem_free=mem_free, probe=largest_block):
+        self.collect = collect
+        self.mem_free = mem_free
+        self.probe = probe
+        self.degraded = False
+        self.collections = 0
+        self.pause_ms = 0          # How long the last collect took
+        self.free = None           # Free bytes after the last collect
+        self.low_water = None      # Least free bytes after any collect
+        self.block = None          # Largest free block after the last collect
+        self.block_low_water = None
+        self._cache_sizes = {}     # DepartureCache -> size to restore
+
+    def checkpoint(self):
+        """
+        Collect, measure and update the mode.
+
+        Returns:
+            bool: True if the governor is in degraded mode
+        """
+        started = ticks_ms()
+        self.collect()
+        self.pause_ms = ticks_diff(ticks_ms(), started)
+        self.collections += 1
+        if self.mem_free is None:
+            return self.degraded
+
+        free = self.mem_free()
+        block = self.probe()
+        self.free = free
+        self.block = block
+        if self.low_water is None or free < self.low_water:
+            self.low_water = free
+        if self.block_low_water is None or block < self.block_low_water:
+            self.block_low_water = block
+
+        if not self.degraded and (free < LOW_FREE or block < LOW_BLOCK):
+            self.degraded = True
+            log.warning("Low memory (%d free, largest block %d): degraded mode", free, block)
+        elif (self.degraded and free >= LOW_FREE * RECOVERY_FACTOR
+                and block >= LOW_BLOCK * RECOVERY_FACTOR):
+            self.degraded = False
+            log.info("Memory recovered (%d free, largest block %d): normal mode", free, block)
+        return self.degraded
+
+    def adjust(self, departure_caches, poll_scheduler):
+        """Apply the current mode to the DepartureCaches and the PollScheduler."""
+        if self.degraded:
+            for cache in departure_caches:
+                if cache not in self._cache_sizes:
+                    self._cache_sizes[cache] = cache.size
+                    cache.size = DEGRADED_CACHE_SIZE
+            poll_scheduler.interval_scale = DEGRADED_INTERVAL_SCALE
+        else:
+            for cache, size in self._cache_sizes.items():
+                cache.size = size
+            self._cache_sizes = {}
+            poll_scheduler.interval_scale = 1
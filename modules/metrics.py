@@ -0,0 +1,346 @@
+"""
+Field metrics, kept in memory and served at http://<clock>/metrics.
+
+Every exported number lives in one preallocated array, and the HTTP
+response (status line, headers and a Prometheus-style text body) is laid
+out once at import with a fixed-width slot per number. Recording a value
+is a small-int update of the array; answering a scrape writes digits into
+the slots and sends the same buffer, so apart from the socket the network
+stack hands over for each client, serving /metrics allocates nothing and
+can't fail for lack of memory.
+
+Recorded from transitland.py (fetch latency, HTTP status, bytes received,
+clock sync), code.py's display loop (update time, free memory) and the
+memory governor (largest free block, collections, degraded mode).
+Counters wrap at COUNTER_WRAP so they stay small ints; scrapers treat the
+wrap like a counter reset.
+"""
+import errno
+import os
+import time
+from array import array
+
+from adafruit_ticks import ticks_diff, ticks_ms
+
+try:
+    from gc import mem_free
+except ImportError:  # CPython (host tools), which has no heap figures
+    mem_free = None
+
+# Below 2**30, CircuitPython's small-int limit, with room to spare: value +
+# amount must not pass the limit either, or adding would allocate a long int
+COUNTER_WRAP = 1 << 29
+# Characters per value: "-999999999" fits
+SLOT_WIDTH = 10
+
+# Histogram buckets (milliseconds)
+FETCH_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000)
+DISPLAY_BUCKETS = (5, 10, 25, 50, 100, 250, 500)
+
+# Listening port on the station network (CIRCUITPY_METRICS_PORT in settings.toml),
+# and how long a client may take to send or accept anything (seconds)
+METRICS_PORT = int(os.getenv("CIRCUITPY_METRICS_PORT", 80))
+CLIENT_TIMEOUT = 1
+# Pause between accept attempts when nobody is connecting (seconds)
+ACCEPT_INTERVAL = 0.25
+REQUEST_BUFFER_SIZE = 64
+
+# Metric line names in body order, registered at import by _metric()
+_names = []
+
+
+def _metric(name):
+    _names.append(name)
+    return len(_names) - 1
+
+
+class Histogram:
+    """Cumulative buckets, sum and count of a series of millisecond durations."""
+
+    def __init__(self, name, bounds):
+        self.bounds = bounds
+        self.first = len(_names)
+        for bound in bounds:
+            _metric(f'{name}_bucket{{le="{bound}"}}')
+        _metric(f'{name}_bucket{{le="+Inf"}}')
+        self.sum = _metric(f"{name}_sum")
+        self.count = _metric(f"{name}_count")
+
+    def observe(self, ms):
+        index = self.first
+        for bound in self.bounds:
+            if ms <= bound:
+                add(index)
+            index += 1
+        add(index)
+        add(self.sum, ms)
+        add(self.count)
+
+
+fetch_ms = Histogram("clock_fetch_ms", FETCH_BUCKETS)
+STATUS_200 = _metric('clock_http_responses{status="200"}')
+STATUS_429 = _metric('clock_http_responses{status="429"}')
+STATUS_4XX = _metric('clock_http_responses{status="4xx"}')
+STATUS_5XX = _metric('clock_http_responses{status="5xx"}')
+STATUS_OTHER = _metric('clock_http_responses{status="other"}')
+STATUS_ERROR = _metric('clock_http_responses{status="error"}')
+RECEIVED_BYTES = _metric("clock_received_bytes")
+MEM_FREE = _metric("clock_mem_free_bytes")
+MEM_FREE_LOW = _metric("clock_mem_free_low_bytes")
+MEM_LARGEST_BLOCK = _metric("clock_mem_largest_block_bytes")
+MEM_DEGRADED = _metric("clock_mem_degraded")
+GC_COLLECTIONS = _metric("clock_gc_collections")
+GC_PAUSE = _metric("clock_gc_pause_ms")
+SYNCED = _metric("clock_time_synced")
+SYNC_ERROR = _metric("clock_time_sync_error_seconds")
+SYNC_DRIFT = _metric("clock_time_drift_ppm")
+display_ms = Histogram("clock_display_ms", DISPLAY_BUCKETS)
+DISPLAY_MAX = _metric("clock_display_ms_max")
+
+values = array("l", [0] * len(_names))
+# Not measured yet
+values[MEM_FREE] = -1
+values[MEM_FREE_LOW] = -1
+values[MEM_LARGEST_BLOCK] = -1
+
+
+def add(index, amount=1):
+    values[index] = (values[index] + amount) % COUNTER_WRAP
+
+
+def record_fetch(seconds, status):
+    """
+    Record one API request.
+
+    Args:
+        seconds (float): How long it took
+        status (int): HTTP status, or None if it failed before one arrived
+    """
+    fetch_ms.observe(int(seconds * 1000))
+    if status is None:
+        add(STATUS_ERROR)
+    elif status == 200:
+        add(STATUS_200)
+    elif status == 429:
+        add(STATUS_429)
+    elif 400 <= status < 500:
+        add(STATUS_4XX)
+    elif 500 <= status < 600:
+        add(STATUS_5XX)
+    else:
+        add(STATUS_OTHER)
+    sample_memory()
+
+
+def add_received(count):
+    """Count response bytes read from the API."""
+    add(RECEIVED_BYTES, count)
+
+
+def record_clock(clock_sync):
+    """Copy the state of a modules.ntp.ClockSync."""
+    values[SYNCED] = 1 if clock_sync.is_synced() else 0
+    if clock_sync.last_error is not None:
+        values[SYNC_ERROR] = clock_sync.last_error
+    if clock_sync.drift is not None:
+        values[SYNC_DRIFT] = int(clock_sync.drift * 1000000)
+
+
+def record_memory(governor):
+    """Copy the state of a modules.memory.MemoryGovernor after its checkpoint."""
+    values[GC_COLLECTIONS] = governor.collections % COUNTER_WRAP
+    values[GC_PAUSE] = governor.pause_ms
+    values[MEM_DEGRADED] = 1 if governor.degraded else 0
+    if governor.block is not None:
+        values[MEM_LARGEST_BLOCK] = governor.block
+    sample_memory()
+
+
+def display_started():
+    """Call before a display update; pass the result to display_done()."""
+    return ticks_ms()
+
+
+def display_done(started):
+    ms = ticks_diff(ticks_ms(), started)
+    display_ms.observe(ms)
+    if ms > values[DISPLAY_MAX]:
+        values[DISPLAY_MAX] = ms
+
+
+def sample_memory():
+    """Record free heap memory and its low-water mark."""
+    if mem_free is None:
+        return
+    free = mem_free()
+    values[MEM_FREE] = free
+    if values[MEM_FREE_LOW] < 0 or free < values[MEM_FREE_LOW]:
+        values[MEM_FREE_LOW] = free
+
+
+def _layout():
+    """The response buffer and the offset of every value slot in it."""
+    body_length = 0
+    for name in _names:
+        body_length += len(name) + 1 + SLOT_WIDTH + 1
+    head = ("HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {body_length}\r\n"
+            "Connection: close\r\n\r\n").encode("utf-8")
+    buffer = bytearray(head)
+    slots = array("H")
+    for name in _names:
+        buffer.extend(name.encode("utf-8"))
+        buffer.extend(b" ")
+        slots.append(len(buffer))
+        buffer.extend(b" " * SLOT_WIDTH)
+        buffer.extend(b"\n")
+    return buffer, slots
+
+
+response, _slots = _layout()
+_response_view = memoryview(response)
+
+NOT_FOUND = (b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n"
+             b"Connection: close\r\n\r\n")
+_PATH = b"GET /metrics"
+
+
+def _write_value(offset, value):
+    """Right-align value in the slot at offset, space-padded."""
+    end = offset + SLOT_WIDTH
+    negative = value < 0
+    if negative:
+        value = -value
+    position = end
+    while True:
+        position -= 1
+        response[position] = 48 + value % 10
+        value //= 10
+        if not value:
+            break
+    if negative:
+        position -= 1
+        response[position] = 45  # '-'
+    while position > offset:
+        position -= 1
+        response[position] = 32
+
+
+def render():
+    """Write the current values into response; returns it."""
+    for index in range(len(values)):
+        _write_value(_slots[index], values[index])
+    return response
+
+
+def _is_metrics_request(request, length):
+    if length <= len(_PATH):
+        return False
+    for index in range(len(_PATH)):
+        if request[index] != _PATH[index]:
+            return False
+    following = request[len(_PATH)]
+    return following == 32 or following == 63  # ' ' or '?'
+
+
+class MetricsServer:
+    """
+    Answer GET /metrics on the station network, one client at a time.
+
+    Args:
+        pool (socketpool.SocketPool): Pool to create the listening socket from
+        host (str): Address to listen on (the clock's station address)
+        port (int): Port to listen on
+    """
+
+    def __init__(self, pool, host, port=METRICS_PORT):
+        self.pool = pool
+        self.host = host
+        self.port = port
+        self.running = False
+        self.socket = None
+        self.scrapes = 0
+        self._request = bytearray(REQUEST_BUFFER_SIZE)
+
+    def start(self):
+        """Create the listening socket."""
+        self.socket = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_STREAM)
+        self.socket.setblocking(False)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(1)
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    async def serve(self):
+        """Answer scrapes until stop() is called."""
+        import asyncio
+
+        if self.socket is None:
+            self.start()
+        while self.running:
+            try:
+                client, _ = self.socket.accept()
+            except OSError:
+                # No pending connection (or the socket was closed by stop())
+                await asyncio.sleep(ACCEPT_INTERVAL)
+                continue
+            try:
+                await self._answer(client)
+            except OSError:
+                pass  # The scraper went away; nothing to clean up but the socket
+            finally:
+                client.close()
+
+    async def _answer(self, client):
+        # Non-blocking, so a slow scraper can't hold up the display.
+        # The request line is all that's read; scrapers send it at once
+        client.setblocking(False)
+        length = await _receive(client, self._request)
+        if not _is_metrics_request(self._request, length):
+            await _send(client, NOT_FOUND)
+            return
+        render()
+        await _send(client, response, _response_view)
+        self.scrapes += 1
+
+
+async def _receive(client, buffer):
+    """recv_into on a non-blocking socket, yielding until something arrives."""
+    import asyncio
+
+    deadline = time.monotonic() + CLIENT_TIMEOUT
+    while True:
+        try:
+            return client.recv_into(buffer)
+        except OSError as e:
+            if e.errno != errno.EAGAIN or time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0)
+
+
+async def _send(client, data, view=None):
+    """Send all of data on a non-blocking socket; view, a memoryview of data, saves making one."""
+    import asyncio
+
+    if view is None:
+        view = memoryview(data)
+    sent = 0
+    deadline = time.monotonic() + CLIENT_TIMEOUT
+    while sent < len(data):
+        try:
+            count = client.send(view[sent:] if sent else data)
+        except OSError as e:
+            if e.errno != errno.EAGAIN or time.monotonic() > deadline:
+                raise
+            count = 0
+        if count:
+            sent += count
+            deadline = time.monotonic() + CLIENT_TIMEOUT
+        else:
+            await asyncio.sleep(0)
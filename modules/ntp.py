@@ -0,0 +1,320 @@
+"""
+SNTP clock sync for America/New_York.
+
+One 48-byte UDP round trip to an NTP server gives UTC; the New York offset
+(EST/EDT) is worked out locally from the US daylight saving rules and the
+RTC is set to local time, which is what the rest of the code reads through
+time.localtime() and datetime.now().
+
+Each sync also measures how far the RTC had drifted since the previous one,
+and the next sync is scheduled for when that drift would reach
+DRIFT_BUDGET seconds, i.e. only when it could start to show on the minute
+countdown. Daylight saving changes are applied to the RTC locally at the
+right instant, without the network. A failed sync is retried after
+RETRY_INTERVAL, not on every call.
+
+maintain_async() waits for the reply without blocking the event loop.
+Only the DNS lookup blocks, since getaddrinfo has no non-blocking form.
+The address is kept between syncs, so the lookup happens only on the
+first sync and after a failure.
+"""
+import errno
+import struct
+import time
+
+import rtc
+
+from modules import log, tasks
+
+NTP_SERVER = "pool.ntp.org"
+NTP_PORT = 123
+NTP_TIMEOUT = 5
+# Seconds from the NTP epoch (1900) to the Unix epoch (1970)
+NTP_DELTA = 2208988800
+
+# Resync once the RTC may be this many seconds off
+DRIFT_BUDGET = 15
+# Bounds on the time between syncs (seconds)
+MIN_SYNC_INTERVAL = 3600
+MAX_SYNC_INTERVAL = 7 * 86400
+# Before the drift has been measured (needs two syncs)
+FIRST_SYNC_INTERVAL = 3 * 3600
+# After a failed sync
+RETRY_INTERVAL = 300
+
+STANDARD_OFFSET = -5 * 3600  # EST
+DAYLIGHT_OFFSET = -4 * 3600  # EDT
+DAY_SECONDS = 86400
+
+_packet = bytearray(48)
+
+
+def days_from_civil(year, month, day):
+    """Days since 1970-01-01 of a proleptic Gregorian date."""
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def civil_from_days(days):
+    """(year, month, day) of a day count since 1970-01-01."""
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = mp + (3 if mp < 10 else -9)
+    year = year_of_era + era * 400
+    if month <= 2:
+        year += 1
+    return year, month, day
+
+
+def _nth_sunday(year, month, n):
+    """Day count of the n-th Sunday of a month."""
+    first = days_from_civil(year, month, 1)
+    # 1970-01-01 was a Thursday; (days + 3) % 7 == 6 is a Sunday
+    return first + (6 - (first + 3) % 7) % 7 + (n - 1) * 7
+
+
+def dst_changes(year):
+    """UTC seconds of the year's two changes (2007+ rules: second Sunday of March, first of November, 2:00 local)."""
+    start = _nth_sunday(year, 3, 2) * DAY_SECONDS + 2 * 3600 - STANDARD_OFFSET
+    end = _nth_sunday(year, 11, 1) * DAY_SECONDS + 2 * 3600 - DAYLIGHT_OFFSET
+    return start, end
+
+
+def utc_offset(utc_seconds):
+    """New York's offset from UTC (seconds) at a UTC instant."""
+    year = civil_from_days(utc_seconds // DAY_SECONDS)[0]
+    start, end = dst_changes(year)
+    return DAYLIGHT_OFFSET if start <= utc_seconds < end else STANDARD_OFFSET
+
+
+def next_dst_change(utc_seconds):
+    """UTC seconds of the first daylight saving change after a UTC instant."""
+    year = civil_from_days(utc_seconds // DAY_SECONDS)[0]
+    for change in dst_changes(year) + dst_changes(year + 1):
+        if change > utc_seconds:
+            return change
+    return None
+
+
+def to_struct_time(seconds):
+    """struct_time for seconds since 1970 (no time zone applied)."""
+    days, rest = divmod(seconds, DAY_SECONDS)
+    year, month, day = civil_from_days(days)
+    weekday = (days + 3) % 7
+    yearday = days - days_from_civil(year, 1, 1) + 1
+    return time.struct_time((year, month, day, rest // 3600, rest // 60 % 60, rest % 60,
+                             weekday, yearday, -1))
+
+
+def rtc_seconds():
+    """The RTC's current (local) time as seconds since 1970."""
+    now = time.localtime()
+    return (days_from_civil(now.tm_year, now.tm_mon, now.tm_mday) * DAY_SECONDS
+            + now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec)
+
+
+def resolve(pool, server=NTP_SERVER, port=NTP_PORT):
+    """The (host, port) address to send NTP queries for server to."""
+    return pool.getaddrinfo(server, port)[0][-1]
+
+
+def query(pool, address, timeout=NTP_TIMEOUT):
+    """
+    Ask an NTP server for the time.
+
+    Args:
+        address (tuple): The server's address, from resolve()
+
+    Returns:
+        int: UTC seconds since 1970, corrected for half the round trip
+    Raises:
+        OSError: The server could not be reached or sent a bad answer
+    """
+    sock = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
+    try:
+        sock.settimeout(timeout)
+        sent_at = _send_request(sock, address)
+        received = sock.recv_into(_packet)
+        round_trip = time.monotonic() - sent_at
+    finally:
+        sock.close()
+    return _reply_seconds(received, round_trip)
+
+
+async def query_async(pool, address, timeout=NTP_TIMEOUT):
+    """Same as query, yielding to other tasks until the reply arrives."""
+    sock = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sent_at = _send_request(sock, address)
+        while True:
+            try:
+                received = sock.recv_into(_packet)
+                break
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+                if time.monotonic() - sent_at > timeout:
+                    raise OSError(errno.ETIMEDOUT)
+                await tasks.sleep(0)
+        round_trip = time.monotonic() - sent_at
+    finally:
+        sock.close()
+    return _reply_seconds(received, round_trip)
+
+
+def _send_request(sock, address):
+    """Send a client request; returns when it went out (time.monotonic())."""
+    _packet[0] = 0x1B  # LI 0, version 3, mode 3 (client)
+    for i in range(1, len(_packet)):
+        _packet[i] = 0
+    sent_at = time.monotonic()
+    sock.sendto(_packet, address)
+    return sent_at
+
+
+def _reply_seconds(received, round_trip):
+    """UTC seconds from the reply in _packet."""
+    # Mode 4 is a server reply; stratum 0 is a "kiss-o'-death" refusal
+    if received < 48 or _packet[0] & 0x07 != 4 or _packet[1] == 0:
+        raise OSError("Bad NTP reply")
+    seconds, fraction = struct.unpack_from("!II", _packet, 40)
+    if not seconds:
+        raise OSError("Bad NTP reply")
+    return seconds - NTP_DELTA + int(fraction / 4294967296 + round_trip / 2 + 0.5)
+
+
+class ClockSync:
+    """
+    Keep the RTC on New York time.
+
+    Args:
+        pool (socketpool.SocketPool): Pool to create the UDP socket from
+        server (str): NTP server host name
+
+    Call maintain() (or maintain_async()) regularly, e.g. before each API
+    poll; it applies daylight saving changes locally and only goes to the
+    network when a sync is due.
+    """
+
+    def __init__(self, pool, server=NTP_SERVER):
+        self.pool = pool
+        self.server = server
+        self.address = None         # Resolved server address, kept until a sync fails
+        self.retry_at = None        # time.monotonic() after which a failed sync is retried
+        self.utc_offset = None      # Offset the RTC is currently set with
+        self.last_sync_utc = None
+        self.next_sync_utc = None
+        self.next_change_utc = None
+        self.drift = None           # RTC seconds gained per second (negative if slow)
+        self.last_error = None      # Seconds the RTC was off at the last sync
+
+    def is_synced(self):
+        return self.utc_offset is not None
+
+    def utc_now(self):
+        """UTC seconds since 1970 according to the RTC, or None before the first sync."""
+        if self.utc_offset is None:
+            return None
+        return rtc_seconds() - self.utc_offset
+
+    def is_due(self):
+        if self.retry_at is not None and time.monotonic() < self.retry_at:
+            return False
+        utc = self.utc_now()
+        return utc is None or utc >= self.next_sync_utc
+
+    def sync(self):
+        """Set the RTC from NTP; returns True on success."""
+        try:
+            utc = query(self.pool, self._resolve())
+        except Exception as e:
+            self._failed(e)
+            return False
+        self._synced(utc)
+        return True
+
+    async def sync_async(self):
+        """Same as sync, yielding to other tasks while waiting for the reply."""
+        try:
+            utc = await query_async(self.pool, self._resolve())
+        except Exception as e:
+            self._failed(e)
+            return False
+        self._synced(utc)
+        return True
+
+    def _resolve(self):
+        if self.address is None:
+            self.address = resolve(self.pool, self.server)
+        return self.address
+
+    def _failed(self, error):
+        log.warning("Error syncing time: %s", error)
+        # The pool may have handed out a dead server; look it up again next time
+        self.address = None
+        self.retry_at = time.monotonic() + RETRY_INTERVAL
+
+    def _synced(self, utc):
+        self.retry_at = None
+        if self.utc_offset is not None:
+            error = rtc_seconds() - self.utc_offset - utc
+            self.last_error = error
+            elapsed = utc - self.last_sync_utc
+            if elapsed > 0:
+                drift = error / elapsed
+                # Average with the previous estimate: RTC reads are whole seconds
+                self.drift = drift if self.drift is None else (self.drift + drift) / 2
+
+        self._set_rtc(utc)
+        self.last_sync_utc = utc
+        self.next_sync_utc = utc + self.sync_interval()
+        log.info("Time synced, next sync in %d s", self.next_sync_utc - utc)
+
+    def sync_interval(self):
+        """Seconds until the measured drift would use up DRIFT_BUDGET."""
+        if self.drift is None:
+            return FIRST_SYNC_INTERVAL
+        if not self.drift:
+            return MAX_SYNC_INTERVAL
+        return int(max(MIN_SYNC_INTERVAL, min(MAX_SYNC_INTERVAL, DRIFT_BUDGET / abs(self.drift))))
+
+    def maintain(self):
+        """
+        Apply a pending daylight saving change, then sync if one is due.
+
+        Returns:
+            bool: True if the RTC holds synced New York time
+        """
+        self._apply_dst_change()
+        if self.is_due():
+            self.sync()
+        return self.is_synced()
+
+    async def maintain_async(self):
+        """Same as maintain, yielding to other tasks while a sync waits for its reply."""
+        self._apply_dst_change()
+        if self.is_due():
+            await self.sync_async()
+        return self.is_synced()
+
+    def _apply_dst_change(self):
+        utc = self.utc_now()
+        if utc is not None and self.next_change_utc is not None and utc >= self.next_change_utc:
+            log.info("Applying daylight saving change")
+            self._set_rtc(utc)
+
+    def _set_rtc(self, utc):
+        self.utc_offset = utc_offset(utc)
+        self.next_change_utc = next_dst_change(utc)
+        rtc.RTC().datetime = to_struct_time(utc + self.utc_offset)
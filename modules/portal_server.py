@@ -0,0 +1,135 @@
+"""
+Non-blocking configuration portal server.
+
+Accepts several clients at once on the soft-AP and serves each one in its
+own asyncio task, so a phone retrying a request does not queue behind
+another one and the display task keeps running while pages are sent.
+Without the asyncio library (see modules/tasks.py) the same code serves
+one client at a time.
+"""
+import errno
+import time
+
+from modules import log, tasks
+from modules.http_request import RequestParser
+from modules.http_response import error_response
+
+# Most clients served at the same time; further connections wait in the backlog
+MAX_CLIENTS = 4
+# Give up on a client that sends or accepts nothing for this long (seconds)
+CLIENT_TIMEOUT = 5
+# Pause between accept attempts when nobody is connecting (seconds)
+ACCEPT_INTERVAL = 0.05
+REQUEST_BUFFER_SIZE = 1024
+
+
+class PortalServer:
+    """
+    Serve HTTP requests from the configuration portal with asyncio.
+
+    Args:
+        pool (socketpool.SocketPool): Pool to create the listening socket from
+        handler (callable): handler(request) -> modules.http_response.Response,
+            where request is a modules.http_request.Request
+        after_response (callable): Optional coroutine function called with
+            (request, response) once the response has been sent and the
+            client closed; used for setup state changes
+        host (str): Address to listen on
+        port (int): Port to listen on
+    """
+
+    def __init__(self, pool, handler, after_response=None, host="192.168.4.1", port=80):
+        self.pool = pool
+        self.handler = handler
+        self.after_response = after_response
+        self.host = host
+        self.port = port
+        self.running = False
+        self.clients = 0
+        self.socket = None
+
+    def start(self):
+        """Create the listening socket."""
+        self.socket = self.pool.socket(self.pool.AF_INET, self.pool.SOCK_STREAM)
+        self.socket.setblocking(False)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(MAX_CLIENTS)
+        self.running = True
+
+    def stop(self):
+        """Stop accepting clients and close the listening socket."""
+        self.running = False
+        if self.socket:
+            try:
+                self.socket.close()
+                log.info("Server closed successfully")
+            except Exception as e:
+                log.error("Error closing server: %s", e)
+            self.socket = None
+
+    async def serve(self):
+        """Accept clients until stop() is called."""
+        if self.socket is None:
+            self.start()
+        while self.running:
+            if self.clients >= MAX_CLIENTS:
+                await tasks.sleep(ACCEPT_INTERVAL)
+                continue
+            try:
+                client, addr = self.socket.accept()
+            except OSError:
+                # No pending connection (or the socket was closed by stop())
+                await tasks.sleep(ACCEPT_INTERVAL)
+                continue
+            self.clients += 1
+            tasks.create_task(self._serve_client(client))
+
+    async def _serve_client(self, client):
+        request = None
+        response = None
+        try:
+            client.setblocking(False)
+            try:
+                request = await self._read_request(client)
+            except ValueError as e:
+                # Malformed or oversized request: answer it rather than dropping the client
+                await error_response(400, str(e)).send(client)
+                request = None
+            if request:
+                response = self.handler(request)
+                await response.send(client)
+        except Exception as e:
+            log.error("Error handling request: %s", e)
+        finally:
+            try:
+                client.close()
+            except OSError:
+                pass
+            self.clients -= 1
+
+        if request and response and self.after_response:
+            try:
+                await self.after_response(request, response)
+            except Exception as e:
+                log.error("Error after response: %s", e)
+
+    async def _read_request(self, client):
+        """Receive until the headers and Content-Length body are in; None if the client hangs up."""
+        buffer = bytearray(REQUEST_BUFFER_SIZE)
+        view = memoryview(buffer)
+        parser = RequestParser()
+        deadline = time.monotonic() + CLIENT_TIMEOUT
+        while True:
+            try:
+                received = client.recv_into(buffer)
+            except OSError as e:
+                if e.errno != errno.EAGAIN or time.monotonic() > deadline:
+                    raise
+                await tasks.sleep(0)
+                continue
+            if not received:
+                return None
+            if parser.feed(view[:received]):
+                return parser.request
+            deadline = time.monotonic() + CLIENT_TIMEOUT
+
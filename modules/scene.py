@@ -0,0 +1,153 @@
+"""
+Countdown scene for the 64x32 matrix.
+
+Wraps the displayio group holding the minutes label, the "min" label and
+the boat, remembers what each of them currently shows, and only touches a
+property (or the group's children) when its value actually changes. The
+boat's 30 x positions and the pixel width of every minute count are worked
+out once, so an update is a few table lookups and comparisons; the display
+is refreshed only when something moved.
+"""
+DISPLAY_WIDTH = 64
+DISPLAY_HEIGHT = 32
+
+# The boat sails from the left edge (30+ minutes) to the right edge (1 minute)
+MAX_MINUTES = 30
+BOAT_MARGIN = 2
+BOAT_Y = 2
+NUMBER_X = 2
+
+IDLE = "boat_idle"
+COUNTDOWN = "ferry_time"
+ERROR = "error"
+
+# str() of the minute counts, so steady-state updates allocate no strings
+NUMBER_TEXTS = tuple(str(minutes) for minutes in range(100))
+
+
+def boat_positions(boat_width, display_width=DISPLAY_WIDTH):
+    """Boat x for 1..MAX_MINUTES minutes (index minutes - 1)."""
+    left = BOAT_MARGIN
+    right = display_width - boat_width - BOAT_MARGIN
+    return tuple(
+        left + (right - left) * (MAX_MINUTES - minutes) // (MAX_MINUTES - 1)
+        for minutes in range(1, MAX_MINUTES + 1)
+    )
+
+
+class CountdownScene:
+    """
+    Dirty-tracking view of the countdown display.
+
+    Args:
+        display: displayio display to refresh (auto_refresh should be off)
+        group (displayio.Group): Empty group the scene owns; set it as root_group
+        number_label: Label for the minutes (scaled)
+        min_label: Label reading "min", placed right after the number
+        boat (displayio.TileGrid): Boat sprite, or None
+        boat_size (tuple): Boat (width, height) in pixels
+    """
+
+    def __init__(self, display, group, number_label, min_label, boat=None, boat_size=(0, 0)):
+        self.display = display
+        self.group = group
+        self.number_label = number_label
+        self.min_label = min_label
+        self.boat = boat
+        boat_width, boat_height = boat_size
+        self.boat_x = boat_positions(boat_width)
+        self.idle_position = ((DISPLAY_WIDTH - boat_width) // 2, (DISPLAY_HEIGHT - boat_height) // 2)
+
+        self.mode = None
+        self.text = number_label.text
+        self.min_x = min_label.x
+        self.boat_position = (boat.x, boat.y) if boat else None
+        self.dirty = True
+
+        # Scaled pixel width of each minute count the boat can show; others are measured on first use
+        self.widths = {}
+        for minutes in range(1, MAX_MINUTES + 1):
+            self.number_width(NUMBER_TEXTS[minutes])
+
+        self.show_idle()
+
+    def number_width(self, text):
+        """Scaled pixel width of text in the number label (cached)."""
+        width = self.widths.get(text)
+        if width is None:
+            self._set_text(text)
+            width = self.number_label.bounding_box[2] * self.number_label.scale
+            self.widths[text] = width
+        return width
+
+    def show_countdown(self, minutes):
+        """Show "<minutes> min" with the boat placed along the countdown."""
+        self._set_mode(COUNTDOWN)
+        text = NUMBER_TEXTS[minutes] if minutes < len(NUMBER_TEXTS) else str(minutes)
+        width = self.number_width(text)
+        self._set_text(text)
+
+        min_x = NUMBER_X + width
+        if min_x != self.min_x:
+            self.min_label.x = min_x
+            self.min_x = min_x
+            self.dirty = True
+
+        clamped = max(1, min(MAX_MINUTES, minutes))
+        self._move_boat(self.boat_x[clamped - 1], BOAT_Y)
+
+    def show_idle(self):
+        """Show only the boat, centered."""
+        self._set_mode(IDLE)
+        self._move_boat(*self.idle_position)
+
+    def show_error(self):
+        """Show "ERR" in place of the minutes."""
+        self._set_mode(ERROR)
+        self._set_text("ERR")
+
+    def set_boat_tile(self, tile):
+        """Show another atlas tile (route color) on the boat."""
+        if self.boat is not None and self.boat[0] != tile:
+            self.boat[0] = tile
+            self.dirty = True
+
+    def render(self):
+        """Refresh the display if anything changed; returns True if it did."""
+        if not self.dirty:
+            return False
+        self.dirty = False
+        if self.display is not None:
+            self.display.refresh()
+        return True
+
+    def _set_mode(self, mode):
+        if mode == self.mode:
+            return
+        while len(self.group):
+            self.group.pop()
+        if mode == COUNTDOWN:
+            self.group.append(self.number_label)
+            self.group.append(self.min_label)
+        elif mode == ERROR:
+            self.group.append(self.number_label)
+        if self.boat:
+            self.group.append(self.boat)
+        self.mode = mode
+        self.dirty = True
+
+    def _set_text(self, text):
+        if text != self.text:
+            self.number_label.text = text
+            self.text = text
+            self.dirty = True
+
+    def _move_boat(self, x, y):
+        if self.boat is None:
+            return
+        position = self.boat_position
+        if position[0] != x or position[1] != y:
+            self.boat.x = x
+            self.boat.y = y
+            self.boat_position = (x, y)
+            self.dirty = True
@@ -0,0 +1,154 @@
+"""
+Adaptive polling scheduler for TransitLand departure fetches.
+
+Decides when the next API call should happen from three inputs:
+    - how many minutes are left until the next departure (dense polling
+      close to departure, sparse when the boat is far out)
+    - how much realtime estimates have been moving between fetches
+    - consecutive errors, which back off exponentially with jitter
+
+Every decision is recorded in `next_interval` and `reason` so it can be
+inspected from the serial console or a test.
+"""
+import random
+import time
+
+# Poll interval (seconds) by minutes left until departure, checked in order
+POLL_INTERVALS = (
+    (3, 20),     # Boat is about to leave: estimates matter most
+    (10, 45),
+    (20, 90),
+)
+FAR_INTERVAL = 180    # More than 20 minutes out
+IDLE_INTERVAL = 300   # No upcoming departure (out of hours, no realtime data)
+MIN_INTERVAL = 15     # Never poll faster than this
+
+# Estimate volatility: exponentially weighted mean of estimate shifts (seconds)
+VOLATILITY_WEIGHT = 0.5
+VOLATILE_SHIFT = 60   # Halve the interval above this
+UNSTABLE_SHIFT = 180  # Quarter the interval above this
+
+# Error backoff: ERROR_BASE * 2 ** (errors - 1), capped, with jitter
+ERROR_BASE = 15
+ERROR_MAX = 300
+JITTER_LOW = 0.5      # Backoff is scaled by a random factor in [JITTER_LOW, 1.0]
+
+
+class PollScheduler:
+    """
+    Picks the next fetch time from the countdown, estimate volatility and errors.
+
+    Args:
+        clock (callable): Returns the current time in seconds (time.monotonic)
+        rng (callable): Returns a random float in [a, b] (random.uniform)
+    """
+
+    def __init__(self, clock=time.monotonic, rng=random.uniform):
+        self.clock = clock
+        self.rng = rng
+        self.errors = 0
+        self.volatility = 0.0
+        self.next_interval = 0
+        self.reason = "startup"
+        self.next_fetch_at = None  # None means a fetch is due right away
+        self.interval_scale = 1    # Stretched by modules/memory.py while memory is low
+
+    def interval_for(self, minutes_left, volatility=0.0):
+        """
+        Return (seconds, reason) for a successful fetch, without jitter.
+
+        Args:
+            minutes_left (int): Minutes until the next departure, or None
+            volatility (float): Recent average estimate shift in seconds
+        """
+        if minutes_left is None:
+            return IDLE_INTERVAL, "idle"
+
+        interval = FAR_INTERVAL
+        reason = "far"
+        for max_minutes, seconds in POLL_INTERVALS:
+            if minutes_left <= max_minutes:
+                interval = seconds
+                reason = "near" if max_minutes == POLL_INTERVALS[0][0] else "approaching"
+                break
+
+        if volatility > UNSTABLE_SHIFT:
+            interval //= 4
+            reason = "unstable"
+        elif volatility > VOLATILE_SHIFT:
+            interval //= 2
+            reason = "volatile"
+
+        # No point sleeping past the departure itself
+        if minutes_left > 0:
+            interval = min(interval, minutes_left * 60)
+
+        return max(MIN_INTERVAL, interval), reason
+
+    def backoff_for(self, errors):
+        """Return the maximum backoff in seconds after `errors` consecutive failures."""
+        if errors <= 0:
+            return 0
+        return min(ERROR_MAX, ERROR_BASE * (1 << min(errors - 1, 8)))
+
+    def record_success(self, minutes_left, estimate_shift=None):
+        """
+        Schedule the next fetch after a successful one.
+
+        Args:
+            minutes_left (int): Minutes until the next departure, or None
+            estimate_shift (int): Seconds the estimate for the same trip moved
+                since the previous fetch, or None if there was nothing to compare
+        """
+        self.errors = 0
+        if estimate_shift is not None:
+            self.volatility += VOLATILITY_WEIGHT * (abs(estimate_shift) - self.volatility)
+        interval, reason = self.interval_for(minutes_left, self.volatility)
+        self._schedule(interval, reason)
+
+    def record_error(self):
+        """Schedule a retry with exponential backoff and jitter."""
+        self.errors += 1
+        backoff = self.backoff_for(self.errors)
+        interval = max(MIN_INTERVAL, int(backoff * self.rng(JITTER_LOW, 1.0)))
+        self._schedule(interval, "error")
+
+    def update_countdown(self, minutes_left):
+        """
+        Pull the next fetch forward when the countdown enters a denser band.
+
+        Called every display tick so that a poll scheduled while the boat was
+        far out does not run past the final minutes before departure.
+        """
+        if self.errors or self.next_fetch_at is None:
+            return
+        interval, reason = self.interval_for(minutes_left, self.volatility)
+        if self.clock() + interval * self.interval_scale < self.next_fetch_at:
+            self._schedule(interval, reason)
+
+    def is_due(self, cache_stale=False):
+        """
+        True when a fetch should happen now.
+
+        Args:
+            cache_stale (bool): The departure cache is running out or too old;
+                this can cut a normal wait short but never an error backoff
+        """
+        if self.next_fetch_at is None:
+            return True
+        if cache_stale and not self.errors:
+            return True
+        return self.clock() >= self.next_fetch_at
+
+    def time_until_due(self):
+        """Seconds until the next scheduled fetch (0 if due now)."""
+        if self.next_fetch_at is None:
+            return 0
+        return max(0, self.next_fetch_at - self.clock())
+
+    def _schedule(self, interval, reason):
+        # Every path goes through here, so degraded mode stretches them all
+        interval *= self.interval_scale
+        self.next_interval = interval
+        self.reason = reason
+        self.next_fetch_at = self.clock() + interval
@@ -0,0 +1,58 @@
+"""
+Boat sprites from the single atlas built by tools/build_sprites.py.
+
+boats/atlas.bmp is one indexed-color strip holding the boat in every route
+color, side by side in COLORS order. It is opened once, with one shared
+palette, and each caller gets its own TileGrid showing the tile for its
+route's color.
+"""
+ATLAS_PATH = "boats/atlas.bmp"
+
+# Route colors (the "color" field in routes_data.py) in atlas tile order;
+# tools/build_sprites.py checks this against routes_data
+COLORS = ("orange", "teal", "gray", "purple", "coral", "yellow", "pink", "navy")
+DEFAULT_COLOR = "teal"
+
+_atlas = None
+
+
+def get_atlas():
+    """Return the atlas OnDiskBitmap, opening it on first use."""
+    global _atlas
+    if _atlas is None:
+        # displayio only exists on the board; tools/build_sprites.py imports COLORS from here
+        import displayio
+        _atlas = displayio.OnDiskBitmap(ATLAS_PATH)
+    return _atlas
+
+
+def color_index(color):
+    """Atlas tile of a route color; unknown colors get the default boat."""
+    if color in COLORS:
+        return COLORS.index(color)
+    return COLORS.index(DEFAULT_COLOR)
+
+
+def tile_size():
+    """(width, height) of one boat."""
+    atlas = get_atlas()
+    return atlas.width // len(COLORS), atlas.height
+
+
+def boat_tile(color=DEFAULT_COLOR):
+    """
+    A new TileGrid showing the boat in a route color.
+
+    Raises:
+        OSError: The atlas is missing from the CIRCUITPY drive
+    """
+    import displayio
+    atlas = get_atlas()
+    width, height = tile_size()
+    return displayio.TileGrid(
+        atlas,
+        pixel_shader=atlas.pixel_shader,
+        tile_width=width,
+        tile_height=height,
+        default_tile=color_index(color),
+    )
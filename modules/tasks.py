@@ -0,0 +1,61 @@
+"""
+asyncio where the board has it, otherwise a blocking stand-in.
+
+asyncio is not built into CircuitPython: it comes from the bundle's
+asyncio library in /lib (which needs adafruit_ticks). The portal and the
+display loop are coroutines, and without the library they still run with
+the stand-ins below: sleep() blocks, create_task() runs the coroutine to
+the end before returning, gather() runs its coroutines one after the
+other and run() drives a coroutine that never suspends. Portal clients are
+then served one at a time and the countdown starts once setup is over.
+"""
+import time
+
+try:
+    import asyncio
+    ASYNCIO_AVAILABLE = True
+except ImportError:
+    ASYNCIO_AVAILABLE = False
+
+
+if ASYNCIO_AVAILABLE:
+    sleep = asyncio.sleep
+    create_task = asyncio.create_task
+    gather = asyncio.gather
+    run = asyncio.run
+    Event = asyncio.Event
+else:
+    async def sleep(seconds):
+        time.sleep(seconds)
+
+    def run(coroutine):
+        try:
+            coroutine.send(None)
+        except StopIteration as stop:
+            return stop.value
+        raise RuntimeError("coroutine suspended without asyncio")
+
+    def create_task(coroutine):
+        run(coroutine)
+
+    async def gather(*coroutines):
+        results = []
+        for coroutine in coroutines:
+            results.append(await coroutine)
+        return results
+
+    class Event:
+        def __init__(self):
+            self.state = False
+
+        def set(self):
+            self.state = True
+
+        def is_set(self):
+            return self.state
+
+        async def wait(self):
+            # Nothing else runs meanwhile, so an unset event would never be set
+            if not self.state:
+                raise RuntimeError("waiting on an unset event without asyncio")
+            return True
@@ -0,0 +1,171 @@
+"""
+Tiny template engine for the configuration portal.
+
+Each HTML file in /modules/HTML is read from flash once and split into
+static byte chunks and named `{{slot}}` markers. Rendering a page returns a
+list of byte chunks that reference the cached static parts and the slot
+values, so nothing is re-read, searched or copied per request. Fragments
+that only depend on a small key (e.g. the stop <option> list for a route)
+are memoized in an LRU cache.
+
+tools/build_assets.py writes a minified page.min.html, read here in place of
+page.html, and for pages without slots a page.html.gz that static_page()
+streams straight from flash to clients that accept gzip. The built files
+are used whenever they exist, so host/tests fails when one no longer matches
+its source page.
+"""
+import os
+
+from modules import log
+from modules.http_response import FileResponse, Response
+
+HTML_DIR = "/modules/HTML"
+
+_SLOT_START = b"{{"
+_SLOT_END = b"}}"
+
+# filename -> tuple of static bytes chunks and slot names (str)
+_templates = {}
+
+
+class FragmentCache:
+    """
+    Least-recently-used cache of rendered fragments.
+
+    Args:
+        size (int): Maximum number of fragments kept
+    """
+
+    def __init__(self, size=16):
+        self.size = size
+        self._values = {}
+        self._order = []  # Least recently used first
+
+    def get(self, key, build):
+        """Return the cached fragment for key, calling build() on a miss."""
+        value = self._values.get(key)
+        if value is not None:
+            if self._order[-1] != key:
+                self._order.remove(key)
+                self._order.append(key)
+            return value
+
+        value = build()
+        if len(self._order) >= self.size:
+            del self._values[self._order.pop(0)]
+        self._values[key] = value
+        self._order.append(key)
+        return value
+
+    def clear(self):
+        self._values = {}
+        self._order = []
+
+
+def parse(data):
+    """Split template bytes into a tuple of static chunks and slot names."""
+    parts = []
+    position = 0
+    while True:
+        start = data.find(_SLOT_START, position)
+        if start == -1:
+            break
+        end = data.find(_SLOT_END, start)
+        if end == -1:
+            break
+        if start > position:
+            parts.append(data[position:start])
+        parts.append(str(data[start + 2:end], "utf-8").strip())
+        position = end + 2
+    if position < len(data):
+        parts.append(data[position:])
+    return tuple(parts)
+
+
+def load(filename):
+    """Return the parsed template for an HTML file, reading it from flash once."""
+    template = _templates.get(filename)
+    if template is None:
+        minified = filename[:-len(".html")] + ".min.html"
+        try:
+            try:
+                file = open(f"{HTML_DIR}/{minified}", "rb")
+            except OSError:
+                # Assets not built; serve the source page
+                file = open(f"{HTML_DIR}/{filename}", "rb")
+            with file:
+                template = parse(file.read())
+        except OSError as e:
+            log.error("Failed to load HTML file: %s", e)
+            return (b"<h1>Error: Unable to load the HTML file.</h1>",)
+        _templates[filename] = template
+    return template
+
+
+def render(filename, slots=None):
+    """
+    Render a template into a list of byte chunks.
+
+    Args:
+        filename (str): HTML file in /modules/HTML
+        slots (dict): Slot name -> bytes (or str) value; missing slots render empty
+    """
+    chunks = []
+    for part in load(filename):
+        if isinstance(part, str):
+            value = slots.get(part) if slots else None
+            if value:
+                chunks.append(value.encode("utf-8") if isinstance(value, str) else value)
+        else:
+            chunks.append(part)
+    return chunks
+
+
+def escape(text):
+    """Escape text for use inside HTML element content or attribute values."""
+    return (text.replace("&", "&amp;").replace("<", "&lt;")
+            .replace(">", "&gt;").replace('"', "&quot;"))
+
+
+def accepts_gzip(request):
+    """Whether the client's Accept-Encoding allows a gzip body; q=0 refuses it."""
+    wildcard = False
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if coding != "gzip" and coding != "*":
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == "gzip":
+            return quality > 0
+        # "*" stands for gzip only when gzip isn't listed itself
+        wildcard = quality > 0
+    return wildcard
+
+
+def static_page(filename, request=None):
+    """
+    Response for a page without slots.
+
+    Sends the precompressed page.html.gz from flash when the client accepts
+    gzip and the file exists, otherwise the (minified) page as plain text.
+    """
+    if request is not None and accepts_gzip(request):
+        path = f"{HTML_DIR}/{filename}.gz"
+        try:
+            size = os.stat(path)[6]
+        except OSError:
+            size = None
+        if size is not None:
+            return FileResponse(path, size, headers={
+                "Content-Encoding": "gzip",
+                "Vary": "Accept-Encoding",
+            })
+    return Response(render(filename))
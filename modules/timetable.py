@@ -0,0 +1,155 @@
+"""
+Offline scheduled departures from the timetable.bin built by tools/build_timetable.py.
+
+The file is never loaded into RAM: the index and the departure list are
+both binary-searched with seek + readinto into small preallocated buffers.
+See tools/build_timetable.py for the file layout.
+"""
+import struct
+import time
+
+TIMETABLE_PATH = "/timetable.bin"
+
+MAGIC = b"CCTT"
+VERSION = 1
+HEADER_FORMAT = "<4sHHII"
+INDEX_FORMAT = "<IIHxx"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+DAY_SECONDS = 86400
+
+_header_buf = bytearray(HEADER_SIZE)
+_index_buf = bytearray(INDEX_SIZE)
+_departure_buf = bytearray(4)
+
+
+def key_hash(key):
+    """32-bit FNV-1a hash of a "stop|route|headsign" key."""
+    value = 0x811C9DC5
+    for b in key.encode("utf-8"):
+        value = ((value ^ b) * 0x01000193) & 0xFFFFFFFF
+    return value
+
+
+def _read_departure(file, offset, position):
+    file.seek(offset + position * 4)
+    file.readinto(_departure_buf)
+    return struct.unpack("<I", _departure_buf)[0]
+
+
+def _find_block(file, count, key):
+    """Return (departures offset, departure count) for key, or None."""
+    target = key_hash(key)
+    lo = 0
+    hi = count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        file.seek(HEADER_SIZE + mid * INDEX_SIZE)
+        file.readinto(_index_buf)
+        if struct.unpack_from("<I", _index_buf)[0] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    encoded = key.encode("utf-8")
+    # Walk entries sharing the hash and confirm the stored key
+    while lo < count:
+        file.seek(HEADER_SIZE + lo * INDEX_SIZE)
+        file.readinto(_index_buf)
+        entry_hash, offset, departures = struct.unpack(INDEX_FORMAT, _index_buf)
+        if entry_hash != target:
+            return None
+        file.seek(offset)
+        length = file.read(1)[0]
+        if length == len(encoded) and file.read(length) == encoded:
+            return offset + 1 + length, departures
+        lo += 1
+    return None
+
+
+def _first_at_or_after(file, offset, count, seconds, weekday):
+    """Seconds of the first departure >= seconds running on weekday, or None."""
+    lo = 0
+    hi = count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _read_departure(file, offset, mid) >> 8 < seconds:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    bit = 1 << weekday
+    while lo < count:
+        record = _read_departure(file, offset, lo)
+        if record & bit:
+            return record >> 8
+        lo += 1
+    return None
+
+
+def next_scheduled_departures(stop_onestop_id, trip_headsign, route_id, limit=1,
+                              path=TIMETABLE_PATH):
+    """
+    Look up the next scheduled departures without the network.
+
+    Returns:
+        list: (scheduled, None) tuples with "HH:MM:SS" times, matching the
+              shape of fetch_departures results (empty if nothing is found or
+              the timetable is missing or out of date)
+    """
+    try:
+        file = open(path, "rb")
+    except OSError:
+        return []
+
+    departures = []
+    try:
+        file.readinto(_header_buf)
+        magic, version, count, first_date, last_date = struct.unpack(HEADER_FORMAT, _header_buf)
+        if magic != MAGIC or version != VERSION:
+            return []
+
+        now = time.localtime()
+        today = now.tm_year * 10000 + now.tm_mon * 100 + now.tm_mday
+        if first_date and not first_date <= today <= last_date:
+            from modules import log
+            log.warning("Offline timetable is out of date")
+            return []
+
+        block = _find_block(file, count, f"{stop_onestop_id}|{route_id}|{trip_headsign}")
+        if block is None:
+            return []
+        offset, total = block
+
+        now_seconds = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+        weekday = now.tm_wday
+        yesterday = (weekday + 6) % 7
+
+        # Trips after midnight belong to yesterday's service day (times past 24:00)
+        seconds = now_seconds + DAY_SECONDS
+        while len(departures) < limit:
+            found = _first_at_or_after(file, offset, total, seconds, yesterday)
+            if found is None:
+                break
+            departures.append(found - DAY_SECONDS)
+            seconds = found + 1
+
+        # Today's service day, including its own trips after midnight
+        seconds = now_seconds
+        while len(departures) < limit:
+            found = _first_at_or_after(file, offset, total, seconds, weekday)
+            if found is None or found >= 2 * DAY_SECONDS:
+                break
+            departures.append(found - DAY_SECONDS if found >= DAY_SECONDS else found)
+            seconds = found + 1
+    except (OSError, ValueError, IndexError) as e:
+        from modules import log
+        log.warning("Error reading offline timetable: %s", e)
+        return []
+    finally:
+        file.close()
+
+    return [
+        (f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}", None)
+        for s in departures
+    ]
@@ -1,15 +1,19 @@
-import adafruit_requests as requests
-import json
 import os
-import ssl
-from adafruit_datetime import datetime, timedelta
-import wifi
-import socketpool
-import rtc
 import time
+from modules.api_connection import ApiConnection
+from modules.countdown import countdown, parse_time_of_day
+from modules.departure_parser import DepartureParser
+from modules import log, metrics
+from modules.ntp import ClockSync
+from modules.async_http import ASYNCIO_AVAILABLE, stream_get
+from modules.timetable import next_scheduled_departures
 
-# TransitLand API Base URL
-TRANSITLAND_API_BASE = "https://transit.land/api/v2/rest"
+if ASYNCIO_AVAILABLE:
+    import asyncio
+
+# TransitLand API Base URL; set TRANSITLAND_API_BASE in settings.toml to use
+# another server, e.g. the stub in host/transitland_stub.py
+TRANSITLAND_API_BASE = os.getenv("TRANSITLAND_API_BASE", "https://transit.land/api/v2/rest")
 
 def get_api_key():
     """Read API key from secrets.toml file."""
@@ -32,11 +36,18 @@ def get_api_key():
                     return value
         return ""
     except Exception as e:
-        print(f"Error reading secrets.toml: {e}")
+        log.error("Error reading secrets.toml: %s", e)
         return ""
 
-# Your TransitLand API key
-API_KEY = get_api_key()
+# Your TransitLand API key (read from secrets.toml on the first request)
+api_key = None
+
+def load_api_key():
+    """Return the API key, reading secrets.toml only the first time."""
+    global api_key
+    if api_key is None:
+        api_key = get_api_key()
+    return api_key
 
 # Feed Onestop ID and GTFS stop_id
 FEED_ONESTOP_ID = "f-nycferry~rt"
@@ -44,205 +55,562 @@ STOP_ID = os.getenv("CIRCUITPY_FERRY_STOP_ID")
 ROUTE_ID = os.getenv("CIRCUITPY_FERRY_ROUTE_ID")
 HEADSIGN = os.getenv("CIRCUITPY_FERRY_HEADSIGN")
 
-# Initialize requests session (will be set up when needed)
-requests_session = None
+# Optional list of several stops/routes/headsigns to watch, e.g.
+# CIRCUITPY_FERRY_WATCH_LIST = "s-...-hunterspointsouth|Wall St./Pier 11|r-dr5rs-er;s-...|...|..."
+WATCH_LIST_SETTING = "CIRCUITPY_FERRY_WATCH_LIST"
+# Most stops fetched at the same time (each holds a TLS socket open)
+MAX_CONCURRENT_FETCHES = 3
+
+# Size of each read from the departures response body
+RESPONSE_CHUNK_SIZE = 512
+
+# Departure cache settings
+CACHE_SIZE = 4            # Upcoming departures kept between API polls
+CACHE_MAX_AGE = 300       # Seconds before cached estimates are refreshed anyway
+CACHE_MIN_REMAINING = 2   # Refresh early when fewer departures than this remain
+
+# Keep-alive connection to the API host (will be set up when needed)
+api_connection = None
+
+def get_api_connection():
+    """Return the pooled keep-alive connection to the TransitLand API."""
+    global api_connection
+    if api_connection is None:
+        proto, host, port, _ = split_url(TRANSITLAND_API_BASE)
+        api_connection = ApiConnection(host, port, proto=proto)
+    return api_connection
 
 def setup_requests():
-    """Set up the requests session with CircuitPython networking."""
-    global requests_session
-    if requests_session is None:
-        pool = socketpool.SocketPool(wifi.radio)
-        ssl_context = ssl.create_default_context()
-        requests_session = requests.Session(pool, ssl_context=ssl_context)
-    return requests_session
+    """Return the requests session, which shares the API connection pool."""
+    return get_api_connection().session
+
+# SNTP clock sync (will be set up when needed)
+clock_sync = None
+
+def get_clock_sync():
+    """Return the SNTP clock sync, sharing the API connection's socket pool."""
+    global clock_sync
+    if clock_sync is None:
+        clock_sync = ClockSync(get_api_connection().pool)
+    return clock_sync
 
 def sync_time():
-    """Sync the RTC with network time using a simple HTTP time API."""
-    try:
-        session = setup_requests()
-        # Use worldtimeapi.org to get current time for New York
-        url = "http://worldtimeapi.org/api/timezone/America/New_York"
-        
-        # print("Syncing time...")
-        response = session.get(url)
-        if response.status_code == 200:
-            time_data = response.json()
-            # Parse the datetime string: "2024-01-15T14:30:45.123456-05:00"
-            datetime_str = time_data["datetime"]
-            # Extract just the date and time parts (before the timezone offset)
-            dt_part = datetime_str.split("+")[0].split("-05:00")[0].split("-04:00")[0]
-            if "T" in dt_part:
-                date_part, time_part = dt_part.split("T")
-                year, month, day = map(int, date_part.split("-"))
-                time_components = time_part.split(":")
-                hour = int(time_components[0])
-                minute = int(time_components[1])
-                second = int(float(time_components[2]))  # Handle decimal seconds
-                
-                # Set the RTC
-                current_time = time.struct_time((year, month, day, hour, minute, second, 0, 0, 0))
-                rtc.RTC().datetime = current_time
-                
-                # print(f"Time synced to: {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}")
-                return True
-        
-        # print("Failed to sync time")
-        return False
-        
-    except Exception as e:
-        # print(f"Error syncing time: {e}")
-        return False
+    """Sync the RTC to New York time over SNTP; returns True on success."""
+    return get_clock_sync().sync()
 
 def are_boats_running():
     """Check if boats are currently running (5am to 11pm)."""
     try:
-        now = datetime.now()
-        current_hour = now.hour
+        now = time.localtime()
+        current_hour = now.tm_hour
         
         # Boats run from 5am (05:00) to 11pm (23:00)
         # No boats from 11pm (23:00) to 5am (05:00)
         boats_running = 5 <= current_hour < 23
         
-        # print(f"Current time: {now.hour:02d}:{now.minute:02d}, Boats running: {boats_running}")
+        if __debug__:
+            log.debug("Current time: %02d:%02d, Boats running: %s", now.tm_hour, now.tm_min, boats_running)
         return boats_running
     except Exception as e:
-        # print(f"Error checking boat schedule: {e}")
+        log.warning("Error checking boat schedule: %s", e)
         # If we can't determine the time, assume boats are running to be safe
         return True
 
+def get_watch_list():
+    """
+    Return the (stop_onestop_id, trip_headsign, route_id) entries to track.
+
+    Reads CIRCUITPY_FERRY_WATCH_LIST when set, otherwise the single stop,
+    headsign and route written by the ferry configuration page.
+    """
+    watch_list = []
+    setting = os.getenv(WATCH_LIST_SETTING, "")
+    for entry in setting.split(";"):
+        parts = [part.strip() for part in entry.split("|")]
+        if len(parts) == 3 and all(parts) and tuple(parts) not in watch_list:
+            watch_list.append(tuple(parts))
+
+    if not watch_list:
+        # Read at call time: the settings may have been written after import
+        stop_id = os.getenv("CIRCUITPY_FERRY_STOP_ID")
+        headsign = os.getenv("CIRCUITPY_FERRY_HEADSIGN")
+        route_id = os.getenv("CIRCUITPY_FERRY_ROUTE_ID")
+        if stop_id and headsign and route_id:
+            watch_list.append((stop_id, headsign, route_id))
+    return watch_list
+
+def departures_url(stop_onestop_id):
+    """Return the URL of the departures endpoint for a stop."""
+    return f"{TRANSITLAND_API_BASE}/stops/{stop_onestop_id}/departures?api_key={load_api_key()}"
+
+def split_url(url):
+    """Split "https://host[:port]/path?query" into ("https:", "host", port, "/path?query")."""
+    scheme, host_and_path = url.split("://", 1)
+    slash = host_and_path.find("/")
+    if slash == -1:
+        host, path = host_and_path, "/"
+    else:
+        host, path = host_and_path[:slash], host_and_path[slash:]
+    port = 443 if scheme == "https" else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return scheme + ":", host, port, path
+
+def fetch_stop_departures(stop_onestop_id, filters, limit=1):
+    """
+    Fetch the next `limit` departures at a stop for each (trip_headsign, route_id) filter.
+
+    The response body is streamed through DepartureParser in fixed-size chunks
+    rather than loaded with response.json(), so memory use does not grow with
+    the number of departures at the stop.
+
+    Returns:
+        dict: (trip_headsign, route_id) -> list of (scheduled, estimated)
+              tuples ordered by scheduled time, or None if the request failed
+    """
+    connection = get_api_connection()
+    connection.prepare()
+    url = departures_url(stop_onestop_id)
+
+    if __debug__:
+        log.debug("Making request to: %s", url)
+    departures = None
+    healthy = False
+    status = None
+    started = connection.request_started()
+    try:
+        response = connection.session.get(url)
+        complete = False
+        try:
+            status = response.status_code
+            if status == 200:
+                parser = DepartureParser(filters, limit)
+                for chunk in response.iter_content(chunk_size=RESPONSE_CHUNK_SIZE):
+                    metrics.add_received(len(chunk))
+                    if parser.feed(chunk):
+                        break
+                else:
+                    complete = True
+                departures = parser.departures
+            else:
+                log.warning("HTTP Error: %d", status)
+        finally:
+            if complete:
+                # The whole body was read, so the socket can be reused
+                response.close()
+            else:
+                # Stopped early: close rather than download the rest (see api_connection.py)
+                connection.close_response(response)
+        healthy = True
+    finally:
+        connection.request_done(started, healthy)
+        metrics.record_fetch(connection.requests.last, status)
+    return departures
+
+def fetch_departures(stop_onestop_id, trip_headsign, route_id, limit=1):
+    """
+    Fetch the next `limit` departures for a stop matching trip_headsign and route_id.
+
+    Returns:
+        list: (scheduled, estimated) tuples ordered by scheduled time,
+              or None if the request failed
+    """
+    departures = fetch_stop_departures(stop_onestop_id, [(trip_headsign, route_id)], limit)
+    if departures is None:
+        return None
+    if __debug__:
+        log.debug("Found %d matching departures", len(departures[(trip_headsign, route_id)]))
+    return departures[(trip_headsign, route_id)]
+
+def group_by_stop(watch_list):
+    """Map each distinct stop to the (trip_headsign, route_id) filters watched there."""
+    stops = {}
+    for stop_onestop_id, trip_headsign, route_id in watch_list:
+        filters = stops.setdefault(stop_onestop_id, [])
+        if (trip_headsign, route_id) not in filters:
+            filters.append((trip_headsign, route_id))
+    return stops
+
+async def _fetch_stop_async(connection, session_id, stop_onestop_id, filters, limit, results):
+    parser = DepartureParser(filters, limit)
+    healthy = False
+    status = None
+    started = connection.request_started()
+    try:
+        _, _, _, path = split_url(departures_url(stop_onestop_id))
+        status = await stream_get(
+            connection.connection_manager,
+            connection.ssl_context,
+            connection.host,
+            path,
+            parser.feed,
+            session_id=session_id,
+            chunk_size=RESPONSE_CHUNK_SIZE,
+            port=connection.port,
+            proto=connection.proto,
+            on_received=metrics.add_received,
+        )
+        healthy = True
+        if status == 200:
+            results[stop_onestop_id] = parser.departures
+        else:
+            log.warning("HTTP Error for %s: %d", stop_onestop_id, status)
+    except Exception as e:
+        log.warning("Error fetching departures for %s: %s", stop_onestop_id, e)
+    connection.request_done(started, healthy)
+    metrics.record_fetch(connection.requests.last, status)
+
+async def _fetch_stops_async(stops, limit, results):
+    connection = get_api_connection()
+    stop_ids = list(stops)
+    for first in range(0, len(stop_ids), MAX_CONCURRENT_FETCHES):
+        batch = stop_ids[first:first + MAX_CONCURRENT_FETCHES]
+        try:
+            # Open (or reuse) one socket per concurrent request up front
+            connection.prepare(len(batch))
+        except Exception as e:
+            log.warning("Error connecting to TransitLand: %s", e)
+            return
+        # The pool holds one socket per session id, so each request gets its own
+        await asyncio.gather(*[
+            _fetch_stop_async(connection, connection.session_ids[slot], stop_onestop_id,
+                              stops[stop_onestop_id], limit, results)
+            for slot, stop_onestop_id in enumerate(batch)
+        ])
+
+def _fetch_stops_blocking(stops, limit, results):
+    for stop_onestop_id, filters in stops.items():
+        try:
+            departures = fetch_stop_departures(stop_onestop_id, filters, limit)
+        except Exception as e:
+            log.warning("Error fetching departures for %s: %s", stop_onestop_id, e)
+            departures = None
+        if departures is not None:
+            results[stop_onestop_id] = departures
+
+def _watched_departures(watch_list, results):
+    watched = {}
+    for entry in watch_list:
+        stop_onestop_id, trip_headsign, route_id = entry
+        departures = results.get(stop_onestop_id)
+        watched[entry] = None if departures is None else departures[(trip_headsign, route_id)]
+    return watched
+
+async def fetch_watch_list_async(watch_list, limit=1):
+    """Same as fetch_watch_list, for callers already running an asyncio loop."""
+    results = {}
+    # Even a single stop goes through stream_get, so the loop keeps running
+    await _fetch_stops_async(group_by_stop(watch_list), limit, results)
+    return _watched_departures(watch_list, results)
+
+def fetch_watch_list(watch_list, limit=1):
+    """
+    Fetch departures for every watched (stop, headsign, route) entry.
+
+    Each distinct stop is requested once per call, however many routes or
+    headsigns are watched there. When asyncio is available the stops are
+    fetched concurrently, so a cycle takes about as long as the slowest
+    request instead of the sum of all of them.
+
+    Returns:
+        dict: watch list entry -> list of (scheduled, estimated) tuples,
+              or None for entries whose stop could not be fetched
+    """
+    if ASYNCIO_AVAILABLE:
+        return asyncio.run(fetch_watch_list_async(watch_list, limit))
+
+    results = {}
+    _fetch_stops_blocking(group_by_stop(watch_list), limit, results)
+    return _watched_departures(watch_list, results)
+
+def prepare_fetch():
+    """Sync the clock if needed and report whether an API call is worthwhile."""
+    # Apply daylight saving changes, and resync once drift could show on the display
+    get_clock_sync().maintain()
+    return _fetch_worthwhile()
+
+async def prepare_fetch_async():
+    """Same as prepare_fetch, yielding to other tasks while the clock syncs."""
+    await get_clock_sync().maintain_async()
+    return _fetch_worthwhile()
+
+def _fetch_worthwhile():
+    metrics.record_clock(get_clock_sync())
+    countdown.anchor()
+
+    # Check if boats are currently running (5am to 11pm)
+    if not are_boats_running():
+        if __debug__:
+            log.debug("Boats are not running at this time (11pm-5am). Skipping API call.")
+        return False
+    return True
+
 def fetch_next_departure(stop_onestop_id, trip_headsign, route_id):
     """Fetches the next departure for a specific stop, filtered by trip_headsign and route_id."""
     try:
-        # Sync time before making API calls if clock is obviously wrong
-        now = datetime.now()
-        if now.year < 2020:  # Clock is obviously wrong
-            # print("Clock needs syncing...")
-            sync_time()
-        
-        # Check if boats are currently running (5am to 11pm)
-        if not are_boats_running():
-            # print("Boats are not running at this time (11pm-5am). Skipping API call.")
-            return None
-        
-        session = setup_requests()
-        stop_key = stop_onestop_id  # Use the stop onestop_id directly
-        url = f"{TRANSITLAND_API_BASE}/stops/{stop_key}/departures?api_key={API_KEY}"
-
-        # print(f"Making request to: {url}")
-        response = session.get(url)
-        if response.status_code != 200:
-            # print(f"HTTP Error: {response.status_code}")
+        if not prepare_fetch():
             return None
-            
-        departures_data = response.json()
         
-        # Print the entire response for debugging
-        # print("=== FULL API RESPONSE ===")
-        # print(json.dumps(departures_data))
-        # print("=== END API RESPONSE ===")
-
-        stops = departures_data.get("stops", [])
-        if not stops:
-            # print(f"No stop information found for stop_key: {stop_key}")
-            return None  # Return None if no stop information is found
-
-        # print(f"Found {len(stops)} stops in response")
-        all_departures = stops[0].get("departures", [])
-        # print(f"Found {len(all_departures)} total departures")
-
-        # Print details about each departure for debugging
-        # print("=== ALL DEPARTURES ===")
-        # for i, departure in enumerate(all_departures):
-        #     trip_info = departure.get("trip", {})
-        #     route_info = trip_info.get("route", {})
-        #     print(f"Departure {i+1}:")
-        #     print(f"  Trip Headsign: {trip_info.get('trip_headsign')}")
-        #     print(f"  Route ID: {route_info.get('onestop_id')}")
-        #     print(f"  Scheduled: {departure.get('departure', {}).get('scheduled')}")
-        #     print(f"  Estimated: {departure.get('departure', {}).get('estimated')}")
-        #     print("---")
-
-        matching_departures = [
-            departure for departure in all_departures
-            if (departure.get("trip", {}).get("trip_headsign") == trip_headsign and
-                departure.get("trip", {}).get("route", {}).get("onestop_id") == route_id)
-        ]
-
-        # print(f"Looking for trip_headsign: '{trip_headsign}' and route_id: '{route_id}'")
-        # print(f"Found {len(matching_departures)} matching departures")
+        try:
+            matching_departures = fetch_departures(stop_onestop_id, trip_headsign, route_id)
+        except Exception as e:
+            log.warning("Error fetching departures: %s", e)
+            matching_departures = None
+
+        if matching_departures is None:
+            # TransitLand unreachable or over quota: use the offline timetable
+            scheduled = next_scheduled_departures(stop_onestop_id, trip_headsign, route_id)
+            return scheduled[0][0] if scheduled else None
+
+        if __debug__:
+            log.debug("Looking for trip_headsign: '%s' and route_id: '%s'", trip_headsign, route_id)
 
         if not matching_departures:
-            # print(f"No departures found for stop {stop_key} with trip_headsign '{trip_headsign}' and route_id '{route_id}'.")
+            if __debug__:
+                log.debug("No departures found for stop %s with trip_headsign '%s' and route_id '%s'.",
+                          stop_onestop_id, trip_headsign, route_id)
             return None  # Return None if no matching departures are found
 
-        # Sort matching departures by scheduled time and take the first (next) departure
-        next_departure = sorted(matching_departures, key=lambda x: x["departure"].get("scheduled"))[0]
-
-        # Extract and print the estimated departure time
-        estimated_departure = next_departure.get("departure", {}).get("estimated")
+        # Departures come back ordered by scheduled time, so the first is the next one
+        scheduled_departure, estimated_departure = matching_departures[0]
 
-        # print(f"Next estimated departure time for '{trip_headsign}' on route '{route_id}' at stop {stop_key}:")
-        # print(estimated_departure)  # Print the raw estimated value
+        if __debug__:
+            log.debug("Next estimated departure time for '%s' on route '%s' at stop %s: %s",
+                      trip_headsign, route_id, stop_onestop_id, estimated_departure)
         return estimated_departure
 
     except Exception as e:
-        # print(f"Error fetching departures: {e}")
+        log.warning("Error fetching departures: %s", e)
         return None  # Return None in case of an error
 
 
-def time_to_next_departure(estimated_departure):
-    """Calculates the time remaining until the next departure."""
-    if estimated_departure is None:
-        # print("No boats in the next hour.")
-        return None
+def seconds_until(departure_time):
+    """
+    Seconds from now until an "HH:MM:SS" departure time.
+
+    Times within the last 12 hours count as already departed and give a
+    negative result; see modules/countdown.py.
+    """
+    return countdown.seconds_until(parse_time_of_day(departure_time))
+
+def to_service_seconds(departures):
+    """Convert (scheduled, estimated) "HH:MM:SS" strings to service-day seconds (None stays None)."""
+    converted = []
+    for scheduled, estimated in departures:
+        try:
+            converted.append((
+                parse_time_of_day(scheduled) if scheduled else None,
+                parse_time_of_day(estimated) if estimated else None,
+            ))
+        except (ValueError, IndexError):
+            log.warning("Skipping unreadable departure time: %s / %s", scheduled, estimated)
+    return converted
+
+
+class DepartureCache:
+    """
+    Keeps the next few matching departures so the countdown can be recomputed
+    locally from the RTC between API polls.
+
+    Args:
+        stop_onestop_id (str): Stop to fetch departures for
+        trip_headsign (str): Headsign to match
+        route_id (str): Route onestop_id to match
+        size (int): Number of upcoming departures to keep
+        max_age (int): Seconds before a refresh is due even if departures remain
+        min_remaining (int): Refresh early when fewer departures than this remain
+    """
+
+    def __init__(self, stop_onestop_id, trip_headsign, route_id,
+                 size=CACHE_SIZE, max_age=CACHE_MAX_AGE, min_remaining=CACHE_MIN_REMAINING):
+        self.stop_onestop_id = stop_onestop_id
+        self.trip_headsign = trip_headsign
+        self.route_id = route_id
+        self.size = size
+        self.max_age = max_age
+        self.min_remaining = min_remaining
+        self.departures = []   # (scheduled, estimated) service-day seconds, next departure first
+        self.fetched_at = None  # time.monotonic() of the last successful refresh
+        self.fetched_count = 0  # How many departures the last refresh returned
+        self.estimate_shift = None  # Seconds the next trip's estimate moved on the last refresh
+        self.offline = False    # Departures come from the offline timetable, not TransitLand
+
+    def age(self):
+        """Seconds since the last successful refresh, or None if never fetched."""
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    def is_stale(self):
+        """True when the cache should go back to the network."""
+        if self.fetched_at is None or self.age() >= self.max_age:
+            return True
+        self._drop_departed()
+        # An empty response (e.g. out of service hours) only refreshes on max_age
+        return len(self.departures) < min(self.min_remaining, self.fetched_count)
+
+    def refresh(self):
+        """
+        Fetch a fresh set of departures.
+
+        Returns:
+            bool: True if the cache was updated, False if the fetch failed and
+                  the previous departures were kept
+        """
+        try:
+            if not prepare_fetch():
+                self.clear()
+                return True
 
-    try:
-        # print(f"=== TIME CALCULATION DEBUG ===")
-        # print(f"Estimated departure string: {estimated_departure}")
-        
-        # For CircuitPython, we'll use a simpler time parsing approach
-        # Parse the HH:MM:SS format manually
-        time_parts = estimated_departure.split(":")
-        departure_hour = int(time_parts[0])
-        departure_minute = int(time_parts[1])
-        departure_second = int(time_parts[2]) if len(time_parts) > 2 else 0
-        
-        # print(f"Parsed departure time: {departure_hour}:{departure_minute}:{departure_second}")
+            departures = fetch_departures(
+                self.stop_onestop_id, self.trip_headsign, self.route_id, self.size
+            )
+            return self.update(departures)
+        except Exception as e:
+            log.warning("Error refreshing departures: %s", e)
+            return False
+
+    def update(self, departures):
+        """Store freshly fetched "HH:MM:SS" departures; None means the fetch failed."""
+        if departures is None:
+            self._drop_departed()
+            if not self.departures:
+                self._load_timetable()
+            return False
+        departures = to_service_seconds(departures)
+        self.estimate_shift = self._estimate_shift(departures)
+        self.offline = False
+        self.departures = departures
+        self.fetched_count = len(departures)
+        self.fetched_at = time.monotonic()
+        return True
 
-        # Get current time
-        now = datetime.now()
-        # print(f"Current datetime: {now}")
-        # print(f"Current time parts: {now.hour}:{now.minute}:{now.second}")
-        
-        # Create departure datetime for today
-        departure_datetime = datetime(
-            now.year, now.month, now.day,
-            departure_hour, departure_minute, departure_second
+    def clear(self):
+        """Mark the cache as fresh but empty (e.g. outside service hours)."""
+        self.offline = False
+        self.departures = []
+        self.fetched_count = 0
+        self.fetched_at = time.monotonic()
+
+    def next_departure(self):
+        """Return the next (scheduled, estimated) service-day seconds still to depart, or None."""
+        self._drop_departed()
+        if not self.departures:
+            return None
+        return self.departures[0]
+
+    def minutes_left(self):
+        """Minutes until the next estimated departure, computed locally."""
+        departure = self.next_departure()
+        if departure is None:
+            return None
+        # The offline timetable only has scheduled times
+        seconds = departure[0] if self.offline else departure[1]
+        if seconds is None:
+            return None
+        return countdown.minutes_until(seconds)
+
+    def _load_timetable(self):
+        departures = next_scheduled_departures(
+            self.stop_onestop_id, self.trip_headsign, self.route_id, self.size
         )
-        
-        # print(f"Departure datetime (today): {departure_datetime}")
+        if departures:
+            log.info("Using offline timetable for %s", self.stop_onestop_id)
+            self.offline = True
+            self.estimate_shift = None
+            self.departures = to_service_seconds(departures)
+            self.fetched_count = len(self.departures)
+
+    def _estimate_shift(self, departures):
+        """Compare the new estimate for the next trip with the cached one."""
+        if not departures or departures[0][1] is None:
+            return None
+        scheduled, estimated = departures[0]
+        for old_scheduled, old_estimated in self.departures:
+            if old_scheduled == scheduled and old_estimated is not None:
+                return estimated - old_estimated
+        return None
+
+    def _drop_departed(self):
+        while self.departures:
+            scheduled, estimated = self.departures[0]
+            departure = scheduled if estimated is None else estimated
+            if departure is not None and countdown.seconds_until(departure) >= 0:
+                return
+            self.departures.pop(0)
+
+
+def _watch_list_of(departure_caches):
+    return [
+        (cache.stop_onestop_id, cache.trip_headsign, cache.route_id)
+        for cache in departure_caches
+    ]
+
+def _update_caches(departure_caches, watch_list, results):
+    updated = True
+    for cache, entry in zip(departure_caches, watch_list):
+        updated = cache.update(results[entry]) and updated
+    return updated
+
+def _clear_if_not_running(departure_caches, worthwhile):
+    """If no fetch is worthwhile (prepare_fetch's result), clear the caches and return True."""
+    if worthwhile:
+        return False
+    for cache in departure_caches:
+        cache.clear()
+    return True
 
-        # Handle cases where departure time is on the next day
-        if departure_datetime < now:
-            # print("Departure time is in the past, adding 1 day")
-            departure_datetime = departure_datetime + timedelta(days=1)
-            # print(f"Departure datetime (next day): {departure_datetime}")
-        # else:
-            # print("Departure time is today")
+def refresh_watch_list(departure_caches):
+    """
+    Refresh several DepartureCaches with one fetch per distinct stop.
 
-        time_diff = departure_datetime - now
-        # print(f"Time difference: {time_diff}")
-        # print(f"Time difference in seconds: {time_diff.total_seconds()}")
+    Returns:
+        bool: True if every cache was updated
+    """
+    if len(departure_caches) == 1:
+        return departure_caches[0].refresh()
 
-        # Extract minutes remaining
-        minutes_remaining = int(time_diff.total_seconds() // 60) + 1
-        # print(f"Minutes remaining: {minutes_remaining}")
-        # print(f"=== END TIME CALCULATION DEBUG ===")
+    try:
+        if _clear_if_not_running(departure_caches, prepare_fetch()):
+            return True
+        watch_list = _watch_list_of(departure_caches)
+        size = max(cache.size for cache in departure_caches)
+        return _update_caches(departure_caches, watch_list, fetch_watch_list(watch_list, size))
+    except Exception as e:
+        log.warning("Error refreshing watch list: %s", e)
+        return False
 
-        return minutes_remaining
+async def refresh_watch_list_async(departure_caches):
+    """
+    Same as refresh_watch_list, for callers already running an asyncio loop.
 
-    except (ValueError, TypeError, AttributeError) as e:
-        # print(f"Error calculating time difference: {e}")
+    A single cache is fetched with stream_get as well, rather than with the
+    blocking DepartureCache.refresh(), so the display and the metrics server
+    keep running during the request (and during a clock sync's round trip).
+    """
+    try:
+        if _clear_if_not_running(departure_caches, await prepare_fetch_async()):
+            return True
+        watch_list = _watch_list_of(departure_caches)
+        size = max(cache.size for cache in departure_caches)
+        results = await fetch_watch_list_async(watch_list, size)
+        return _update_caches(departure_caches, watch_list, results)
+    except Exception as e:
+        log.warning("Error refreshing watch list: %s", e)
+        return False
+
+
+def time_to_next_departure(estimated_departure):
+    """Minutes until an "HH:MM:SS" departure, or None if there is none."""
+    if estimated_departure is None:
+        if __debug__:
+            log.debug("No boats in the next hour.")
+        return None
+    try:
+        return countdown.minutes_until(parse_time_of_day(estimated_departure))
+    except (ValueError, IndexError) as e:
+        log.warning("Error calculating time difference: %s", e)
         return None
 
 
@@ -0,0 +1,156 @@
+"""
+Minify and precompress the portal pages in modules/HTML.
+
+Runs on a computer, not on the clock:
+
+    python tools/build_assets.py [--check]
+
+For every page.html it writes page.min.html (whitespace, comments and CSS
+padding removed), which the template loader reads in place of the source,
+and for pages without {{slots}} also page.html.gz, which the portal sends
+as-is with Content-Encoding: gzip to clients that accept it. Re-run it and
+copy modules/HTML to the CIRCUITPY drive after editing a page: the clock
+serves page.min.html whenever it exists, however old. --check only lists
+the built files that no longer match their source (host/tests runs it).
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+
+HTML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "modules", "HTML")
+
+MINIFIED_SUFFIX = ".min.html"
+
+# Blocks whose content must not be treated as HTML text
+_RAW_BLOCK = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)", re.S | re.I)
+_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+def minify_css(css):
+    css = _CSS_COMMENT.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    # Spaces inside calc() around + and - are significant, so only strip
+    # around punctuation that never needs them
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def minify_script(script):
+    # Keep line breaks (no statement or // comment parsing), drop indentation
+    lines = (line.strip() for line in script.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def minify_text(html):
+    html = _COMMENT.sub("", html)
+    html = re.sub(r">\s+<", "><", html)
+    html = re.sub(r"\s+", " ", html)
+    return html
+
+
+def minify(html):
+    """Minify an HTML page; {{slot}} markers are left untouched."""
+    out = []
+    position = 0
+    for match in _RAW_BLOCK.finditer(html):
+        out.append(minify_text(html[position:match.start()]))
+        open_tag, tag, content, close_tag = match.groups()
+        tag = tag.lower()
+        if tag == "style":
+            content = minify_css(content)
+        elif tag == "script":
+            content = minify_script(content)
+        out.append(minify_text(open_tag) + content + close_tag)
+        position = match.end()
+    out.append(minify_text(html[position:]))
+    # Whitespace left next to the raw blocks and at the ends
+    return re.sub(r">\s+<", "><", "".join(out)).strip()
+
+
+def pages(html_dir):
+    """(name, path, source) of every source page in html_dir."""
+    for name in sorted(os.listdir(html_dir)):
+        if not name.endswith(".html") or name.endswith(MINIFIED_SUFFIX):
+            continue
+        path = os.path.join(html_dir, name)
+        with open(path, encoding="utf-8") as file:
+            yield name, path, file.read()
+
+
+def minified_path(path):
+    return path[:-len(".html")] + MINIFIED_SUFFIX
+
+
+def build(html_dir):
+    """Write the minified and gzipped copies; return (name, source, minified, gzipped) sizes."""
+    results = []
+    for name, path, source in pages(html_dir):
+        minified = minify(source).encode("utf-8")
+        with open(minified_path(path), "wb") as file:
+            file.write(minified)
+
+        gz_path = path + ".gz"
+        gzipped = None
+        if b"{{" in minified:
+            # Templated pages are filled in per request and sent uncompressed
+            if os.path.exists(gz_path):
+                os.remove(gz_path)
+        else:
+            # mtime=0 keeps the output identical between runs
+            data = gzip.compress(minified, compresslevel=9, mtime=0)
+            with open(gz_path, "wb") as file:
+                file.write(data)
+            gzipped = len(data)
+        results.append((name, len(source.encode("utf-8")), len(minified), gzipped))
+    return results
+
+
+def stale(html_dir):
+    """Names of built files that are missing or no longer match their source page."""
+    results = []
+    for name, path, source in pages(html_dir):
+        minified = minify(source).encode("utf-8")
+        try:
+            with open(minified_path(path), "rb") as file:
+                if file.read() != minified:
+                    results.append(os.path.basename(minified_path(path)))
+        except FileNotFoundError:
+            results.append(os.path.basename(minified_path(path)))
+
+        gz_path = path + ".gz"
+        templated = b"{{" in minified
+        try:
+            # Compared uncompressed: another zlib may compress differently
+            with gzip.open(gz_path) as file:
+                if templated or file.read() != minified:
+                    results.append(name + ".gz")
+        except FileNotFoundError:
+            if not templated:
+                results.append(name + ".gz")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("html_dir", nargs="?", default=HTML_DIR, help="directory of pages")
+    parser.add_argument("--check", action="store_true", help="list stale built files, write nothing")
+    args = parser.parse_args()
+
+    if args.check:
+        out_of_date = stale(args.html_dir)
+        for name in out_of_date:
+            print(f"{name} is out of date; run python tools/build_assets.py", file=sys.stderr)
+        return 1 if out_of_date else 0
+
+    for name, source, minified, gzipped in build(args.html_dir):
+        gz = f", {gzipped} gzipped" if gzipped is not None else " (templated)"
+        print(f"{name}: {source} -> {minified} bytes minified{gz}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Compile a BDF font down to the few glyphs the clock draws.
+
+Runs on a computer, not on the clock:
+
+    python tools/build_font.py fonts/MatrixChunky8.bdf fonts/MatrixChunky8.bin
+
+then copy the .bin to the fonts folder on the CIRCUITPY drive. The clock
+loads it with modules/glyph_font.py, which also documents the file layout.
+Pass --chars to compile a different character set.
+"""
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from modules.glyph_font import GLYPH_FORMAT, HEADER_FORMAT, MAGIC, VERSION  # noqa: E402
+
+# Minute counts, "ERR", and the "Ferry: BOAT" setup text
+DEFAULT_CHARS = "0123456789ERmin" + "Ferry: BOAT"
+
+
+def parse_bdf(path):
+    """Return (glyphs, bounding_box, ascent, descent); glyphs maps code point -> dict."""
+    glyphs = {}
+    bounding_box = (0, 0, 0, 0)
+    ascent = descent = 0
+    glyph = None
+    rows = None
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for line in file:
+            parts = line.split()
+            if not parts:
+                continue
+            keyword = parts[0]
+            if rows is not None:
+                if keyword == "ENDCHAR":
+                    glyph["rows"] = rows
+                    if glyph.get("codepoint", -1) >= 0:
+                        glyphs[glyph["codepoint"]] = glyph
+                    glyph = rows = None
+                else:
+                    rows.append(bytes.fromhex(keyword))
+            elif keyword == "FONTBOUNDINGBOX":
+                bounding_box = tuple(int(value) for value in parts[1:5])
+            elif keyword == "FONT_ASCENT":
+                ascent = int(parts[1])
+            elif keyword == "FONT_DESCENT":
+                descent = int(parts[1])
+            elif keyword == "STARTCHAR":
+                glyph = {}
+            elif glyph is not None and keyword == "ENCODING":
+                glyph["codepoint"] = int(parts[1])
+            elif glyph is not None and keyword == "DWIDTH":
+                glyph["shift"] = (int(parts[1]), int(parts[2]))
+            elif glyph is not None and keyword == "BBX":
+                glyph["bbx"] = tuple(int(value) for value in parts[1:5])
+            elif glyph is not None and keyword == "BITMAP":
+                rows = []
+    return glyphs, bounding_box, ascent, descent
+
+
+def glyph_bytes(glyph):
+    """The glyph's rows re-packed to whole bytes per row, MSB leftmost."""
+    width, height = glyph["bbx"][:2]
+    row_bytes = (width + 7) // 8
+    out = bytearray()
+    for row in glyph["rows"][:height]:
+        # BDF rows are already padded to whole bytes, MSB leftmost
+        out += row[:row_bytes].ljust(row_bytes, b"\0")
+    return bytes(out)
+
+
+def compile_font(bdf_path, chars):
+    glyphs, bounding_box, ascent, descent = parse_bdf(bdf_path)
+    codepoints = sorted(set(ord(char) for char in chars))
+    missing = [chr(codepoint) for codepoint in codepoints if codepoint not in glyphs]
+    if missing:
+        print(f"Not in the font, skipped: {''.join(missing)!r}", file=sys.stderr)
+    codepoints = [codepoint for codepoint in codepoints if codepoint in glyphs]
+
+    records = bytearray()
+    bitmaps = bytearray()
+    for codepoint in codepoints:
+        glyph = glyphs[codepoint]
+        width, height, dx, dy = glyph["bbx"]
+        shift_x, shift_y = glyph.get("shift", (width, 0))
+        records += struct.pack(GLYPH_FORMAT, codepoint, width, height, dx, dy, shift_x, shift_y)
+        bitmaps += glyph_bytes(glyph)
+
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(codepoints), *bounding_box, ascent, descent)
+    return header + records + bitmaps, len(codepoints)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("bdf", help="BDF font to compile")
+    parser.add_argument("output", help="compiled font file to write")
+    parser.add_argument("--chars", default=DEFAULT_CHARS, help="characters to include")
+    args = parser.parse_args()
+
+    data, count = compile_font(args.bdf, args.chars)
+    with open(args.output, "wb") as file:
+        file.write(data)
+    print(f"Wrote {args.output}: {count} glyphs, {len(data)} bytes "
+          f"(from {os.path.getsize(args.bdf)} bytes of BDF)")
+
+
+if __name__ == "__main__":
+    main()
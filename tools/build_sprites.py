@@ -0,0 +1,123 @@
+"""
+Pack the per-color boat images into one indexed-color sprite atlas.
+
+Runs on a computer, not on the clock:
+
+    python tools/build_sprites.py
+
+reads boats/<color>.bmp (24-bit) for every route color in
+modules/routes_data.py and writes boats/atlas.bmp: an 8-bit palette BMP
+with the boats side by side in the order of modules/sprites.py COLORS,
+which the clock opens once (see modules/sprites.py). Copy it to the boats
+folder on the CIRCUITPY drive.
+"""
+import argparse
+import os
+import struct
+import sys
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, ROOT)
+
+from modules.routes_data import routes_data  # noqa: E402
+from modules.sprites import COLORS  # noqa: E402
+
+BOATS_DIR = os.path.join(ROOT, "boats")
+
+
+def route_colors():
+    """Distinct route colors in the order they first appear in routes_data."""
+    colors = []
+    for info in routes_data.values():
+        color = info.get("color")
+        if color and color not in colors:
+            colors.append(color)
+    return tuple(colors)
+
+
+def read_bmp(path):
+    """Return (width, height, rows of (r, g, b) tuples, top row first) of a 24-bit BMP."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:2] != b"BM":
+        raise ValueError(f"{path} is not a BMP file")
+    offset = struct.unpack_from("<I", data, 10)[0]
+    width, height, planes, bits, compression = struct.unpack_from("<iiHHI", data, 18)
+    if bits != 24 or compression != 0:
+        raise ValueError(f"{path}: only uncompressed 24-bit BMPs are supported")
+
+    top_down = height < 0
+    height = abs(height)
+    stride = (width * 3 + 3) & ~3
+    rows = []
+    for y in range(height):
+        start = offset + y * stride
+        rows.append([
+            (data[start + x * 3 + 2], data[start + x * 3 + 1], data[start + x * 3])
+            for x in range(width)
+        ])
+    if not top_down:
+        rows.reverse()
+    return width, height, rows
+
+
+def write_indexed_bmp(path, width, height, pixels, palette):
+    """Write an 8-bit palette BMP; pixels are rows of palette indexes, top row first."""
+    stride = (width + 3) & ~3
+    palette_bytes = b"".join(struct.pack("<BBBB", b, g, r, 0) for r, g, b in palette)
+    offset = 14 + 40 + len(palette_bytes)
+    size = offset + stride * height
+
+    out = bytearray()
+    out += struct.pack("<2sIHHI", b"BM", size, 0, 0, offset)
+    out += struct.pack("<IiiHHIIiiII", 40, width, height, 1, 8, 0, stride * height,
+                       2835, 2835, len(palette), len(palette))
+    out += palette_bytes
+    for row in reversed(pixels):  # BMP rows are stored bottom-up
+        out += bytes(row) + bytes(stride - width)
+
+    with open(path, "wb") as file:
+        file.write(out)
+    return size
+
+
+def build(boats_dir, output):
+    colors = route_colors()
+    if colors != COLORS:
+        raise SystemExit(f"modules/sprites.py COLORS {COLORS} does not match routes_data {colors}")
+
+    tiles = []
+    for color in colors:
+        tiles.append(read_bmp(os.path.join(boats_dir, f"{color}.bmp")))
+    width, height = tiles[0][:2]
+    if any(tile[:2] != (width, height) for tile in tiles):
+        raise SystemExit("All boat images must be the same size")
+
+    # Background first so it is palette index 0
+    palette = [tiles[0][2][0][0]]
+    atlas = [[] for _ in range(height)]
+    for _, _, rows in tiles:
+        for y, row in enumerate(rows):
+            for pixel in row:
+                if pixel not in palette:
+                    palette.append(pixel)
+                atlas[y].append(palette.index(pixel))
+    if len(palette) > 256:
+        raise SystemExit(f"Too many colors for an 8-bit palette: {len(palette)}")
+
+    size = write_indexed_bmp(output, width * len(colors), height, atlas, palette)
+    return len(colors), width, height, len(palette), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boats", default=BOATS_DIR, help="folder with <color>.bmp boats")
+    parser.add_argument("--output", default=os.path.join(BOATS_DIR, "atlas.bmp"), help="atlas to write")
+    args = parser.parse_args()
+
+    count, width, height, colors, size = build(args.boats, args.output)
+    print(f"Wrote {args.output}: {count} boats of {width}x{height}, {colors} palette colors, {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
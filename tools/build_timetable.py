@@ -0,0 +1,223 @@
+"""
+Build the offline timetable (timetable.bin) from NYC Ferry's static GTFS.
+
+Runs on a computer, not on the clock:
+
+    python tools/build_timetable.py google_transit.zip timetable.bin
+
+then copy timetable.bin to the root of the CIRCUITPY drive. The clock falls
+back to it (see modules/timetable.py) when TransitLand cannot be reached.
+
+GTFS stop and route ids are mapped to the TransitLand onestop ids the clock
+is configured with by matching against modules/routes_data.py: routes by
+their short code ("ER"), stops by their onestop name and geohash.
+
+File layout (little-endian):
+
+    header   "CCTT", version (H), entry count (H), first and last service
+             date as YYYYMMDD (I, I)
+    index    one 12-byte record per stop/route/headsign, sorted by key hash:
+             FNV-1a hash of "stop|route|headsign" (I), block offset (I),
+             departure count (H), padding
+    blocks   per entry: key length (B), key (UTF-8), then one (I) per
+             departure: seconds since the start of the service day << 8 |
+             weekday mask (bit 0 = Monday), sorted by time
+
+Only calendar.txt weekday patterns are used; calendar_dates.txt exceptions
+(holiday schedules) are not applied.
+"""
+import argparse
+import csv
+import io
+import os
+import struct
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from modules.routes_data import routes_data  # noqa: E402
+from modules.timetable import HEADER_FORMAT, INDEX_FORMAT, MAGIC, VERSION, key_hash  # noqa: E402
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def geohash(lat, lon, precision=10):
+    """Standard geohash encoding of a coordinate."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    result = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(result) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(result)
+
+
+def onestop_name(name):
+    """Normalize a stop name the way TransitLand does for onestop ids."""
+    out = []
+    for char in name.lower():
+        if char.isalnum():
+            out.append(char)
+        elif char in "/&-@":
+            if out and out[-1] != "~":
+                out.append("~")
+    return "".join(out).strip("~")
+
+
+def read_csv(archive, name):
+    with archive.open(name) as raw:
+        return list(csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig")))
+
+
+def parse_gtfs_time(value):
+    hours, minutes, seconds = (int(part) for part in value.strip().split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def known_routes():
+    """GTFS route code -> route onestop id, from routes_data."""
+    return {key.split(" ")[0]: info["id"] for key, info in routes_data.items()}
+
+
+def known_stops():
+    """Onestop name -> list of (geohash, onestop id), from routes_data."""
+    stops = {}
+    for info in routes_data.values():
+        for stop in info["stops"]:
+            _, stop_geohash, name = stop["stop_id"].split("-", 2)
+            entries = stops.setdefault(name, [])
+            if (stop_geohash, stop["stop_id"]) not in entries:
+                entries.append((stop_geohash, stop["stop_id"]))
+    return stops
+
+
+def match_stop(row, stops):
+    """Return the onestop id for a GTFS stops.txt row, or None."""
+    stop_geohash = geohash(float(row["stop_lat"]), float(row["stop_lon"]))
+    for candidate_geohash, onestop_id in stops.get(onestop_name(row["stop_name"]), []):
+        if stop_geohash.startswith(candidate_geohash):
+            return onestop_id
+    # Names sometimes differ between feeds; fall back to a unique location match
+    matches = [
+        onestop_id
+        for entries in stops.values()
+        for candidate_geohash, onestop_id in entries
+        if stop_geohash.startswith(candidate_geohash)
+    ]
+    return matches[0] if len(set(matches)) == 1 else None
+
+
+def build(gtfs_path):
+    """Return ({key: {seconds: mask}}, first_date, last_date) from a GTFS zip."""
+    with zipfile.ZipFile(gtfs_path) as archive:
+        routes = read_csv(archive, "routes.txt")
+        stops = read_csv(archive, "stops.txt")
+        trips = read_csv(archive, "trips.txt")
+        calendar = read_csv(archive, "calendar.txt")
+        stop_times = read_csv(archive, "stop_times.txt")
+
+    route_codes = known_routes()
+    route_ids = {}
+    for row in routes:
+        for code in (row.get("route_short_name", ""), row["route_id"]):
+            if code in route_codes:
+                route_ids[row["route_id"]] = route_codes[code]
+                break
+        else:
+            print(f"Skipping unknown route {row['route_id']}", file=sys.stderr)
+
+    onestop_stops = known_stops()
+    stop_ids = {}
+    for row in stops:
+        onestop_id = match_stop(row, onestop_stops)
+        if onestop_id:
+            stop_ids[row["stop_id"]] = onestop_id
+
+    service_masks = {}
+    first_date = None
+    last_date = None
+    for row in calendar:
+        mask = 0
+        for bit, day in enumerate(WEEKDAYS):
+            if row[day] == "1":
+                mask |= 1 << bit
+        service_masks[row["service_id"]] = mask
+        first_date = min(first_date or row["start_date"], row["start_date"])
+        last_date = max(last_date or row["end_date"], row["end_date"])
+
+    trip_keys = {}
+    for row in trips:
+        route_id = route_ids.get(row["route_id"])
+        mask = service_masks.get(row["service_id"])
+        if route_id and mask:
+            trip_keys[row["trip_id"]] = (route_id, row.get("trip_headsign", ""), mask)
+
+    timetable = {}
+    for row in stop_times:
+        trip = trip_keys.get(row["trip_id"])
+        stop_id = stop_ids.get(row["stop_id"])
+        if not trip or not stop_id or row.get("pickup_type") == "1":
+            continue
+        route_id, headsign, mask = trip
+        seconds = parse_gtfs_time(row["departure_time"] or row["arrival_time"])
+        departures = timetable.setdefault(f"{stop_id}|{route_id}|{headsign}", {})
+        departures[seconds] = departures.get(seconds, 0) | mask
+
+    return timetable, int(first_date or 0), int(last_date or 0)
+
+
+def write(timetable, first_date, last_date, out_path):
+    keys = sorted(timetable, key=key_hash)
+    header_size = struct.calcsize(HEADER_FORMAT)
+    index_size = struct.calcsize(INDEX_FORMAT)
+
+    blocks = bytearray()
+    index = bytearray()
+    offset = header_size + index_size * len(keys)
+    for key in keys:
+        departures = sorted(timetable[key].items())
+        encoded = key.encode("utf-8")
+        block = struct.pack("<B", len(encoded)) + encoded
+        block += b"".join(struct.pack("<I", seconds << 8 | mask) for seconds, mask in departures)
+        index += struct.pack(INDEX_FORMAT, key_hash(key), offset + len(blocks), len(departures))
+        blocks += block
+
+    with open(out_path, "wb") as file:
+        file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(keys), first_date, last_date))
+        file.write(index)
+        file.write(blocks)
+    return header_size + len(index) + len(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("gtfs", help="NYC Ferry static GTFS zip")
+    parser.add_argument("output", nargs="?", default="timetable.bin", help="output file")
+    args = parser.parse_args()
+
+    timetable, first_date, last_date = build(args.gtfs)
+    size = write(timetable, first_date, last_date, args.output)
+    departures = sum(len(entry) for entry in timetable.values())
+    print(f"Wrote {args.output}: {len(timetable)} stop/route/headsign entries, "
+          f"{departures} departures, {size} bytes, service {first_date}-{last_date}")
+
+
+if __name__ == "__main__":
+    main()